@@ -1,8 +1,22 @@
-import requests
 from dataclasses import dataclass, field
-from typing import List, Tuple, Literal, Dict, Optional
+from typing import List, Tuple, Literal, Dict, Optional, TYPE_CHECKING
 import uuid
+import logging
+import time
 from typing import Set, Iterable
+from instrumentation import METRICS
+from templates import CompiledRequest, compile_template
+from normalizer import first_id
+from uc_graph import UCGraph
+from rules import DEFAULT_RULES, RuleSet, load_rules
+
+# requests (and the session/rate-control layers built on it) is only imported once a
+# network stage runs, so offline planning starts fast
+if TYPE_CHECKING:
+    import requests
+    from sessions import SessionManager
+
+log = logging.getLogger("idor")
 
 ACtiontype=Literal['state-changing', 'state-preserving']
 UCKey = Tuple[str, str]  # (action_id, role)
@@ -35,31 +49,42 @@ class usecase:
 # creation of 2 groupf of users so that each user must have its own HTTP session so state (auth cookies, CSRF tokens, navigational context) does not bleed between tests.
 @dataclass
 class User:
-    """Concrete user instance bound to a role with its own HTTP session."""
+    """Concrete user instance bound to a role with its own HTTP session (None in offline runs)."""
     id: str
     role: role
-    session: requests.Session
+    session: Optional["requests.Session"]
+
+# Shared transport for all users: tuned pool sizes, retry with backoff + jitter,
+# keep-alive connections reused across users (cookie jars stay per session).
+# Created on first use (see _session_manager).
+SESSIONS: Optional["SessionManager"] = None
+
+def _session_manager() -> "SessionManager":
+    global SESSIONS
+    if SESSIONS is None:
+        from sessions import SessionManager
+        SESSIONS = SessionManager(on_response=METRICS.record_response)
+    return SESSIONS
 
 def _make_session(base_headers: Optional[Dict[str, str]] = None,
-                  cookies: Optional[Dict[str, str]] = None) -> requests.Session:
-    s = requests.Session()
-    if base_headers:
-        s.headers.update(base_headers)
-    if cookies:
-        s.cookies.update(dict(cookies))  # copy to avoid shared refs
-    return s
+                  cookies: Optional[Dict[str, str]] = None,
+                  manager: Optional["SessionManager"] = None) -> "requests.Session":
+    return (manager or _session_manager()).new_session(base_headers, cookies)
 
-def _create_user_for_role(r: role, label: str) -> User:
+def _create_user_for_role(r: role, label: str, manager: Optional["SessionManager"] = None,
+                          offline: bool = False) -> User:
     """
     Create a concrete user for a given role.
     `label` helps distinguish groups (e.g., 'G1' vs 'G2') in logs.
+    `offline` users get no session, so static runs never import requests.
     """
     return User(
         id=f"{r.name}-{label}-{uuid.uuid4().hex[:8]}",
         role=r,
-        session=_make_session(
+        session=None if offline else _make_session(
             base_headers={"User-Agent": f"IDOR-Scanner/0.1 (+{r.name}/{label})"},
             cookies=r.cookies,
+            manager=manager,
         ),
     )
 
@@ -75,6 +100,37 @@ def create_two_user_groups(roles_ix: Dict[str, role]) -> Tuple[Dict[str, User],
         group2[rname] = _create_user_for_role(r, "G2")
     return group1, group2
 
+def create_user_groups(roles_ix: Dict[str, role],
+                       users_per_role: int = 1,
+                       labels: Tuple[str, ...] = ("G1", "G2"),
+                       manager: Optional["SessionManager"] = None,
+                       offline: bool = False) -> Dict[str, Dict[str, List[User]]]:
+    """
+    Returns {label: {role_name: [User, ...]}} with `users_per_role` users per role in
+    every group. Each user has its own session (cookies/state); connection pools are
+    shared through the session manager. `offline` users have no session.
+    """
+    groups: Dict[str, Dict[str, List[User]]] = {}
+    for label in labels:
+        groups[label] = {
+            rname: [_create_user_for_role(r, f"{label}.{i}" if users_per_role > 1 else label, manager, offline)
+                    for i in range(users_per_role)]
+            for rname, r in roles_ix.items()
+        }
+    return groups
+
+def user_slots(groups: Dict[str, Dict[str, List[User]]]) -> Dict[str, Dict[str, User]]:
+    """
+    One {role_name: User} group per user slot of create_user_groups: "G1" holds the
+    first user of every role, "G1.1" the second, and so on.
+    """
+    slots: Dict[str, Dict[str, User]] = {}
+    for label, by_role in groups.items():
+        for rname, users in by_role.items():
+            for i, user in enumerate(users):
+                slots.setdefault(label if i == 0 else f"{label}.{i}", {})[rname] = user
+    return slots
+
 # Static configuration
 
 # Privilege lattice: Admin(3) > Instructor(2) > Student(1) > Public(0)
@@ -257,6 +313,34 @@ USE_CASES: List[usecase] = [
     usecase(role="Admin", action=ACTION_BY_ID["logout"],           dependencies=[("login", "Admin")]),
 ]
 
+def actions_from_captures(path: str, index=None, use_mmap: bool = False) -> Tuple[List[Action], Dict[str, Dict[str, List[str]]]]:
+    """
+    Build deduplicated Actions from proxy captures (see ingest.py).
+    Returns (actions, observed) where observed[action_id][placeholder] lists the
+    parameter values seen in the captures. Pass the same `index` (ingest.CaptureIndex)
+    again to pick up only newly appended captures.
+    """
+    from ingest import CaptureIndex
+
+    ix = index if index is not None else CaptureIndex()
+    ix.ingest(path, use_mmap=use_mmap)
+    actions: List[Action] = []
+    observed: Dict[str, Dict[str, List[str]]] = {}
+    for ep in ix.endpoints.values():
+        actions.append(Action(
+            id=ep.action_id,
+            type=ep.type,
+            HTTP_request=Requesttype(method=ep.method, endpoint=ep.template, headers=dict(ep.fields)),
+        ))
+        observed[ep.action_id] = {k: list(v) for k, v in ep.values.items()}
+    return actions, observed
+
+def use_cases_for_role(actions: List[Action], role_name: str, login_action_id: Optional[str] = None) -> List[usecase]:
+    """One use case per captured action for `role_name`, all depending on its login use case if given."""
+    deps = [(login_action_id, role_name)] if login_action_id else []
+    return [usecase(role=role_name, action=a, dependencies=list(deps) if a.id != login_action_id else [])
+            for a in actions]
+
 # Optional: handy defaults for parameter placeholders (works with the executor snippet I gave you)
 CTX_DEFAULTS = {
     "Admin":      {"user": "admin",      "pass": "adminpw",      "course_id": "101", "user_id": "1",  "title": "Sec101", "desc": "Intro", "email": "admin@example.com", "phone": "000-000"},
@@ -286,26 +370,113 @@ def index_use_cases(ucs: List[usecase]) -> Dict[Tuple[str, str], usecase]:
         ix[key] = uc
     return ix
 
+HTTP_METHODS = ("GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE")
+
+def validate_graph(role_ix: Dict[str, role],
+                   action_ix: Dict[str, Action],
+                   uc_ix: Dict[Tuple[str, str], usecase]) -> None:
+    """
+    Check the model for references that do not resolve and malformed entries; raises
+    ValueError listing every problem. Placeholders a role has no CTX_DEFAULTS value
+    for are only logged (they render as-is).
+    """
+    problems: List[str] = []
+    for r in role_ix.values():
+        if not isinstance(r.rank, int) or isinstance(r.rank, bool):
+            problems.append(f"role {r.name}: rank must be an integer, got {r.rank!r}")
+    for a in action_ix.values():
+        if a.type not in ("state-changing", "state-preserving"):
+            problems.append(f"action {a.id}: unknown type {a.type!r}")
+        if a.HTTP_request.method.upper() not in HTTP_METHODS:
+            problems.append(f"action {a.id}: unknown HTTP method {a.HTTP_request.method!r}")
+        if not a.HTTP_request.endpoint.startswith("/"):
+            problems.append(f"action {a.id}: endpoint must start with '/', got {a.HTTP_request.endpoint!r}")
+    for (aid, rname), uc in uc_ix.items():
+        if rname not in role_ix:
+            problems.append(f"use case ({aid}, {rname}): unknown role {rname!r}")
+        if aid not in action_ix:
+            problems.append(f"use case ({aid}, {rname}): unknown action {aid!r}")
+        for kind, pairs in (("dependency", uc.dependencies), ("cancellation", uc.cancellation)):
+            for pair in pairs:
+                if tuple(pair) not in uc_ix:
+                    problems.append(f"use case ({aid}, {rname}): {kind} on unknown use case {tuple(pair)}")
+                elif tuple(pair) == (aid, rname):
+                    problems.append(f"use case ({aid}, {rname}): {kind} on itself")
+        if aid in action_ix:
+            req = action_ix[aid].HTTP_request
+            names = set(compile_template(req.endpoint).names)
+            for v in (req.headers or {}).values():
+                if isinstance(v, str):
+                    names.update(compile_template(v).names)
+            missing = sorted(names - set(CTX_DEFAULTS.get(rname, {})))
+            if missing:
+                log.debug("use case (%s, %s): no context value for %s", aid, rname, ", ".join(missing))
+    if problems:
+        raise ValueError("Invalid scan model:\n  - " + "\n  - ".join(problems))
+
+def model_from_config(model: Dict) -> Tuple[List[role], List[Action], List[usecase], Dict[str, Dict[str, str]]]:
+    """Dataclasses for a normalised config_loader model."""
+    roles = [role(name, rank=rank, cookies=dict(cookies)) for name, rank, cookies in model["roles"]]
+    actions = [Action(id=aid, type=atype, HTTP_request=Requesttype(method=method, endpoint=endpoint, headers=dict(headers)))
+               for aid, atype, method, endpoint, headers in model["actions"]]
+    by_id = {a.id: a for a in actions}
+    ucs = []
+    for rname, aid, deps, cancels in model["use_cases"]:
+        if aid not in by_id:
+            raise ValueError(f"Invalid scan model: use case ({aid}, {rname}) refers to unknown action {aid!r}")
+        ucs.append(usecase(role=rname, action=by_id[aid], dependencies=[tuple(p) for p in deps],
+                           cancellation=[tuple(p) for p in cancels]))
+    return roles, actions, ucs, {k: dict(v) for k, v in model["ctx_defaults"].items()}
+
+def use_config(roles: List[role], actions: List[Action], ucs: List[usecase], ctx: Dict[str, Dict[str, str]]) -> None:
+    """Replace the module-level model (ROLES, ACTIONS, USE_CASES, CTX_DEFAULTS)."""
+    global ROLES, ACTIONS, ACTION_BY_ID, USE_CASES, CTX_DEFAULTS
+    ROLES, ACTIONS, USE_CASES, CTX_DEFAULTS = roles, actions, ucs, ctx
+    ACTION_BY_ID = {a.id: a for a in actions}
+    _COMPILED_REQUESTS.clear()
+
+def load_config(path: str, cache_dir: Optional[str] = None):
+    """
+    (roles, actions, use_cases, ctx_defaults) from a JSON/YAML/TOML file, validated.
+    With `cache_dir`, an unchanged file is loaded from the precompiled cache.
+    """
+    from config_loader import load_model
+
+    def _check(model: Dict) -> None:
+        roles, actions, ucs, ctx = model_from_config(model)
+        global CTX_DEFAULTS
+        saved, CTX_DEFAULTS = CTX_DEFAULTS, ctx
+        try:
+            validate_graph(index_roles(roles), index_actions(actions), index_use_cases(ucs))
+        finally:
+            CTX_DEFAULTS = saved
+
+    return model_from_config(load_model(path, cache_dir, validate=_check))
+
 
 def enumerate_all() -> None:
     role_ix   = index_roles(ROLES)
     action_ix = index_actions(ACTIONS)
     uc_ix     = index_use_cases(USE_CASES)
-    #validate_graph(role_ix, action_ix, uc_ix)
+    validate_graph(role_ix, action_ix, uc_ix)
 
     #print(f"Base URL: {BASE_URL}\n")
-    print("Roles:")
+    log.info("Config: %d roles, %d actions, %d use cases", len(role_ix), len(action_ix), len(uc_ix))
+    analyse_uc_graph(USE_CASES)
+    if not log.isEnabledFor(logging.DEBUG):
+        return
+    log.debug("Roles:")
     for r in role_ix.values():
-        print(f"  - {r.name} (rank={r.rank}) cookies={bool(r.cookies)}")
+        log.debug("  - %s (rank=%s) cookies=%s", r.name, r.rank, bool(r.cookies))
 
-    print("\nActions:")
+    log.debug("\nActions:")
     for a in action_ix.values():
         tmpl = a.HTTP_request
-        print(f"  - {a.id} [{a.type}] {tmpl.method} {tmpl.endpoint}")
+        log.debug("  - %s [%s] %s %s", a.id, a.type, tmpl.method, tmpl.endpoint)
 
-    print("\nUseCases (action, role):")
+    log.debug("\nUseCases (action, role):")
     for (aid, role), uc in uc_ix.items():
-        print(f"  - ({aid}, {role}) deps={uc.dependencies or '-'} cancels={uc.cancellation or '-'}")
+        log.debug("  - (%s, %s) deps=%s cancels=%s", aid, role, uc.dependencies or '-', uc.cancellation or '-')
 
 
 def _uc_key(uc: usecase) -> UCKey:
@@ -317,127 +488,58 @@ def build_uc_graph(ucs: List[usecase]) -> Tuple[
     Dict[UCKey, Set[UCKey]],             # cancels: uc -> set(uc keys it cancels)
     Dict[UCKey, Set[UCKey]]              # dependents: uc -> set(ucs that depend on it)
 ]:
-    uc_by_key: Dict[UCKey, usecase] = {}
-    for uc in ucs:
-        k = _uc_key(uc) # k=(uc.action.id, uc.role)
-        if k in uc_by_key:
-            raise ValueError(f"Duplicate use case key: {k}")
-        uc_by_key[k] = uc
-
-    deps: Dict[UCKey, Set[UCKey]] = {k: set() for k in uc_by_key}
-    cancels: Dict[UCKey, Set[UCKey]] = {k: set() for k in uc_by_key}
-    dependents: Dict[UCKey, Set[UCKey]] = {k: set() for k in uc_by_key}
-
-    # resolve dependency and cancellation pairs to UC keys
-    def _resolve_pairs(pairs: Iterable[Tuple[str, str]]) -> Set[UCKey]:
-        out = set()
-        for aid, role_name in pairs:
-            key = (aid, role_name)
-            if key not in uc_by_key:
-                print(f"Use case dependency/cancellation refers to unknown use case: {key}")
-                continue
-            out.add(key)
-        return out
-
-    for k, uc in uc_by_key.items():
-        # dependencies (prerequisites)
-        deps[k] = _resolve_pairs(uc.dependencies)
-        # cancellations
-        cancels[k] = _resolve_pairs(uc.cancellation)
-
-    # build reverse edges (dependents) for counting “satisfied dependencies” metric
-    for k, pres in deps.items():
-        for p in pres:
-            if p in dependents:
-                dependents[p].add(k)
+    # dict-of-sets view of the interned graph (uc_graph.UCGraph); unknown dependency /
+    # cancellation references are reported and dropped, duplicate keys raise ValueError
+    return UCGraph(ucs).to_dicts()
 
-    return uc_by_key, deps, cancels, dependents
+def analyse_uc_graph(ucs: List[usecase]) -> Dict[str, List]:
+    """
+    Cycles, cancellation conflicts, unreachable use cases and the parallel waves of
+    the use-case graph as (action_id, role) keys (see UCGraph.analyse). Problems are
+    logged as warnings; the widest wave bounds the parallelism of live execution.
+    """
+    g = UCGraph(ucs)
+    rep = g.analyse()
+    out = {
+        "cycles": [g.keys(c) for c in rep.cycles],
+        "conflicts": [(g.key(u), g.key(v)) for u, v in rep.conflicts],
+        "unreachable": g.keys(rep.unreachable),
+        "waves": [g.keys(w) for w in rep.waves],
+    }
+    for c in out["cycles"]:
+        log.warning("Dependency cycle: %s", " -> ".join(map(str, c)))
+    for u, v in out["conflicts"]:
+        log.warning("Cancellation conflict: %s cancels %s, which can then never run", u, v)
+    if out["unreachable"]:
+        log.warning("%d use cases can never run: %s", len(out["unreachable"]),
+                    ", ".join(map(str, out["unreachable"][:10])) + (" ..." if len(out["unreachable"]) > 10 else ""))
+    METRICS.inc("uc_waves", len(rep.waves))
+    log.info("Parallel plan: %d waves, at most %d use cases at once", len(rep.waves), rep.max_parallelism)
+    if log.isEnabledFor(logging.DEBUG):
+        for i, w in enumerate(out["waves"], 1):
+            log.debug("  wave %02d: %s", i, ", ".join(f"({a}, {r})" for a, r in w))
+    return out
 
 def traverse_use_case_graph(ucs: List[usecase]) -> List[UCKey]:
-    uc_by_key, deps, cancels, dependents = build_uc_graph(ucs)
-
-    all_keys: Set[UCKey] = set(uc_by_key.keys()) # UCKey=action.id, role and keys are all use cases
-    visited: Set[UCKey] = set()
-    canceled: Set[UCKey] = set()  # UCs removed due to cancellation
-    UCL: List[UCKey] = []
-
-    def is_available(k: UCKey) -> bool:
-        if k in visited or k in canceled:
-            return False
-        # available if all prereqs are visited (ignoring ones that were canceled)
-        needed = {p for p in deps[k] if p not in canceled} #k is UCKey where p is prereq UCKey and looks like {(action.id, role)} and deps[k] is set of prereq UCKeys for k and looks like {(action.id, role)}
-        return needed.issubset(visited)
-
-    def count_cancels(k: UCKey) -> int:
-        # how many *unvisited* UCs would be canceled if we execute k now
-        return len([x for x in cancels[k] if x in all_keys and x not in visited and x not in canceled])
-
-    def count_satisfied_deps(k: UCKey) -> int:
-        # how many remaining UCs currently have k as an unmet prerequisite
-        c = 0
-        for u in dependents.get(k, ()):
-            if u in visited or u in canceled:
-                continue
-            # If k is among dependencies and is not yet visited, executing k satisfies that edge.
-            if k in deps[u]:
-                c += 1
-        return c
-
-    # Initial availability
-    def gather_available() -> List[UCKey]:
-        return sorted([k for k in all_keys if is_available(k)], key=lambda t: (t[0], t[1]))
-
-    available = gather_available()
-
-    # Main loop
-    while True:
-        # stop when all remaining UCs are either visited or canceled
-        remaining = [k for k in all_keys if k not in visited and k not in canceled]
-        if not remaining:
-            break
-
-        # refresh available
-        available = gather_available()
-
-        if not available:
-            # No available UCs left but some remain -> inconsistent graph (e.g., circular deps or canceled prereqs).
-            # Strategy: pick any nonvisited UC with the smallest number of unmet deps (to make progress).
-            candidates = sorted(
-                remaining,
-                key=lambda k: (len([p for p in deps[k] if p not in visited]), k[0], k[1])
-            )
-            chosen = candidates[0]
-        else:
-            #   - minimize cancels
-            #   - maximize satisfied deps
-            #   - deterministic tiebreaker
-            def score(k: UCKey):
-                return (count_cancels(k), -count_satisfied_deps(k), k[0], k[1])
-
-            chosen = sorted(available, key=score)[0]
-
-        # "Execute" chosen UC: record, mark visited
-        UCL.append(chosen) # adding to UCL marks that it is executed
-        visited.add(chosen) # visited marks that it is executed
-
-        # applying cancellations made by chosen UC
-        for victim in cancels.get(chosen, ()):
-            if victim not in visited: # we check visited to avoid removing already executed UCs
-                canceled.add(victim)
-                for w in deps: # this step removes the canceled UC from dependencies of other UCs
-                    if victim in deps[w]:
-                        deps[w].discard(victim)
-
-        # Loop continues; availability recalculated at top
+    # Greedy rule, applied at every step to the live (unvisited, uncanceled) UCs whose
+    # prerequisites are all met:
+    #   - minimize cancels (of live UCs)
+    #   - maximize satisfied deps (live dependents)
+    #   - deterministic tiebreaker on (action_id, role)
+    # If none is available (circular deps), the UC with the fewest unmet deps is taken.
+    # A chosen UC cancels its live victims, which then count as met prerequisites.
+    # The scheduler runs on the interned graph with incremental counters and a lazy
+    # heap (see UCGraph.traverse).
+    g = UCGraph(ucs)
+    order = g.traverse()
+    METRICS.inc("use_cases", len(g))
+    METRICS.inc("use_cases_canceled", len(g) - len(order))
+    return g.keys(order)
 
-    return UCL
 def _render_template_static(s: str, ctx: Dict[str, str]) -> str:   #string with placeholders like {user_id}, {course_id}
     if not s:
         return s
-    out = s
-    for k, v in (ctx or {}).items():
-        out = out.replace("{" + k + "}", str(v))
-    return out
+    return compile_template(s).render(ctx)
 
 def _render_formdata_static(fields: Dict[str, str], ctx: Dict[str, str]) -> Dict[str, str]: # for POST-like form data
     data = {}
@@ -448,21 +550,43 @@ def _render_formdata_static(fields: Dict[str, str], ctx: Dict[str, str]) -> Dict
             data[k] = v
     return data
 
+_COMPILED_REQUESTS: Dict[Tuple[str, str, str, Tuple[Tuple[str, str], ...]], CompiledRequest] = {}
+
+def _compiled_request(a: Action) -> CompiledRequest:
+    """Endpoint/form templates of an action, compiled once and reused for every role and pass."""
+    req = a.HTTP_request
+    # the fields are part of the key: an action redefined under the same id must not hit a stale entry
+    key = (a.id, req.method, req.endpoint, tuple(sorted((k, repr(v)) for k, v in req.headers.items())))
+    cr = _COMPILED_REQUESTS.get(key)
+    if cr is None:
+        cr = _COMPILED_REQUESTS[key] = CompiledRequest(req.method, req.endpoint, req.headers)
+    return cr
+
+def _render_request(actionid: str, roleid: str,
+                    ctx: Optional[Dict[str, Dict[str, str]]] = None) -> Tuple[str, str, Dict[str, str]]:
+    """(method, rendered endpoint, rendered form data) for a use case; `ctx` defaults to CTX_DEFAULTS."""
+    cr = _compiled_request(ACTION_BY_ID[actionid])
+    endpoint, data = cr.render((CTX_DEFAULTS if ctx is None else ctx).get(roleid, {}))  # per-role params
+    return cr.method, endpoint, (data if cr.method != "GET" else {})
+
+def render_endpoint_column(actionid: str, column: str, values: Iterable[str], roleid: Optional[str] = None) -> List[str]:
+    """
+    Render an action's endpoint once per value of one placeholder, e.g. 100k user_id
+    candidates for view_profile. Other placeholders come from the role's CTX_DEFAULTS.
+    """
+    return _compiled_request(ACTION_BY_ID[actionid]).render_endpoints(
+        column, values, CTX_DEFAULTS.get(roleid, {}) if roleid else {})
+
 def traverse_ucl(ucl: List[UCKey], group1: Dict[str, User], group2: Dict[str, User]):
     exec_plan: List[Dict] = []
+    debug = log.isEnabledFor(logging.DEBUG)
     for (actionid, roleid) in ucl:
         if roleid not in group1:
             raise ValueError(f"Unknown role in UCL: {roleid}")
             continue
 
         user= group1[roleid]
-        cookies = dict(user.session.cookies)
-        action = ACTION_BY_ID[actionid]
-        ctx = dict(CTX_DEFAULTS.get(roleid, {}))  # per-role params
-
-        method = action.HTTP_request.method.upper()
-        endpoint = _render_template_static(action.HTTP_request.endpoint, ctx)
-        data = _render_formdata_static(action.HTTP_request.headers, ctx) if method != "GET" else {}
+        method, endpoint, data = _render_request(actionid, roleid)
 
         record = {
             "action_id": actionid,
@@ -474,20 +598,217 @@ def traverse_ucl(ucl: List[UCKey], group1: Dict[str, User], group2: Dict[str, Us
         }
         exec_plan.append(record)
 
-        print(f"Actions and roles ({actionid}, {roleid})")
-        print(f"    user1,i.id = {user.id}")
-        print(f"    METHOD     = {method}")
-        print(f"    ENDPOINT   = {endpoint}")
-        if method != "GET":
-            print(f"    FORM DATA  = {data or '-'}")
-        print()
+        if debug:
+            log.debug("Actions and roles (%s, %s)", actionid, roleid)
+            log.debug("    user1,i.id = %s", user.id)
+            log.debug("    METHOD     = %s", method)
+            log.debug("    ENDPOINT   = %s", endpoint)
+            if method != "GET":
+                log.debug("    FORM DATA  = %s", data or '-')
+            log.debug("")
 
+    log.info("Execution plan: %d requests", len(exec_plan))
     return exec_plan
 
+def execute_ucl_live(ucl: List[UCKey],
+                     group1: Dict[str, User],
+                     group2: Dict[str, User],
+                     base_url: str,
+                     max_workers: int = 8,
+                     timeout: float = 10.0,
+                     authenticated: Optional[Set[Tuple[str, str]]] = None,
+                     keep_sessions: bool = False,
+                     checkpoint=None,
+                     ctx: Optional[Dict[str, Dict[str, str]]] = None,
+                     extra_groups: Optional[Dict[str, Dict[str, User]]] = None) -> List[Dict]:
+    """
+    Send the UCL for real with each user's session, for both groups.
+    Independent use cases run concurrently (see live_executor); requests of one
+    user's session stay in UCL order. `extra_groups` {label: {role: User}} (further
+    users per role, see user_slots) run the whole UCL as well, each in its own session.
+    `authenticated` {(group, role)} already hold a valid session (see
+    restore_authenticated): their login use cases are not sent. With
+    `keep_sessions`, logout use cases are not sent either, so cached sessions stay valid.
+    With a `checkpoint` (checkpoint.Checkpoint) every completed use case and the
+    user's session after it are journaled; use cases its resume state already has
+    are not sent again. `ctx` replaces CTX_DEFAULTS (per-target context).
+    """
+    from live_executor import ucl_predecessors, run_ucl_concurrent
+    from ratecontrol import use_budget
+
+    _, deps, cancels, _ = build_uc_graph(USE_CASES)
+    preds = ucl_predecessors(ucl, deps, cancels)
+    base = base_url.rstrip("/")
+    done = checkpoint.state.ucs if checkpoint is not None else {}
+    if checkpoint is not None:
+        from auth_cache import session_state
+
+    def send(label: str, user: User, k: UCKey) -> Dict:
+        actionid, roleid = k
+        if (label, k) in done:
+            return dict(done[(label, k)], resumed=True)
+        method, endpoint, data = _render_request(actionid, roleid, ctx)
+        if (actionid == LOGIN_ACTION and (label, roleid) in (authenticated or ())) or \
+                (actionid == LOGOUT_ACTION and keep_sessions):
+            return {"group": label, "action_id": actionid, "role": roleid, "user_id": user.id,
+                    "method": method, "endpoint_rendered": endpoint, "status": None, "skipped": True, "reason": "cached session"}
+        # rate-control budget follows the action's declared type, not just its method
+        with use_budget(ACTION_BY_ID[actionid].type):
+            resp = user.session.request(method, base + endpoint, data=data or None,
+                                        timeout=timeout, allow_redirects=False)
+        rec = {
+            "group": label,
+            "action_id": actionid,
+            "role": roleid,
+            "user_id": user.id,
+            "method": method,
+            "endpoint_rendered": endpoint,
+            "status": resp.status_code,
+            "length": len(resp.content),
+        }
+        if checkpoint is not None:
+            checkpoint.record("uc", g=label, a=actionid, r=roleid, result=rec)
+            checkpoint.record_session(label, roleid, session_state(user.session))
+        return rec
+
+    groups = {"G1": group1, "G2": group2, **(extra_groups or {})}
+    results = run_ucl_concurrent(ucl, preds, groups, send, max_workers=max_workers)
+    errors = skipped = resumed = 0
+    for r in results:
+        if r.get("resumed"):
+            resumed += 1
+        elif "error" in r:
+            errors += 1
+            log.warning("  %s (%s, %s) ERROR %s", r['group'], r['action_id'], r['role'], r['error'])
+        elif r.get("skipped"):
+            skipped += 1
+            log.debug("  %s (%s, %s) skipped (%s)", r['group'], r['action_id'], r['role'], r.get('reason'))
+        else:
+            log.debug("  %s (%s, %s) %s %s -> %s", r['group'], r['action_id'], r['role'],
+                      r['method'], r['endpoint_rendered'], r['status'])
+    sent = len(results) - errors - skipped - resumed
+    METRICS.inc("ucl_requests", sent)
+    METRICS.inc("ucl_errors", errors)
+    METRICS.inc("ucl_skipped", skipped)
+    METRICS.inc("ucl_resumed", resumed)
+    log.info("Live UCL: %d requests, %d errors, %d skipped, %d done before resume", sent, errors, skipped, resumed)
+    return results
+
+# Authenticated sessions (see auth_cache.py): logins are reused across scans and
+# redone transparently when the target drops a session mid-scan.
+LOGIN_ACTION = "login"
+LOGOUT_ACTION = "logout"
+
+def _has_login(role_name: str) -> bool:
+    return any(uc.role == role_name and uc.action.id == LOGIN_ACTION for uc in USE_CASES)
+
+def _probe_path(role_name: str) -> str:
+    """A cheap page the role only sees when logged in: its first GET use case that needs the login."""
+    for uc in USE_CASES:
+        if uc.role == role_name and _is_state_preserving(uc.action) and (LOGIN_ACTION, role_name) in uc.dependencies:
+            return _render_request(uc.action.id, role_name)[1]
+    return "/"
+
+def _session_expired(resp) -> bool:
+    if resp.status_code == 401:
+        return True
+    return 300 <= resp.status_code < 400 and "login" in (resp.headers.get("Location") or "").lower()
+
+def login_user(user: User, base_url: str, timeout: float = 10.0) -> bool:
+    """Send the role's login use case with the user's session; True on success."""
+    method, endpoint, data = _render_request(LOGIN_ACTION, user.role.name)
+    resp = user.session.request(method, base_url.rstrip("/") + endpoint, data=data or None,
+                                timeout=timeout, allow_redirects=False)
+    METRICS.inc("logins", ok=resp.status_code < 400)
+    return resp.status_code < 400 and not _session_expired(resp)
+
+def probe_session(user: User, base_url: str, timeout: float = 10.0) -> bool:
+    resp = user.session.get(base_url.rstrip("/") + _probe_path(user.role.name), timeout=timeout, allow_redirects=False)
+    resp.close()
+    return resp.status_code < 400 and not _session_expired(resp)
+
+def restore_authenticated(groups: Dict[str, Dict[str, User]], base_url: str, cache) -> Set[Tuple[str, str]]:
+    """Load cached sessions into the users and keep those a probe request accepts."""
+    from auth_cache import restore_session
+
+    ok: Set[Tuple[str, str]] = set()
+    for label, group in groups.items():
+        for rname, user in group.items():
+            if not _has_login(rname):
+                continue
+            entry = cache.get(base_url, rname, label)
+            if entry is None:
+                METRICS.inc("auth_cache", result="miss")
+                continue
+            restore_session(user.session, entry)
+            if probe_session(user, base_url):
+                ok.add((label, rname))
+                METRICS.inc("auth_cache", result="hit")
+            else:
+                cache.drop(base_url, rname, label)
+                METRICS.inc("auth_cache", result="stale")
+    log.info("[Auth] %d sessions restored from cache", len(ok))
+    return ok
+
+def cache_authenticated(groups: Dict[str, Dict[str, User]], base_url: str, cache, results: List[Dict]) -> None:
+    """Store the sessions of users whose login use case succeeded in this run."""
+    from auth_cache import session_state
+
+    for r in results:
+        if r["action_id"] == LOGIN_ACTION and r.get("status") is not None and r["status"] < 400:
+            user = groups[r["group"]][r["role"]]
+            cache.put(base_url, r["role"], r["group"], **session_state(user.session))
+
+def enable_reauth(user: User, label: str, base_url: str, cache=None, recheck: float = 5.0) -> None:
+    """
+    Response hook on the user's session: on 401 / redirect to the login page, check
+    with a probe whether the session is really gone (a 401 can be a plain denial),
+    log in again once, update the cache and resend the request. A successful probe is
+    trusted for `recheck` seconds, so denied replays do not each cost a probe.
+    """
+    import threading
+    from auth_cache import session_state
+    from requests.cookies import get_cookie_header
+
+    lock = threading.Lock()
+    state = {"verified": 0.0}
+    login_path = _render_request(LOGIN_ACTION, user.role.name)[1]
+    session = user.session
+
+    def hook(resp, **kwargs):
+        req = resp.request
+        if getattr(req, "_idor_reauth", False) or not _session_expired(resp):
+            return None
+        if req.path_url.split("?", 1)[0] in (login_path, _probe_path(user.role.name)):
+            return None
+        with lock:
+            if get_cookie_header(session.cookies, req) == req.headers.get("Cookie"):
+                # nobody refreshed the session since this request was sent
+                if time.monotonic() - state["verified"] < recheck or probe_session(user, base_url):
+                    state["verified"] = time.monotonic()
+                    return None  # the session is fine: a real access denial
+                if not login_user(user, base_url):
+                    log.warning("[Auth] re-login failed for %s/%s", label, user.role.name)
+                    return None
+                METRICS.inc("auth_refresh")
+                log.info("[Auth] session of %s/%s expired, logged in again", label, user.role.name)
+                state["verified"] = time.monotonic()
+                if cache is not None:
+                    cache.put(base_url, user.role.name, label, **session_state(session))
+        retry = req.copy()
+        retry._idor_reauth = True
+        retry.headers.pop("Cookie", None)
+        retry.prepare_cookies(session.cookies)
+        kwargs.pop("allow_redirects", None)
+        return session.send(retry, allow_redirects=False, **kwargs)
+
+    session.hooks["response"].append(hook)
+
 def _is_state_preserving(a: Action) -> bool:
     return a.type == "state-preserving" and a.HTTP_request.method.upper() == "GET"
 
-def build_crawl_seeds_static_for_role(ucl: List[UCKey], role_name: str) -> List[str]:
+def build_crawl_seeds_static_for_role(ucl: List[UCKey], role_name: str,
+                                     ctx: Optional[Dict[str, Dict[str, str]]] = None) -> List[str]:
     """
     From the UCL, pick only this role's state-preserving actions and render their endpoints.
     (No network; this is just the set of URLs we'd crawl.)
@@ -499,7 +820,7 @@ def build_crawl_seeds_static_for_role(ucl: List[UCKey], role_name: str) -> List[
         a = ACTION_BY_ID[actionid]
         if not _is_state_preserving(a):
             continue
-        ep = _render_template_static(a.HTTP_request.endpoint, dict(CTX_DEFAULTS.get(role_name, {})))
+        ep, _ = _compiled_request(a).render((CTX_DEFAULTS if ctx is None else ctx).get(role_name, {}))
         seeds.append(ep)
     # include a root seed (common start point)
     if "/" not in seeds:
@@ -509,28 +830,83 @@ def build_crawl_seeds_static_for_role(ucl: List[UCKey], role_name: str) -> List[
 
 def execute_state_preserving(ucl: List[UCKey],
                      group1: Dict[str, User],
-                     group2: Dict[str, User]) -> Dict[Tuple[str, str], List[str]]:
-    
+                     group2: Dict[str, User],
+                     base_url: Optional[str] = None,
+                     budget=None,
+                     bodies=None,
+                     checkpoint=None,
+                     ctx: Optional[Dict[str, Dict[str, str]]] = None,
+                     store=None) -> Dict[Tuple[str, str], List[str]]:
+    """
+    Sitemap per (group, role). Without `base_url` the sitemap is just the rendered
+    crawl seeds; with it, every (group, role) is crawled concurrently from its seeds
+    using that user's session (see crawler.CrawlBudget for `budget`).
+    With `bodies` (body_store.BodyStore) the crawled pages are kept on disk by content hash.
+    With a `checkpoint`, crawled pages are journaled; finished crawls of its resume
+    state are reused and interrupted ones continue from their recorded frontier.
+    `ctx` replaces CTX_DEFAULTS for rendering the seeds.
+    With a `store` (scan_store.ScanStore), pages are fetched conditionally against
+    the validators of the last crawl; unchanged pages reuse their recorded links.
+    """
     sitemaps: Dict[Tuple[str, str], List[str]] = {}
-
-    # Group 1
-    for role_name in group1.keys():
-        seeds = build_crawl_seeds_static_for_role(ucl, role_name)
-        sitemaps[("G1", role_name)] = seeds
-        print(f" G1:{role_name} crawl seeds ({len(seeds)}):")
-        for s in seeds:
-            print(f"   - {s}")
-        print()
-
-    # Group 2 
-    for role_name in group2.keys():
-        seeds = build_crawl_seeds_static_for_role(ucl, role_name)
-        sitemaps[("G2", role_name)] = seeds
-        print(f" G2:{role_name} crawl seeds ({len(seeds)}):")
-        for s in seeds:
-            print(f"   - {s}")
-        print()
-
+    jobs: Dict[Tuple[str, str], Tuple["requests.Session", List[str]]] = {}
+
+    for label, group in (("G1", group1), ("G2", group2)):
+        for role_name, user in group.items():
+            jobs[(label, role_name)] = (user.session, build_crawl_seeds_static_for_role(ucl, role_name, ctx))
+
+    if base_url is None:
+        debug = log.isEnabledFor(logging.DEBUG)
+        for (label, role_name), (_, seeds) in jobs.items():
+            sitemaps[(label, role_name)] = seeds
+            if debug:
+                log.debug(" %s:%s crawl seeds (%d):", label, role_name, len(seeds))
+                for s in seeds:
+                    log.debug("   - %s", s)
+                log.debug("")
+        log.info("Sitemaps: %d (group, role) seed lists, %d URLs",
+                 len(sitemaps), sum(len(v) for v in sitemaps.values()))
+        return sitemaps
+
+    import asyncio
+    from crawler import crawl_all
+
+    hooks = {}
+    if checkpoint is not None:
+        from auth_cache import session_state
+
+        state = checkpoint.state
+        for key in [k for k in jobs if k in state.crawled]:
+            del jobs[key]
+            sitemaps[key] = state.crawled[key]["sitemap"]
+            log.info(" %s:%s crawl done before resume, sitemap %d", key[0], key[1], len(sitemaps[key]))
+
+        def on_page(key, path, depth, ok, links):
+            checkpoint.record("page", g=key[0], r=key[1], path=path, depth=depth, ok=ok, links=links)
+
+        def on_done(key, res):
+            checkpoint.record("crawled", g=key[0], r=key[1], sitemap=res["sitemap"], stats=res["stats"])
+            user = (group1 if key[0] == "G1" else group2)[key[1]]
+            checkpoint.record_session(key[0], key[1], session_state(user.session))
+
+        resume = {k: r for k in jobs for r in (state.crawl_resume(k),) if r is not None}
+        hooks = dict(on_page=on_page, on_done=on_done, resume=resume)
+
+    if store is not None:
+        hooks["validators"] = {k: store.get_pages(base_url, k[0], k[1]) for k in jobs}
+
+    results = asyncio.run(crawl_all(jobs, base_url, budget=budget, bodies=bodies, **hooks))
+    if store is not None:
+        for key, pages in hooks["validators"].items():
+            store.put_pages(base_url, key[0], key[1], pages)
+    for key, res in results.items():
+        sitemaps[key] = res["sitemap"]
+        st = res["stats"]
+        METRICS.inc("crawl_pages", st["fetched"])
+        METRICS.inc("crawl_errors", st["errors"])
+        log.info(" %s:%s crawled %d pages (%d unchanged), sitemap %d (errors=%d, dropped=%d)", key[0], key[1],
+                 st['fetched'], st['not_modified'], len(res['sitemap']), st['errors'],
+                 st['dropped_frontier'] + st['dropped_template'])
     return sitemaps
 
 def role_not_less_privileged(r1: role, r2: role) -> bool:
@@ -538,47 +914,104 @@ def role_not_less_privileged(r1: role, r2: role) -> bool:
     return r1.rank >= r2.rank
 
 def _extract_numeric(path: str) -> Optional[str]:
-    import re
-    m = re.search(r"/(\d+)(?:/|$)", path)
-    return m.group(1) if m else None
+    return first_id(path, "id")
 
-def _heuristic_flags(url: str, attacker_role: str) -> List[str]:
-    flags: List[str] = []
+# Flag rules are data (rules.DEFAULT_RULES, or a JSON file via --rules); compiled once.
+HEURISTIC_RULES = RuleSet(DEFAULT_RULES)
 
-    # Admin namespace seen by non-admin
-    if url.startswith("/admin") and attacker_role != "Admin":
-        flags.append("admin_namespace_visible")
-
-    # Other users' profile paths (/users/{id}) seen by non-admin
-    if url.startswith("/users/") and attacker_role != "Admin":
-        uid_in_url = _extract_numeric(url)
-        atk_uid = CTX_DEFAULTS.get(attacker_role, {}).get("user_id")
-        # if we can tell it's not the attacker's own id (or no id known), flag it
-        if uid_in_url and (atk_uid is None or str(uid_in_url) != str(atk_uid)):
-            flags.append("cross_user_profile_candidate")
-
-    # Instructor-only resources visible to Student
-    if "/instructor/" in url and attacker_role == "Student":
-        flags.append("instructor_area_visible")
-
-    # Invoice artifacts visible to non-admin
-    if "/billing/invoices/" in url and attacker_role != "Admin":
-        flags.append("billing_artifact_visible")
+def _heuristic_flags(url: str, attacker_role: str) -> List[str]:
+    return HEURISTIC_RULES.flags(url, attacker_role, CTX_DEFAULTS.get(attacker_role, {}))
 
-    # Gradebook endpoints visible to non-instructor
-    if url.endswith("/grades") and "/instructor/" in url and attacker_role not in ("Admin", "Instructor"):
-        flags.append("gradebook_visible")
+def _flag_candidates(role1_name: str, role2_name: str, candidates: List[str],
+                     ctx: Optional[Dict[str, Dict[str, str]]] = None) -> Tuple[int, List[Dict]]:
+    """
+    (number of candidates, findings) of one (victim, attacker) pair, from its Step 14
+    candidates sorted(sm1 - sm2) (see sitemap_sets.SitemapIndex).
+    """
+    pair_findings: List[Dict] = []
+    if not candidates:
+        return 0, pair_findings
+
+    # Step 14 (static): 'try' by applying heuristics to the candidate URLs
+    all_flags = HEURISTIC_RULES.classify(candidates, role2_name,
+                                         (CTX_DEFAULTS if ctx is None else ctx).get(role2_name, {}))
+    for url, flags in zip(candidates, all_flags):
+        if not flags:
+            continue
 
-    return flags
+        pair_findings.append({
+            "attacker_role": role2_name,
+            "victim_role": role1_name,
+            "url": url,
+            "flags": flags,
+            "confidence": HEURISTIC_RULES.confidence(flags),
+        })
+    return len(candidates), pair_findings
+
+def _sharded_pairs(pairs: List[Tuple[str, str]],
+                   sitemaps: Dict[Tuple[str, str], List[str]],
+                   processes: Optional[int],
+                   ctx: Optional[Dict[str, Dict[str, str]]] = None) -> Iterable[Tuple[Tuple[str, str], int, List[Dict]]]:
+    """
+    (pair, number of candidates, findings) for every pair, as the single-process path
+    (SitemapIndex + _flag_candidates) gives them, computed by a process pool (see sharding.py).
+    """
+    from sharding import sharded_differential
+
+    ctx = CTX_DEFAULTS if ctx is None else ctx
+    role_ctx = {r2: ctx.get(r2, {}) for _, r2 in pairs}
+    current, n, found = None, 0, []
+    for unit, n_cands, unit_findings in sharded_differential(sitemaps, pairs, HEURISTIC_RULES.rules, role_ctx, processes):
+        pair = (unit[1], unit[2])
+        if pair != current:
+            if current is not None:
+                yield current, n, found
+            current, n, found = pair, 0, []
+        n += n_cands
+        found.extend(unit_findings)
+    if current is not None:
+        yield current, n, found
 
 def differential_analysis(sitemaps: Dict[Tuple[str, str], List[str]],
                              group1: Dict[str, User],
-                             group2: Dict[str, User]) -> List[Dict]:
-    
+                             group2: Dict[str, User],
+                             base_url: Optional[str] = None,
+                             store=None,
+                             processes: Optional[int] = None,
+                             bodies=None,
+                             checkpoint=None,
+                             ctx: Optional[Dict[str, Dict[str, str]]] = None,
+                             sink=None) -> List[Dict]:
+    """
+    Static differential analysis over the sitemaps. With `base_url`, every flagged
+    URL is also replayed with the victim (G1) and attacker (G2) sessions and the
+    findings carry the replay verdict (see replay.compare).
+    With a `store` (scan_store.ScanStore), role pairs whose two sitemaps are unchanged
+    since the last run reuse their stored findings instead of being re-analysed.
+    With `processes`, pairs are sharded over a process pool (sharding.py); the
+    findings and their order are the same as in a single process.
+    `bodies` (body_store.BodyStore) keeps the replayed bodies on disk, see replay_findings.
+    With a `checkpoint`, the findings of every pair and every replay fetch are
+    journaled, and pairs/fetches of its resume state are not computed again.
+    `ctx` replaces CTX_DEFAULTS for the heuristic rules (per-target context).
+    In a single process the candidate URLs of all pairs come from one interned index
+    of the sitemaps (sitemap_sets.SitemapIndex), a victim against all its attackers at once.
+    With a `sink` (findings_sink.FindingAggregator), pairs are analysed one at a time
+    and their findings go to the sink instead of the returned list, so only the
+    aggregated issues stay in memory. Replay needs all findings at once: with
+    `base_url` they are still collected, replayed, then emitted and returned.
+    """
     findings: List[Dict] = []
     roles_ix = index_roles(ROLES)
-
-    print("\n[Steps 9–17: STATIC DIFFERENTIAL ANALYSIS]")
+    cfg = config_hash_current() if store is not None else None
+    digests: Dict[Tuple[str, str], str] = {}
+    if store is not None:
+        for (label, rname), urls in sitemaps.items():
+            digests[(label, rname)], _ = store.put_sitemap(cfg, label, rname, urls)
+
+    log.info("\n[Steps 9–17: STATIC DIFFERENTIAL ANALYSIS]")
+    pairs: List[Tuple[str, str]] = []
+    cached: Dict[Tuple[str, str], List[Dict]] = {}
     for role1_name, r1 in roles_ix.items():
         for role2_name, r2 in roles_ix.items():
             # only if role1 is not less privileged than role2
@@ -591,72 +1024,500 @@ def differential_analysis(sitemaps: Dict[Tuple[str, str], List[str]],
             if user1 is None or user2 is None:
                 continue
 
-            # sitemaps from Step 8
-            sm1 = set(sitemaps.get(("G1", role1_name), []))
-            sm2 = set(sitemaps.get(("G2", role2_name), []))
-
-            # Step 14: candidates = sm1 \ sm2
-            candidates = sorted(sm1 - sm2)
-            if not candidates:
-                continue
+            if checkpoint is not None and (role1_name, role2_name) in checkpoint.state.pairs:
+                cached[(role1_name, role2_name)] = checkpoint.state.pairs[(role1_name, role2_name)]
+            elif store is not None:
+                hit = store.get_pair_findings(cfg, role1_name, role2_name,
+                                              digests.get(("G1", role1_name), ""), digests.get(("G2", role2_name), ""))
+                if hit is not None:
+                    cached[(role1_name, role2_name)] = hit
+            pairs.append((role1_name, role2_name))
+
+    todo = [p for p in pairs if p not in cached]
+    if processes:
+        results = _sharded_pairs(todo, sitemaps, processes, ctx)
+    elif todo:
+        # every sitemap interned once, all attackers of a victim diffed in one pass
+        from sitemap_sets import SitemapIndex
+
+        index = SitemapIndex(sitemaps, [("G1", v) for v, _ in todo] + [("G2", a) for _, a in todo])
+        results = ((p, *_flag_candidates(p[0], p[1], cands, ctx)) for p, cands in index.differences(todo))
+    else:
+        results = iter(())
+    # results come in `todo` order (pairs without candidates may be missing), so they
+    # are consumed one pair at a time instead of being collected first
+    results = iter(results)
+    pending = next(results, None)
+    keep = sink is None or bool(base_url)
+    total = 0
+
+    def collect(pair_findings: List[Dict]) -> None:
+        nonlocal total
+        total += len(pair_findings)
+        for f in pair_findings:
+            METRICS.inc("findings", confidence=f["confidence"])
+        if keep:
+            findings.extend(pair_findings)
+        else:
+            sink.emit_all(pair_findings)
+
+    for pair in pairs:
+        role1_name, role2_name = pair
+        if pair in cached:
+            collect(cached[pair])
+            if cached[pair]:
+                log.info("  Pair: %s (priv) → %s (attacker) | unchanged, %d stored findings",
+                         role1_name, role2_name, len(cached[pair]))
+            continue
+        n_candidates, pair_findings = 0, []
+        if pending is not None and pending[0] == pair:
+            _, n_candidates, pair_findings = pending
+            pending = next(results, None)
+        if checkpoint is not None:
+            checkpoint.record("pair", v=role1_name, a=role2_name, findings=pair_findings)
+        if store is not None:
+            store.put_pair_findings(cfg, role1_name, role2_name, digests.get(("G1", role1_name), ""),
+                                    digests.get(("G2", role2_name), ""), pair_findings)
+        if not n_candidates:
+            continue
 
-            print(f"  Pair: {role1_name} (priv) → {role2_name} (attacker) | candidates: {len(candidates)}")
-
-            for url in candidates:
-                # Step 14 (static): 'try' by applying heuristics to the candidate URL
-                flags = _heuristic_flags(url, attacker_role=role2_name)
-                if not flags:
-                    continue
-
-                finding = {
-                    "attacker_role": role2_name,
-                    "victim_role": role1_name,
-                    "url": url,
-                    "flags": flags,
-                    "confidence": ("high" if "admin_namespace_visible" in flags
-                                   else "medium" if any(f in flags for f in (
-                                       "cross_user_profile_candidate",
-                                       "billing_artifact_visible",
-                                       "gradebook_visible",
-                                       "instructor_area_visible"
-                                   )) else "low"),
-                }
-                findings.append(finding)
-                # record as an authorization flaw (here: append + print)
-                print(f"    -> FLAGGED: attacker={role2_name} victim={role1_name} url={url} flags={flags}")
-
-    if not findings:
-        print("  No potential flaws flagged in static analysis.")
+        METRICS.inc("candidates", n_candidates)
+        log.info("  Pair: %s (priv) → %s (attacker) | candidates: %d, flagged: %d",
+                 role1_name, role2_name, n_candidates, len(pair_findings))
+        if log.isEnabledFor(logging.DEBUG):
+            for finding in pair_findings:
+                log.debug("    -> FLAGGED: attacker=%s victim=%s url=%s flags=%s",
+                          role2_name, role1_name, finding['url'], finding['flags'])
+        collect(pair_findings)
+
+    if not total:
+        log.info("  No potential flaws flagged in static analysis.")
     else:
-        print(f"\n[Summary] Potential findings: {len(findings)}")
+        log.info("\n[Summary] Potential findings: %d", total)
+
+    if base_url and findings:
+        replay_findings(findings, group1, group2, base_url, store=store, bodies=bodies, checkpoint=checkpoint)
+    if sink is not None and keep:
+        sink.emit_all(findings)
+
+    return findings
 
+def replay_findings(findings: List[Dict],
+                    group1: Dict[str, User],
+                    group2: Dict[str, User],
+                    base_url: str,
+                    max_workers: int = 16,
+                    store=None,
+                    bodies=None,
+                    checkpoint=None) -> List[Dict]:
+    """
+    Replay each finding's URL with victim and attacker sessions and attach the result.
+    Confirmed findings get confidence "confirmed", denied ones drop to "refuted".
+    With a `store`, fingerprints of the previous run make the requests conditional
+    (ETag / Last-Modified) and unchanged responses are not downloaded again.
+    With `bodies` (body_store.BodyStore) the bodies are streamed to disk, identical
+    ones stored once; the replay record carries their sha256.
+    With a `checkpoint`, fetches are journaled and those done before a resume are reused.
+    """
+    from replay import replay
+
+    sessions = {("G1", n): u.session for n, u in group1.items()}
+    sessions.update({("G2", n): u.session for n, u in group2.items()})
+    cands = [(f["victim_role"], f["attacker_role"], f["url"]) for f in findings]
+    fps = None
+    if store is not None:
+        keys = {("G1", v, u) for v, _, u in cands} | {("G2", a, u) for _, a, u in cands}
+        fps = store.get_fingerprints(base_url, keys)
+    hooks = {}
+    if checkpoint is not None:
+        hooks = dict(done=checkpoint.state.fetches,
+                     on_fetch=lambda job, fp: checkpoint.record("fetch", g=job[0], r=job[1], url=job[2], fp=fp))
+    results = replay(cands, sessions, base_url, max_workers=max_workers, fingerprints=fps, bodies=bodies, **hooks)
+    if store is not None:
+        store.put_fingerprints(base_url, fps)
+
+    counts: Dict[str, int] = {}
+    unchanged = 0
+    for f, r in zip(findings, results):
+        unchanged += r["unchanged"]
+        f["replay"] = {k: r[k] for k in ("verdict", "victim", "attacker", "simhash_distance")}
+        if r["verdict"] == "confirmed":
+            f["confidence"] = "confirmed"
+        elif r["verdict"] == "denied":
+            f["confidence"] = "refuted"
+        counts[r["verdict"]] = counts.get(r["verdict"], 0) + 1
+
+    for verdict, n in counts.items():
+        METRICS.inc("replay_verdicts", n, verdict=verdict)
+    log.info("[Replay] %d candidates (%d unchanged): %s", len(results), unchanged,
+             ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+    for f in findings:
+        if f["confidence"] == "confirmed":
+            log.info("    -> CONFIRMED: attacker=%s victim=%s url=%s", f['attacker_role'], f['victim_role'], f['url'],
+                     extra={"fields": {"finding": f}})
     return findings
 
+def enumerate_object_ids(attacker: User,
+                         base_url: str,
+                         budget=None,
+                         observed: Optional[Dict[str, Dict[str, List[str]]]] = None) -> List[Dict]:
+    """
+    Sweep the ID spaces of every templated state-preserving action with the
+    attacker's session (see enumeration.py). Candidate spaces come from the values
+    of each placeholder in CTX_DEFAULTS (all roles) and, if given, `observed`
+    {action_id: {placeholder: [values]}} from captures. One summary per space.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from enumeration import EnumBudget, derive_spaces, enumerate_space
+
+    budget = budget or EnumBudget()
+    base = base_url.rstrip("/")
+    ctx = CTX_DEFAULTS.get(attacker.role.name, {})
+    summaries: List[Dict] = []
+    log.info("\n[ID enumeration] attacker=%s", attacker.role.name)
+    with ThreadPoolExecutor(max_workers=budget.workers) as pool:
+        for a in ACTIONS:
+            if not _is_state_preserving(a):
+                continue
+            endpoint = _compiled_request(a).endpoint
+            for name in endpoint.names:
+                values = [c[name] for c in CTX_DEFAULTS.values() if name in c]
+                values += (observed or {}).get(a.id, {}).get(name, [])
+                fmt = base + endpoint.format_string(name, ctx)
+                for space in derive_spaces(values, max_ids=budget.max_ids, radius=budget.radius):
+                    def hit(value: str, fp: Dict, a=a) -> None:
+                        log.info("    -> ACCESSIBLE: attacker=%s action=%s id=%s status=%s length=%s",
+                                 attacker.role.name, a.id, value, fp["status"], fp["length"])
+                    st = enumerate_space(attacker.session, fmt.format, space, budget, pool=pool, on_hit=hit)
+                    st.update(action_id=a.id, placeholder=name, attacker_role=attacker.role.name)
+                    summaries.append(st)
+                    METRICS.inc("enum_probes", st["probed"], action=a.id)
+                    METRICS.inc("enum_accessible", st["accessible"], action=a.id)
+                    log.info("  %s {%s} %s: %d candidates, %d probed, %d skipped, %d accessible "
+                             "(%d distinct)%s", a.id, name, space.pattern, st["candidates"], st["probed"],
+                             st["skipped"], st["accessible"], st["distinct"],
+                             ", stopped early" if st["stopped_early"] else "")
+    return summaries
+
+# Multi-tenant runs: the model and the UCL are planned once, every target gets its
+# own sessions, rate controller and results; a shared gate bounds the requests in
+# flight across all targets.
+def scan_target(target, ucl: List[UCKey], gate=None, workers: int = 8,
+                max_concurrency: int = 64, rate_control: bool = True) -> Dict:
+    """
+    Live UCL execution, crawl and differential analysis of one targets.Target.
+    Findings are aggregated per issue (findings_sink.FindingAggregator).
+    Without `rate_control` no adaptive per-host window is used (as --no-rate-control);
+    the shared `gate` still caps the requests in flight.
+    """
+    from findings_sink import FindingAggregator
+    from ratecontrol import RateController
+    from sessions import SessionManager
+
+    ctx = target.context(CTX_DEFAULTS)
+    workers = target.workers or workers
+    rate = RateController(gate=gate, maximum=max_concurrency) if rate_control else None
+    manager = SessionManager(pool_maxsize=max(64, 2 * workers), controller=rate,
+                             on_response=METRICS.record_response, gate=gate)
+    t0 = time.perf_counter()
+    try:
+        groups = {}
+        for label in ("G1", "G2"):
+            groups[label] = {
+                r.name: _create_user_for_role(role(r.name, r.rank, dict(target.cookies.get(r.name, r.cookies))),
+                                              label, manager)
+                for r in ROLES
+            }
+        g1, g2 = groups["G1"], groups["G2"]
+        live = execute_ucl_live(ucl, g1, g2, target.base_url, max_workers=workers, ctx=ctx)
+        sitemaps = execute_state_preserving(ucl, g1, g2, base_url=target.base_url, ctx=ctx)
+        issues = FindingAggregator()
+        differential_analysis(sitemaps, g1, g2, base_url=target.base_url, ctx=ctx, sink=issues)
+    finally:
+        manager.close()
+    return {
+        "target": target.name,
+        "base_url": target.base_url,
+        "ucl_requests": sum(1 for r in live if "error" not in r and not r.get("skipped")),
+        "ucl_errors": sum(1 for r in live if "error" in r),
+        "ucl_skipped": sum(1 for r in live if r.get("skipped")),
+        "sitemap_urls": sum(len(v) for v in sitemaps.values()),
+        "findings": issues.total,
+        "issues": issues.sorted_groups(),
+        "rate": rate.snapshot() if rate is not None else {},
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+def scan_targets(targets: List, ucl: List[UCKey], total_workers: int = 64, parallel: Optional[int] = None,
+                 workers: int = 8, max_concurrency: int = 64, rate_control: bool = True) -> Dict[str, Dict]:
+    """
+    Scan every target concurrently (`parallel` at a time, default all) with at most
+    `total_workers` requests in flight overall. A failing target does not stop the
+    others; its result is {"target", "base_url", "error"}. Results are keyed by name.
+    """
+    import threading
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    gate = threading.BoundedSemaphore(total_workers)
+    results: Dict[str, Dict] = {}
+    log.info("\n[Targets] %d targets, %d in parallel, %d requests in flight at most",
+             len(targets), parallel or len(targets), total_workers)
+    with ThreadPoolExecutor(max_workers=parallel or len(targets)) as pool:
+        futs = {pool.submit(scan_target, t, ucl, gate, workers, max_concurrency, rate_control): t for t in targets}
+        for fut in as_completed(futs):
+            t = futs[fut]
+            try:
+                res = results[t.name] = fut.result()
+            except Exception as e:
+                results[t.name] = {"target": t.name, "base_url": t.base_url, "error": repr(e)}
+                METRICS.inc("targets", ok=False)
+                log.error("[Targets] %s failed: %r", t.name, e)
+                continue
+            METRICS.inc("targets", ok=True)
+            log.info("[Targets] %s done in %.1fs: %d UCL requests, %d URLs, %d findings in %d issues "
+                     "(%d confirmed)", t.name, res["seconds"], res["ucl_requests"], res["sitemap_urls"],
+                     res["findings"], len(res["issues"]),
+                     sum(g["confidence"] == "confirmed" for g in res["issues"]))
+    return {t.name: results[t.name] for t in targets}
+
+def config_hash_current() -> str:
+    """Hash of everything that shapes a scan: roles, actions, use cases, ctx defaults, rules."""
+    from dataclasses import asdict
+    from scan_store import config_hash
+
+    return config_hash([asdict(r) for r in ROLES], [asdict(a) for a in ACTIONS],
+                       [asdict(u) for u in USE_CASES], CTX_DEFAULTS, HEURISTIC_RULES.rules)
+
 def print_ucl(ucl: List[UCKey]) -> None:
-    print("\nUse Case Execution List (UCL):")
-    for i, (aid, rname) in enumerate(ucl, 1):
-        print(f"  {i:02d}. ({aid}, {rname})")
+    log.info("\nUse Case Execution List (UCL): %d use cases", len(ucl))
+    if log.isEnabledFor(logging.DEBUG):
+        for i, (aid, rname) in enumerate(ucl, 1):
+            log.debug("  %02d. (%s, %s)", i, aid, rname)
         
 if __name__ == "__main__":
-    enumerate_all()
+    import argparse
+    import json
+    import os
+    import sys
+    ap = argparse.ArgumentParser(description="IDOR detection pipeline")
+    ap.add_argument("--base-url", help="target to execute the UCL against (omit for a static run)")
+    ap.add_argument("--workers", type=int, default=8, help="concurrent requests for live execution")
+    ap.add_argument("--users-per-role", type=int, default=1,
+                    help="users per role and group that run the live UCL, each with its own session "
+                         "(crawl and analysis use the first)")
+    ap.add_argument("--rules", help="JSON file with heuristic flag rules (default: rules.DEFAULT_RULES)")
+    ap.add_argument("--store", help="SQLite scan store for incremental re-scans (e.g. scan_store.db)")
+    ap.add_argument("--processes", type=int, help="shard differential analysis over N processes")
+    ap.add_argument("--max-concurrency", type=int, default=64,
+                    help="upper bound of the adaptive per-host concurrency window")
+    ap.add_argument("--no-rate-control", action="store_true",
+                    help="disable adaptive per-host rate control (fixed --workers concurrency)")
+    ap.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                    help="DEBUG prints every use case, request, seed and finding")
+    ap.add_argument("--log-format", default="text", choices=["text", "json"])
+    ap.add_argument("--metrics", help="write stage timings/counters/histograms here (.prom = Prometheus text, else JSON)")
+    ap.add_argument("--profile", help="directory for per-stage cProfile dumps (<stage>.prof)")
+    ap.add_argument("--auth-cache", help="directory of the encrypted session cache; logins are reused across scans")
+    ap.add_argument("--auth-key-file",
+                    help="key file of the auth cache and checkpoint sessions (default: IDOR_AUTH_CACHE_KEY passphrase, "
+                         "else IDOR_AUTH_CACHE_KEY_FILE, else ~/.config/idor-detection/auth.key)")
+    ap.add_argument("--auth-ttl", type=float, default=3600.0, help="seconds a cached session is trusted")
+    ap.add_argument("--body-store", help="directory for crawled/replayed response bodies, stored once per content hash")
+    ap.add_argument("--enumerate", metavar="ROLE",
+                    help="sweep object IDs of every templated action with this role's G2 session")
+    ap.add_argument("--enum-max-ids", type=int, default=10000, help="candidate IDs per ID space for --enumerate")
+    ap.add_argument("--checkpoint", help="append-only journal of completed work (UCL steps, crawled pages, pairs, replays)")
+    ap.add_argument("--resume", action="store_true",
+                    help="continue the scan recorded in --checkpoint without repeating completed requests")
+    ap.add_argument("--targets", help="JSON/YAML/TOML list of targets (base_url, per-role ctx/cookies) to scan concurrently")
+    ap.add_argument("--parallel-targets", type=int, help="targets scanned at the same time (default: all)")
+    ap.add_argument("--total-workers", type=int, default=64, help="requests in flight across all --targets")
+    ap.add_argument("--results-dir", help="with --targets: write <name>.json with each target's results here")
+    ap.add_argument("--report-jsonl", help="write the aggregated issues here, one JSON line per issue")
+    ap.add_argument("--report-sarif", help="write the aggregated issues as SARIF 2.1.0 here")
+    ap.add_argument("--report-summary", help="write a compact text summary of the issues here")
+    ap.add_argument("--report-findings-jsonl",
+                    help="also stream every single finding here as one JSON line when it is found")
+    ap.add_argument("--config", help="JSON/YAML/TOML scan model (roles, actions, use_cases, ctx_defaults)")
+    ap.add_argument("--config-cache", default=os.environ.get("IDOR_CONFIG_CACHE"),
+                    help="directory for precompiled configs keyed by file hash (env IDOR_CONFIG_CACHE)")
+    ap.add_argument("--plan-only", action="store_true",
+                    help="validate, plan and print the UCL with its rendered requests as JSON; no network code is loaded")
+    args = ap.parse_args()
+    if args.users_per_role < 1:
+        ap.error("--users-per-role must be at least 1")
+    from instrumentation import setup_logging
+    # with --plan-only stdout carries the JSON plan, logs go to stderr
+    setup_logging(args.log_level, args.log_format, sys.stderr if args.plan_only else None)
+    if args.profile:
+        METRICS.enable_profiling(args.profile)
+    if args.config:
+        with METRICS.stage("load_config"):
+            use_config(*load_config(args.config, args.config_cache))
+    if args.enumerate and args.enumerate not in {r.name for r in ROLES}:
+        ap.error(f"--enumerate: unknown role {args.enumerate!r} (roles: {', '.join(r.name for r in ROLES)})")
+    if args.plan_only:
+        with METRICS.stage("enumerate_all"):
+            enumerate_all()
+        with METRICS.stage("traverse_use_case_graph"):
+            UCL = traverse_use_case_graph(USE_CASES)
+        plan = []
+        for aid, rname in UCL:
+            method, endpoint, data = _render_request(aid, rname)
+            plan.append({"action_id": aid, "role": rname, "method": method, "endpoint": endpoint, "form": data})
+        json.dump(plan, sys.stdout, indent=1)
+        sys.stdout.write("\n")
+        if args.metrics:
+            METRICS.dump(args.metrics)
+        sys.exit(0)
+    if args.rules:
+        HEURISTIC_RULES = load_rules(args.rules)
+    store = None
+    if args.store:
+        from scan_store import ScanStore
+        store = ScanStore(args.store)
+        CFG = config_hash_current()
+
+    RATE = None
+    if args.base_url:
+        # size the shared connection pool for the worker count; every request (logins,
+        # UCL, crawl, replay) goes through the per-host adaptive rate controller
+        import sessions
+        from ratecontrol import RateController
+        RATE = None if args.no_rate_control else RateController(maximum=args.max_concurrency)
+        SESSIONS = sessions.SessionManager(pool_maxsize=max(64, 2 * args.workers), controller=RATE,
+                                           on_response=METRICS.record_response)
+
+    with METRICS.stage("enumerate_all"):
+        enumerate_all()
     role_ix = index_roles(ROLES)
-    G1, G2 = create_two_user_groups(role_ix)
-
-    print("\nUser Groups (Step 3):")
-    print("Group 1:")
-    for name, user in G1.items():
-        # Show minimal cookie info for sanity; real cookies will come after actual logins
-        ck = dict(user.session.cookies)
-        print(f"  - {name}: user_id={user.id} cookies={ck or '-'}")
-
-    print("Group 2:")
-    for name, user in G2.items():
-        ck = dict(user.session.cookies)
-        print(f"  - {name}: user_id={user.id} cookies={ck or '-'}")
+    # G1/G2 are the first user of every role; further users (--users-per-role) only run the live UCL
+    # without --base-url nothing is sent: users get no session and requests is never imported
+    GROUPS = user_slots(create_user_groups(role_ix, args.users_per_role, offline=not args.base_url))
+    G1, G2 = GROUPS["G1"], GROUPS["G2"]
+
+    CKPT = None
+    if args.checkpoint:
+        import atexit
+        from checkpoint import Checkpoint
+        scan_cfg = config_hash_current()
+        CKPT = Checkpoint(args.checkpoint, resume=args.resume, key_file=args.auth_key_file)
+        if CKPT.state.config is not None and (CKPT.state.config, CKPT.state.base_url) != (scan_cfg, args.base_url):
+            log.warning("[Checkpoint] %s is for another config or target, starting over", args.checkpoint)
+            CKPT.close()
+            CKPT = Checkpoint(args.checkpoint, key_file=args.auth_key_file)
+        if CKPT.state.config is None:
+            CKPT.record("start", config=scan_cfg, base_url=args.base_url)
+        else:
+            from auth_cache import restore_session
+            for (label, rname), entry in CKPT.state.sessions.items():
+                group = GROUPS.get(label, {})
+                if rname in group and group[rname].session is not None:
+                    restore_session(group[rname].session, entry)
+            log.info("[Checkpoint] resuming: %d use cases, %d crawls, %d pairs, %d replays done",
+                     len(CKPT.state.ucs), len(CKPT.state.crawled), len(CKPT.state.pairs), len(CKPT.state.fetches))
+        atexit.register(CKPT.close)
+
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("\nUser Groups (Step 3):")
+        log.debug("Group 1:")
+        for name, user in G1.items():
+            # Show minimal cookie info for sanity; real cookies will come after actual logins
+            ck = dict(user.session.cookies) if user.session is not None else None
+            log.debug("  - %s: user_id=%s cookies=%s", name, user.id, ck or '-')
+
+        log.debug("Group 2:")
+        for name, user in G2.items():
+            ck = dict(user.session.cookies) if user.session is not None else None
+            log.debug("  - %s: user_id=%s cookies=%s", name, user.id, ck or '-')
     
     # Traverse graph per IV-C and print UCL
-    UCL = traverse_use_case_graph(USE_CASES)
+    UCL = CKPT.state.ucl if CKPT is not None else None
+    if UCL is None and store is not None:
+        stored = store.get_artifact(CFG, "ucl")
+        UCL = [tuple(k) for k in stored] if stored is not None else None
+    if UCL is None:
+        with METRICS.stage("traverse_use_case_graph"):
+            UCL = traverse_use_case_graph(USE_CASES)
+        if store is not None:
+            store.put_artifact(CFG, "ucl", UCL)
+    if CKPT is not None and CKPT.state.ucl is None:
+        CKPT.record("ucl", ucl=UCL)
     print_ucl(UCL)
-    plan = traverse_ucl(UCL, G1, G2)
-    sitemaps=execute_state_preserving(UCL, G1, G2)
-    findings = differential_analysis(sitemaps, G1, G2)
+    with METRICS.stage("traverse_ucl"):
+        plan = traverse_ucl(UCL, G1, G2)
+    if store is not None:
+        store.put_artifact(CFG, "exec_plan", [{k: v for k, v in r.items() if k != "user_id"} for r in plan])
+    if args.targets:
+        from targets import load_targets
+        with METRICS.stage("scan_targets"):
+            per_target = scan_targets(load_targets(args.targets), UCL, total_workers=args.total_workers,
+                                      parallel=args.parallel_targets, workers=args.workers,
+                                      max_concurrency=args.max_concurrency,
+                                      rate_control=not args.no_rate_control)
+        if args.results_dir:
+            os.makedirs(args.results_dir, exist_ok=True)
+            for name, res in per_target.items():
+                safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+                with open(os.path.join(args.results_dir, safe + ".json"), "w", encoding="utf-8") as f:
+                    json.dump(res, f, indent=1, default=str)
+        log.info("\n[Stages] " + ", ".join(f"{k}={v:.3f}s" for k, v in METRICS.stages.items()))
+        if args.metrics:
+            METRICS.dump(args.metrics)
+        sys.exit(1 if any("error" in r for r in per_target.values()) else 0)
+    if args.base_url:
+        AUTH, authenticated = None, set()
+        if args.auth_cache:
+            from auth_cache import AuthCache
+            try:
+                AUTH = AuthCache(args.auth_cache, ttl=args.auth_ttl, key_file=args.auth_key_file)
+            except ImportError as e:
+                ap.error(f"--auth-cache: {e}")
+            with METRICS.stage("restore_sessions"):
+                authenticated = restore_authenticated(GROUPS, args.base_url, AUTH)
+            for label, group in GROUPS.items():
+                for name, user in group.items():
+                    if _has_login(name):
+                        enable_reauth(user, label, args.base_url, AUTH)
+        log.info("\n[Live UCL execution]")
+        with METRICS.stage("execute_ucl_live"):
+            live = execute_ucl_live(UCL, G1, G2, args.base_url, max_workers=args.workers,
+                                    authenticated=authenticated, keep_sessions=AUTH is not None,
+                                    checkpoint=CKPT,
+                                    extra_groups={k: g for k, g in GROUPS.items() if k not in ("G1", "G2")})
+        if AUTH is not None:
+            cache_authenticated(GROUPS, args.base_url, AUTH, live)
+    BODIES = None
+    if args.body_store and args.base_url:
+        from body_store import BodyStore
+        BODIES = BodyStore(args.body_store)
+    with METRICS.stage("execute_state_preserving"):
+        sitemaps=execute_state_preserving(UCL, G1, G2, base_url=args.base_url, bodies=BODIES, checkpoint=CKPT,
+                                          store=store)
+    from findings_sink import FindingSink
+    SINK = FindingSink(args.report_jsonl, args.report_sarif, args.report_summary, args.report_findings_jsonl)
+    with METRICS.stage("differential_analysis"):
+        differential_analysis(sitemaps, G1, G2, base_url=args.base_url, store=store,
+                              processes=args.processes, bodies=BODIES, checkpoint=CKPT, sink=SINK)
+    SINK.close()
+    log.info("\n[Issues] %s", SINK.summary())
+    if args.enumerate and args.base_url:
+        from enumeration import EnumBudget
+        with METRICS.stage("enumerate_object_ids"):
+            enumerate_object_ids(G2[args.enumerate], args.base_url,
+                                 EnumBudget(max_ids=args.enum_max_ids, workers=args.workers))
+    if BODIES is not None:
+        for k, v in BODIES.stats.items():
+            METRICS.inc("body_store_" + k, v)
+        log.info("[Bodies] %d stored (%d bytes), %d deduplicated (%d bytes saved)", BODIES.stats["stored"],
+                 BODIES.stats["bytes_written"], BODIES.stats["deduplicated"], BODIES.stats["bytes_saved"])
+    if RATE is not None and args.base_url:
+        for host, budgets in RATE.snapshot().items():
+            for kind, st in budgets.items():
+                log.info("[Rate] %s %s: limit=%s requests=%d throttled=%d backoffs=%d",
+                         host, kind, st['limit'], st['requests'], st['throttled'], st['backoffs'])
+    log.info("\n[Stages] " + ", ".join(f"{k}={v:.3f}s" for k, v in METRICS.stages.items()))
+    if args.metrics:
+        METRICS.dump(args.metrics)
+    if store is not None:
+        store.close()
@@ -0,0 +1,150 @@
+"""
+Encrypted on-disk cache of authenticated sessions, per (target, role, group user).
+
+An entry holds the cookies (with domain/path) and auth headers captured after a
+successful login, plus an expiry (TTL). Entries are encrypted at rest with Fernet
+(AES-128-CBC + HMAC-SHA256) from `cryptography`; without it, SecretBox raises
+ImportError and nothing is cached. File names are a hash of the entry key, so
+targets and role names are not readable from the directory either.
+
+The key comes from IDOR_AUTH_CACHE_KEY (any passphrase, stretched with PBKDF2) or
+from a key file, created with a random key and mode 0600 on first use: the path
+given (--auth-key-file), else IDOR_AUTH_CACHE_KEY_FILE, else
+~/.config/idor-detection/auth.key. It is kept apart from the cache on purpose: a
+copy of the cache directory alone cannot be decrypted.
+"""
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # optional dependency
+    Fernet = None
+    InvalidToken = ValueError
+
+_FERNET = b"F1"
+
+
+class SecretBox:
+    def __init__(self, key: bytes):
+        if Fernet is None:
+            raise ImportError("encrypted auth/session storage needs cryptography (pip install cryptography)")
+        if len(key) != 32:
+            raise ValueError("auth cache key must be 32 bytes")
+        self._fernet = Fernet(base64.urlsafe_b64encode(key))
+
+    def encrypt(self, data: bytes) -> bytes:
+        return _FERNET + self._fernet.encrypt(data)
+
+    def decrypt(self, blob: bytes) -> bytes:
+        if blob[:2] != _FERNET:
+            raise ValueError("unknown auth cache entry format")
+        try:
+            return self._fernet.decrypt(blob[2:])
+        except InvalidToken as e:
+            raise ValueError("auth cache entry failed authentication") from e
+
+
+def _write_private(path: str, data: bytes) -> None:
+    d = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=d, suffix=".tmp")
+    try:
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def default_key_file() -> str:
+    """IDOR_AUTH_CACHE_KEY_FILE, else auth.key in the user's config directory (never next to the data)."""
+    path = os.environ.get("IDOR_AUTH_CACHE_KEY_FILE")
+    if path:
+        return path
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "idor-detection", "auth.key")
+
+
+def load_key(key_file: Optional[str] = None) -> bytes:
+    """
+    The 32-byte key: IDOR_AUTH_CACHE_KEY (a passphrase) if set, else the key file
+    (`key_file` or default_key_file()), created with a random key on first use.
+    """
+    secret = os.environ.get("IDOR_AUTH_CACHE_KEY")
+    if secret:
+        return hashlib.pbkdf2_hmac("sha256", secret.encode("utf-8"), b"idor-auth-cache", 200_000)
+    path = key_file or default_key_file()
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+        key = os.urandom(32)
+        _write_private(path, key)
+        return key
+
+
+class AuthCache:
+    def __init__(self, directory: str = ".idor_auth", ttl: float = 3600.0, key: Optional[bytes] = None,
+                 key_file: Optional[str] = None):
+        self._box = SecretBox(key or load_key(key_file))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, target: str, role: str, user: str) -> str:
+        name = hashlib.sha256(json.dumps([target, role, user]).encode("utf-8")).hexdigest()[:40]
+        return os.path.join(self.directory, name + ".auth")
+
+    def get(self, target: str, role: str, user: str) -> Optional[Dict[str, Any]]:
+        """Unexpired entry {"cookies": [...], "headers": {...}, "expires": ts} or None."""
+        path = self._path(target, role, user)
+        try:
+            with open(path, "rb") as f:
+                entry = json.loads(self._box.decrypt(f.read()))
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires", 0) <= time.time():
+            self.drop(target, role, user)
+            return None
+        return entry
+
+    def put(self, target: str, role: str, user: str, cookies: List[Dict[str, Any]],
+            headers: Optional[Dict[str, str]] = None, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        entry = {"cookies": cookies, "headers": headers or {}, "created": now,
+                 "expires": now + (self.ttl if ttl is None else ttl)}
+        _write_private(self._path(target, role, user), self._box.encrypt(json.dumps(entry).encode("utf-8")))
+
+    def drop(self, target: str, role: str, user: str) -> None:
+        try:
+            os.unlink(self._path(target, role, user))
+        except FileNotFoundError:
+            pass
+
+
+AUTH_HEADERS = ("Authorization", "X-CSRF-Token", "X-XSRF-Token")
+
+
+def session_state(session: Any) -> Dict[str, Any]:
+    """Cookies (with domain/path) and auth headers of a requests.Session, for AuthCache.put."""
+    cookies = [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path} for c in session.cookies]
+    headers = {h: session.headers[h] for h in AUTH_HEADERS if h in session.headers}
+    return {"cookies": cookies, "headers": headers}
+
+
+def restore_session(session: Any, entry: Dict[str, Any]) -> None:
+    """Load a cached entry into a requests.Session, replacing cookies of the same name."""
+    for c in entry.get("cookies", ()):
+        for old in [o for o in session.cookies if o.name == c["name"]]:
+            session.cookies.clear(old.domain, old.path, old.name)
+        session.cookies.set(c["name"], c["value"], domain=c.get("domain") or "", path=c.get("path") or "/")
+    session.headers.update(entry.get("headers") or {})
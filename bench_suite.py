@@ -0,0 +1,290 @@
+# python bench_suite.py [--sizes 1000 10000] [--out bench.json] [--compare baseline.json]
+# Per-stage timings on synthetic configs plus an end-to-end live run against the mock
+# LMS (mock_lms.py). Prints a JSON document; --compare exits 1 on regressions.
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from bench_capture import synthetic_flow
+from bench_ucl import _HERE, _load_scanner
+
+SCHEMA = 1
+SHAPES = ("random", "chain", "wide")
+
+
+def synthetic_config(idor, n_use_cases: int, n_roles: int = 8, shape: str = "random",
+                     dep_density: float = 0.3, cancel_density: float = 0.02, seed: int = 0):
+    """
+    (roles, actions, use_cases, ctx) with about n_use_cases use cases over n_roles roles.
+    Every role logs in first. Shapes:
+      chain  - each use case depends on the previous one of its role
+      wide   - every use case depends only on its role's login
+      random - each of the role's last 10 use cases is a prerequisite with
+               probability dep_density (login if none was picked)
+    A use case cancels one random earlier use case with probability cancel_density.
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"unknown shape: {shape}")
+    rnd = random.Random(seed)
+    roles = [idor.role(f"role{i}", rank=i % 4, cookies={"PHPSESSID": f"sess{i}"}) for i in range(n_roles)]
+    login = idor.Action(id="login", type="state-changing",
+                        HTTP_request=idor.Requesttype(method="POST", endpoint="/login",
+                                                      headers={"username": "{user}", "password": "{pass}"}))
+    n_actions = max(1, n_use_cases // n_roles)
+    actions = [login]
+    for i in range(n_actions):
+        if i % 3:
+            actions.append(idor.Action(id=f"view{i}", type="state-preserving", HTTP_request=idor.Requesttype(
+                method="GET", endpoint=f"/api/res{i % 17}/{{obj_id}}/items/{i}")))
+        else:
+            actions.append(idor.Action(id=f"edit{i}", type="state-changing", HTTP_request=idor.Requesttype(
+                method="POST", endpoint=f"/api/res{i % 17}/{{obj_id}}", headers={"owner": "{user_id}"})))
+
+    ucs = []
+    done: List = []
+    per_role: Dict[str, List] = {r.name: [] for r in roles}
+    for r in roles:
+        ucs.append(idor.usecase(role=r.name, action=login))
+        per_role[r.name].append(("login", r.name))
+        done.append(("login", r.name))
+    for a in actions[1:]:
+        for r in roles:
+            if len(ucs) >= n_use_cases:
+                break
+            pool = per_role[r.name]
+            if shape == "chain":
+                deps = [pool[-1]]
+            elif shape == "wide":
+                deps = [pool[0]]
+            else:
+                deps = [k for k in pool[-10:] if rnd.random() < dep_density] or [pool[0]]
+            cancels = [rnd.choice(done)] if rnd.random() < cancel_density else []
+            ucs.append(idor.usecase(role=r.name, action=a, dependencies=deps, cancellation=cancels))
+            pool.append((a.id, r.name))
+            done.append((a.id, r.name))
+    ctx = {r.name: {"user": r.name, "pass": "pw", "obj_id": str(100 + i), "user_id": str(i)}
+           for i, r in enumerate(roles)}
+    return roles, actions, ucs, ctx
+
+
+def install_config(idor, roles, actions, ucs, ctx) -> None:
+    """Swap the scanner's module-level configuration (the loaded module is private to the suite)."""
+    idor.use_config(roles, actions, ucs, ctx)
+
+
+def synthetic_sitemaps(idor, ucl, roles, urls_per_role: int, seed: int = 0) -> Dict:
+    """
+    Static crawl seeds plus urls_per_role object URLs per (group, role). Higher ranks see
+    more objects, and the G2 copy misses a random 5%, so every pair has candidates.
+    """
+    rnd = random.Random(seed)
+    shapes = ("/users/{}", "/admin/users/{}", "/billing/invoices/inv-{}-2025.pdf",
+              "/instructor/courses/{}/grades", "/courses/{}")
+    out = {}
+    for r in roles:
+        seeds = idor.build_crawl_seeds_static_for_role(ucl, r.name)
+        n = urls_per_role * (r.rank + 1) // 4
+        urls = seeds + [shapes[i % len(shapes)].format(i) for i in range(n)]
+        out[("G1", r.name)] = urls
+        out[("G2", r.name)] = [u for u in urls if rnd.random() >= 0.05]
+    return out
+
+
+def _quiet(fn: Callable, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def timed(results: List[Dict], stage: str, size: Any, n: int, fn: Callable, repeat: int, **extra) -> Any:
+    """Best and mean wall time of `repeat` runs of fn(); records n/best as the rate."""
+    times, out = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    best = min(times)
+    results.append(dict(stage=stage, size=size, n=n, best_s=round(best, 6),
+                        mean_s=round(sum(times) / len(times), 6),
+                        per_s=round(n / best, 1) if best else None, **extra))
+    print(f"  {stage:<26} size={size!s:<8} n={n:<8} best={best * 1000:10.1f} ms", file=sys.stderr)
+    return out
+
+
+def bench_stages(idor, size: int, shape: str, repeat: int, urls_per_role: int, results: List[Dict]) -> None:
+    roles, actions, ucs, ctx = synthetic_config(idor, size, shape=shape)
+    install_config(idor, roles, actions, ucs, ctx)
+    timed(results, "build_uc_graph", size, len(ucs), lambda: _quiet(idor.build_uc_graph, ucs), repeat, shape=shape)
+    timed(results, "analyse_uc_graph", size, len(ucs), lambda: _quiet(idor.analyse_uc_graph, ucs), repeat, shape=shape)
+    ucl = timed(results, "traverse_use_case_graph", size, len(ucs),
+                lambda: _quiet(idor.traverse_use_case_graph, ucs), repeat, shape=shape)
+    g1, g2 = idor.create_two_user_groups(idor.index_roles(roles))
+    timed(results, "traverse_ucl", size, len(ucl), lambda: _quiet(idor.traverse_ucl, ucl, g1, g2), repeat, shape=shape)
+    timed(results, "execute_state_preserving", size, len(ucl),
+          lambda: _quiet(idor.execute_state_preserving, ucl, g1, g2), repeat, shape=shape)
+    sitemaps = synthetic_sitemaps(idor, ucl, roles, urls_per_role)
+    n_urls = sum(len(v) for v in sitemaps.values())
+    timed(results, "differential_analysis", size, n_urls,
+          lambda: _quiet(idor.differential_analysis, sitemaps, g1, g2), repeat, shape=shape)
+
+
+def bench_capture(n_flows: int, repeat: int, results: List[Dict]) -> None:
+    """proxy.response() on stand-in flows (needs mitmproxy), else the same record path by hand."""
+    from capture_sink import CaptureSink
+    from normalizer import path_template
+    try:
+        import proxy
+    except ImportError:
+        proxy = None
+    flows = []
+    for i in range(n_flows):
+        rec = synthetic_flow(i)
+        path = rec["url"].split("8000", 1)[1]
+        flows.append(SimpleNamespace(
+            request=SimpleNamespace(method=rec["method"], pretty_url=rec["url"], path=path,
+                                    headers=rec["headers"], raw_content=b"" if i % 3 else b'{"title": "x"}'),
+            response=SimpleNamespace(status_code=200)))
+
+    with tempfile.TemporaryDirectory() as d:
+        def run_proxy():
+            proxy.CAPTURE_PATH = os.path.join(d, "captures.jsonl")
+            for f in flows:
+                proxy.response(f)
+            proxy.done()
+
+        def run_sink():
+            sink = CaptureSink(os.path.join(d, "captures.jsonl"))
+            for f in flows:
+                req = f.request
+                sink.write({"method": req.method, "url": req.pretty_url, "path_template": path_template(req.path),
+                            "headers": dict(req.headers), "body_b64": "", "status": f.response.status_code})
+            sink.close()
+
+        timed(results, "proxy_capture", n_flows, n_flows, run_proxy if proxy else run_sink, repeat,
+              impl="proxy.response" if proxy else "capture_sink")
+
+
+def bench_live(users: int, courses: int, workers: int, rate_control: bool, results: List[Dict]) -> None:
+    """Full live pipeline with the default config against a fresh mock LMS."""
+    import mock_lms
+    from ratecontrol import RateController
+    from sessions import SessionManager
+
+    idor = _load_scanner()
+    srv = mock_lms.start_in_thread(n_users=users, n_courses=courses)
+    base = f"http://127.0.0.1:{srv.server_port}"
+    idor.SESSIONS = SessionManager(pool_maxsize=max(64, 2 * workers),
+                                   controller=RateController() if rate_control else None)
+    try:
+        g1, g2 = idor.create_two_user_groups(idor.index_roles(idor.ROLES))
+        ucl = idor.traverse_use_case_graph(idor.USE_CASES)
+        t_all = time.perf_counter()
+        marks = {}
+        for stage, fn in (
+            ("live_execute_ucl", lambda: idor.execute_ucl_live(ucl, g1, g2, base, max_workers=workers)),
+            ("live_crawl", lambda: idor.execute_state_preserving(ucl, g1, g2, base_url=base)),
+        ):
+            before, t0 = srv.state.requests, time.perf_counter()
+            marks[stage] = _quiet(fn)
+            dt = time.perf_counter() - t0
+            n = srv.state.requests - before
+            results.append(dict(stage=stage, size="default", n=n, best_s=round(dt, 6), mean_s=round(dt, 6),
+                                per_s=round(n / dt, 1) if dt else None))
+        before, t0 = srv.state.requests, time.perf_counter()
+        findings = _quiet(idor.differential_analysis, marks["live_crawl"], g1, g2, base_url=base)
+        dt = time.perf_counter() - t0
+        n = srv.state.requests - before
+        confirmed = sum(f["confidence"] == "confirmed" for f in findings)
+        results.append(dict(stage="live_differential_replay", size="default", n=n, best_s=round(dt, 6),
+                            mean_s=round(dt, 6), per_s=round(n / dt, 1) if dt else None,
+                            findings=len(findings), confirmed=confirmed))
+        total = time.perf_counter() - t_all
+        results.append(dict(stage="end_to_end", size="default", n=srv.state.requests, best_s=round(total, 6),
+                            mean_s=round(total, 6), per_s=round(srv.state.requests / total, 1),
+                            rate_control=rate_control, findings=len(findings), confirmed=confirmed))
+        print(f"  end_to_end: {srv.state.requests} requests in {total:.2f}s "
+              f"({srv.state.requests / total:,.0f} req/s), {confirmed}/{len(findings)} findings confirmed",
+              file=sys.stderr)
+    finally:
+        srv.shutdown()
+        idor.SESSIONS.close()
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Stages whose best time got slower than baseline * (1 + tolerance)."""
+    base = {(r["stage"], str(r["size"]), r.get("shape")): r for r in baseline.get("results", [])}
+    out = []
+    for r in current["results"]:
+        b = base.get((r["stage"], str(r["size"]), r.get("shape")))
+        if b and b["best_s"] and r["best_s"] > b["best_s"] * (1 + tolerance):
+            out.append(f"{r['stage']} size={r['size']}: {b['best_s']:.4f}s -> {r['best_s']:.4f}s "
+                       f"(+{(r['best_s'] / b['best_s'] - 1) * 100:.0f}%)")
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="IDOR scanner benchmark suite")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    ap.add_argument("--shape", choices=SHAPES, default="random")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--urls-per-role", type=int, default=20000)
+    ap.add_argument("--flows", type=int, default=50000)
+    ap.add_argument("--no-live", action="store_true", help="skip the mock LMS end-to-end run")
+    ap.add_argument("--lms-users", type=int, default=200)
+    ap.add_argument("--lms-courses", type=int, default=50)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--rate-control", action="store_true", help="run the live part with the adaptive rate controller")
+    ap.add_argument("--out", help="write the JSON results here instead of stdout")
+    ap.add_argument("--compare", help="baseline JSON from an earlier run; exit 1 on regressions")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs the baseline (0.25 = 25%%)")
+    args = ap.parse_args()
+
+    results: List[Dict] = []
+    idor = _load_scanner()
+    for size in args.sizes:
+        bench_stages(idor, size, args.shape, args.repeat, args.urls_per_role, results)
+    bench_capture(args.flows, args.repeat, results)
+    if not args.no_live:
+        bench_live(args.lms_users, args.lms_courses, args.workers, args.rate_control, results)
+
+    doc = {
+        "schema": SCHEMA,
+        "meta": {"git_rev": _git_rev(), "python": platform.python_version(), "platform": platform.platform(),
+                 "cpus": os.cpu_count(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "args": vars(args)},
+        "results": results,
+    }
+    blob = json.dumps(doc, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(blob + "\n")
+    else:
+        print(blob)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(doc, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# python bench_ucl.py [--sizes 1000 10000 100000]
+# Times traverse_use_case_graph and the graph analysis (UCGraph.analyse) on synthetic use-case graphs.
+import argparse
+import importlib.util
+import os
+import random
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _load_scanner():
+    # IDOR-detection.py is not an importable module name, load it by path
+    spec = importlib.util.spec_from_file_location("idor_detection", os.path.join(_HERE, "IDOR-detection.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def synthetic_use_cases(idor, n: int, n_roles: int = 30, max_deps: int = 3,
+                        cancel_ratio: float = 0.02, seed: int = 0):
+    """
+    n use cases spread over n_roles roles. Every role starts with a login, the other
+    use cases depend on up to max_deps earlier use cases of the same role, and a small
+    fraction cancel random use cases of any role.
+    """
+    rnd = random.Random(seed)
+    roles = [f"role{i}" for i in range(n_roles)]
+    login = idor.Action(id="login", type="state-changing",
+                        HTTP_request=idor.Requesttype(method="POST", endpoint="/login"))
+    keys = []
+    per_role = {r: [] for r in roles}
+    ucs = []
+    for r in roles:
+        ucs.append(idor.usecase(role=r, action=login))
+        keys.append(("login", r))
+        per_role[r].append(("login", r))
+    for i in range(n - len(ucs)):
+        r = rnd.choice(roles)
+        a = idor.Action(id=f"action{i}", type=rnd.choice(["state-changing", "state-preserving"]),
+                        HTTP_request=idor.Requesttype(method="GET", endpoint=f"/res{i}/{{id}}"))
+        pool = per_role[r]
+        deps = rnd.sample(pool, min(len(pool), rnd.randint(1, max_deps)))
+        cancels = [rnd.choice(keys)] if rnd.random() < cancel_ratio else []
+        ucs.append(idor.usecase(role=r, action=a, dependencies=deps, cancellation=cancels))
+        keys.append((a.id, r))
+        pool.append((a.id, r))
+    return ucs
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark UCL generation on synthetic graphs")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    idor = _load_scanner()
+    for n in args.sizes:
+        ucs = synthetic_use_cases(idor, n)
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            ucl = idor.traverse_use_case_graph(ucs)
+            best = min(best, time.perf_counter() - t0)
+        g = idor.UCGraph(ucs)
+        t0 = time.perf_counter()
+        report = g.analyse()
+        t_analyse = time.perf_counter() - t0
+        print(f"n={n:>7}  ucl={len(ucl):>7}  best={best * 1000:9.1f} ms  ({n / best:,.0f} uc/s)  "
+              f"analyse={t_analyse * 1000:8.1f} ms  waves={len(report.waves)} width={report.max_parallelism}")
+
+
+if __name__ == "__main__":
+    main()
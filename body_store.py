@@ -0,0 +1,141 @@
+"""
+Content-addressed on-disk store for response bodies.
+
+Bodies are streamed to a temporary file in chunks while their sha256 is computed,
+then hard-linked to objects/<2 hex>/<sha256>. A body that is already stored (the
+same invoice PDF fetched by several roles and groups) is not written twice: the
+link fails, the temp file is dropped and only a reference is recorded. Per body a small metadata record
+(length, content type) sits next to the object, so comparisons and reports work on
+hashes and metadata and never need the bytes in memory.
+
+Writers are independent, so any number of threads can store bodies concurrently.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+CHUNK = 65536
+
+
+class BodyWriter:
+    """Streams one body to disk; feed() chunks then commit() (or abort())."""
+
+    def __init__(self, store: "BodyStore"):
+        self._store = store
+        self._hash = hashlib.sha256()
+        self.length = 0
+        fd, self._tmp = tempfile.mkstemp(dir=store.tmp_dir, suffix=".part")
+        self._f = os.fdopen(fd, "wb")
+
+    def feed(self, chunk: bytes) -> None:
+        if chunk:
+            self._f.write(chunk)
+            self._hash.update(chunk)
+            self.length += len(chunk)
+
+    def abort(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+            os.unlink(self._tmp)
+
+    def commit(self, content_type: str = "") -> Dict[str, Any]:
+        """Move the body to its content address; returns {"sha256", "length", "content_type", "new"}."""
+        self._f.close()
+        self._f = None
+        digest = self._hash.hexdigest()
+        meta = {"sha256": digest, "length": self.length, "content_type": content_type}
+        path = self._store.path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        new = _link_new(self._tmp, path)
+        if new:
+            tmp = self._tmp + ".json"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, path + ".json")
+        self._store._count(new, self.length)
+        return dict(meta, new=new)
+
+
+def _link_new(tmp: str, path: str) -> bool:
+    """
+    Move `tmp` to `path` unless `path` exists; True if this call created it. A hard
+    link fails when the name is taken, so of two writers committing the same body at
+    once exactly one counts it as stored.
+    """
+    try:
+        os.link(tmp, path)
+        new = True
+    except FileExistsError:
+        new = False
+    except OSError:
+        # no hard links on this file system: last writer wins, same bytes either way
+        new = not os.path.exists(path)
+        os.replace(tmp, path)
+        return new
+    os.unlink(tmp)
+    return new
+
+
+class BodyStore:
+    def __init__(self, directory: str = ".idor_bodies"):
+        self.directory = directory
+        self.tmp_dir = os.path.join(directory, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._refs: Dict[Tuple[str, str, str], str] = {}
+        self.stats = {"stored": 0, "deduplicated": 0, "bytes_written": 0, "bytes_saved": 0}
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def _count(self, new: bool, length: int) -> None:
+        with self._lock:
+            if new:
+                self.stats["stored"] += 1
+                self.stats["bytes_written"] += length
+            else:
+                self.stats["deduplicated"] += 1
+                self.stats["bytes_saved"] += length
+
+    def writer(self) -> BodyWriter:
+        return BodyWriter(self)
+
+    def put_stream(self, chunks: Iterable[bytes], content_type: str = "") -> Dict[str, Any]:
+        w = self.writer()
+        try:
+            for c in chunks:
+                w.feed(c)
+        except BaseException:
+            w.abort()
+            raise
+        return w.commit(content_type)
+
+    def add_ref(self, group: str, role: str, url: str, digest: str) -> None:
+        """Remember which body (group, role) got for url."""
+        with self._lock:
+            self._refs[(group, role, url)] = digest
+
+    def ref(self, group: str, role: str, url: str) -> Optional[str]:
+        return self._refs.get((group, role, url))
+
+    def meta(self, digest: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path(digest) + ".json", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def open(self, digest: str):
+        return open(self.path(digest), "rb")
+
+    def iter_body(self, digest: str, chunk_size: int = CHUNK) -> Iterator[bytes]:
+        with self.open(digest) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
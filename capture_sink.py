@@ -0,0 +1,184 @@
+"""
+Buffered JSONL capture writer used by proxy.py.
+
+Records are handed to a background thread through a bounded queue, so the mitmproxy
+event loop never touches the file. The writer keeps one handle open, flushes when
+the buffer reaches `flush_bytes` or every `flush_interval` seconds, and rotates the
+file once it grows past `max_bytes`:
+    captures.jsonl            <- active segment
+    captures.00001.jsonl      <- rotated segments (oldest first)
+With compress="gzip" (or "zstd" if the zstandard package is installed) every segment
+is a compressed stream: captures.jsonl.gz, captures.00001.jsonl.gz, ...
+If the writer thread fails (disk full, ...) its exception is kept in `error` and
+write() raises instead of blocking on a queue nobody drains.
+"""
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+_EXT = {None: "", "gzip": ".gz", "zstd": ".zst"}
+_STOP = object()
+
+
+class CaptureSink:
+    def __init__(self, path: str = "captures.jsonl",
+                 max_bytes: Optional[int] = 256 * 1024 * 1024,
+                 compress: Optional[str] = None,
+                 flush_bytes: int = 1024 * 1024,
+                 flush_interval: float = 1.0,
+                 queue_size: int = 100000):
+        if compress not in _EXT:
+            raise ValueError(f"Unknown compression: {compress}")
+        if compress == "zstd" and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        self.path = path + _EXT[compress]
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.stats = {"records": 0, "bytes": 0, "flushes": 0, "rotations": 0}
+
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._fh = None
+        self._raw = None
+        self._written = 0   # uncompressed bytes in the active segment
+        self._seq = self._next_seq()
+        self.error: Optional[BaseException] = None   # what stopped the writer thread, if it failed
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="capture-sink", daemon=True)
+        self._thread.start()
+
+    # --- producer side (mitmproxy event loop) ---
+    def write(self, rec: Dict[str, Any]) -> None:
+        """
+        Queue one record. Blocks only while the writer is `queue_size` records behind.
+        Raises RuntimeError once the writer thread has stopped (failed or closed)
+        instead of queueing records nobody will write.
+        """
+        while True:
+            if not self._running:
+                if self.error is not None:
+                    raise RuntimeError(f"capture writer failed: {self.error!r}") from self.error
+                raise RuntimeError("capture sink is closed")
+            try:
+                self._q.put(rec, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Drain the queue, flush and close the active segment."""
+        while self._running:
+            try:
+                self._q.put(_STOP, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        self._thread.join(timeout)
+
+    # --- writer thread ---
+    def _next_seq(self) -> int:
+        d = os.path.dirname(os.path.abspath(self.path))
+        stem, ext = self._split()
+        seq = 0
+        for name in os.listdir(d):
+            if name.startswith(stem + ".") and name.endswith(ext):
+                mid = name[len(stem) + 1:len(name) - len(ext)]
+                if mid.isdigit():
+                    seq = max(seq, int(mid))
+        return seq + 1
+
+    def _split(self):
+        base = os.path.basename(self.path)
+        ext = ".jsonl" + _EXT[self.compress]
+        stem = base[:-len(ext)] if base.endswith(ext) else base
+        return stem, ext
+
+    def _open(self) -> None:
+        if self.compress == "gzip":
+            self._raw = open(self.path, "ab")
+            self._fh = gzip.GzipFile(fileobj=self._raw, mode="ab")
+        elif self.compress == "zstd":
+            self._raw = open(self.path, "ab")
+            self._fh = zstandard.ZstdCompressor().stream_writer(self._raw)
+        else:
+            self._raw = None
+            self._fh = open(self.path, "ab")
+        self._written = os.path.getsize(self.path) if self.compress is None else 0
+
+    def _close_fh(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            if self._raw is not None:
+                self._raw.close()
+        self._fh = self._raw = None
+
+    def _rotate(self) -> None:
+        self._close_fh()
+        stem, ext = self._split()
+        target = os.path.join(os.path.dirname(os.path.abspath(self.path)), f"{stem}.{self._seq:05d}{ext}")
+        os.replace(self.path, target)
+        self._seq += 1
+        self.stats["rotations"] += 1
+
+    def _flush(self, buf: list) -> None:
+        if not buf:
+            return
+        if self._fh is None:
+            self._open()
+        data = b"".join(buf)
+        self._fh.write(data)
+        self._fh.flush()
+        self._written += len(data)
+        self.stats["bytes"] += len(data)
+        self.stats["flushes"] += 1
+        buf.clear()
+        if self.max_bytes and self._written >= self.max_bytes:
+            self._rotate()
+
+    def _run(self) -> None:
+        try:
+            self._loop()
+        except BaseException as e:
+            self.error = e
+            try:
+                self._close_fh()
+            except Exception:
+                pass
+        finally:
+            self._running = False
+
+    def _loop(self) -> None:
+        buf: list = []
+        size = 0
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                line = (json.dumps(item) + "\n").encode("utf-8")
+                buf.append(line)
+                size += len(line)
+                self.stats["records"] += 1
+            now = time.monotonic()
+            if size >= self.flush_bytes or (buf and now >= deadline) or \
+                    (self.max_bytes and self._written + size >= self.max_bytes):
+                self._flush(buf)
+                size = 0
+            if now >= deadline:
+                deadline = now + self.flush_interval
+        self._flush(buf)
+        self._close_fh()
@@ -0,0 +1,181 @@
+"""
+Append-only checkpoint journal for resuming interrupted scans.
+
+Every completed unit of work is one JSON line:
+  start     config hash and target of the scan
+  ucl       the planned UCL (the traversal result: visited order, the rest canceled)
+  uc        a UCL use case that completed in a group, with its result record
+  session   cookies/auth headers of a (group, role) user after a completed step,
+            encrypted like the auth cache and with its key (auth_cache.load_key);
+            not journaled without `cryptography`, a resumed scan then logs in again
+  page      a crawled page of a (group, role): depth, in sitemap or not, and the
+            links it added to the frontier
+  crawled   a (group, role) crawl that ran to the end, with its stats
+  pair      differential-analysis findings of a (victim, attacker) pair
+  fetch     a replay fingerprint for (group, role, url)
+record() only puts the line on a queue; a writer thread collects the lines and
+writes, flushes and fsyncs them as one batch `flush_interval` seconds after the first
+unwritten one (and on close), so the hot path never waits on the disk and a crash
+loses at most that much work. A line is written with a single write() and a torn last line from a crash
+is ignored on load, so the journal is always readable up to the last full record.
+Opened with resume=True, the journal is read into `state` (ResumeState) and new
+records are appended after it; otherwise it starts empty.
+"""
+import base64
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from auth_cache import Fernet, SecretBox, load_key
+
+_STOP = object()
+
+
+class Checkpoint:
+    def __init__(self, path: str, resume: bool = False, flush_interval: float = 1.0,
+                 key: Optional[bytes] = None, key_file: Optional[str] = None):
+        self.path = path
+        self.flush_interval = flush_interval
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # same key as the auth cache (never a file next to the journal)
+        self._box = SecretBox(key or load_key(key_file)) if Fernet is not None else None
+        self.state = ResumeState.read(path, self._box) if resume else ResumeState()
+        if resume and self.state.valid_size is not None:
+            with open(path, "r+b") as f:
+                f.truncate(self.state.valid_size)  # drop a torn tail before appending
+        self._q: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._f = open(path, "ab" if resume else "wb")
+        self._thread = threading.Thread(target=self._writer, name="checkpoint", daemon=True)
+        self._thread.start()
+
+    def _flush(self, batch: List[bytes]) -> None:
+        if batch:
+            self._f.write(b"".join(batch))
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def _writer(self) -> None:
+        batch: List[bytes] = []
+        flush_at: Optional[float] = None   # flush_interval after the oldest unwritten line
+        while True:
+            timeout = None if flush_at is None else max(0.0, flush_at - time.monotonic())
+            try:
+                item = self._q.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush(batch)
+                return
+            if item is not None:
+                batch.append(item)
+                if flush_at is None:
+                    flush_at = time.monotonic() + self.flush_interval
+            if flush_at is not None and time.monotonic() >= flush_at:
+                self._flush(batch)
+                batch, flush_at = [], None
+
+    def record(self, kind: str, **data: Any) -> None:
+        data["k"] = kind
+        self._q.put(json.dumps(data, separators=(",", ":")).encode("utf-8") + b"\n")
+
+    def record_session(self, group: str, role: str, state: Dict[str, Any]) -> None:
+        if self._box is None:
+            return
+        blob = self._box.encrypt(json.dumps(state).encode("utf-8"))
+        self.record("session", g=group, r=role, blob=base64.b64encode(blob).decode("ascii"))
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        self._q.put(_STOP)
+        self._thread.join()
+        self._f.close()
+
+    def __enter__(self) -> "Checkpoint":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ResumeState:
+    """Everything a journal says was already done, folded into lookup tables."""
+
+    def __init__(self):
+        self.config: Optional[str] = None
+        self.base_url: Optional[str] = None
+        self.ucl: Optional[List[Tuple[str, str]]] = None
+        self.ucs: Dict[Tuple[str, Tuple[str, str]], Dict] = {}
+        self.sessions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.pages: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self.crawled: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.pairs: Dict[Tuple[str, str], List[Dict]] = {}
+        self.fetches: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self.valid_size: Optional[int] = None   # bytes of full records in the journal
+
+    @classmethod
+    def read(cls, path: str, box: Optional[SecretBox]) -> "ResumeState":
+        st = cls()
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return st
+        size = 0
+        with f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn write at the end
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                st._apply(rec, box)
+                size += len(line)
+        st.valid_size = size
+        return st
+
+    def _apply(self, rec: Dict[str, Any], box: Optional[SecretBox]) -> None:
+        k = rec["k"]
+        if k == "start":
+            self.config, self.base_url = rec["config"], rec.get("base_url")
+        elif k == "ucl":
+            self.ucl = [tuple(x) for x in rec["ucl"]]
+        elif k == "uc":
+            self.ucs[(rec["g"], (rec["a"], rec["r"]))] = rec["result"]
+        elif k == "session" and box is not None:
+            try:
+                self.sessions[(rec["g"], rec["r"])] = json.loads(box.decrypt(base64.b64decode(rec["blob"])))
+            except ValueError:
+                pass  # written with another key
+        elif k == "page":
+            self.pages.setdefault((rec["g"], rec["r"]), []).append(rec)
+        elif k == "crawled":
+            self.crawled[(rec["g"], rec["r"])] = {"sitemap": rec["sitemap"], "stats": rec["stats"]}
+        elif k == "pair":
+            self.pairs[(rec["v"], rec["a"])] = rec["findings"]
+        elif k == "fetch":
+            self.fetches[(rec["g"], rec["r"], rec["url"])] = rec["fp"]
+
+    def crawl_resume(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        """
+        {"sitemap", "fetched", "frontier", "queued"} of an unfinished crawl, or None if
+        no page of it was recorded. `frontier` are (path, depth) still to fetch.
+        """
+        pages = self.pages.get(key)
+        if not pages:
+            return None
+        fetched: Set[str] = set()
+        sitemap: List[str] = []
+        queued: Dict[str, int] = {}
+        for p in pages:
+            fetched.add(p["path"])
+            queued.setdefault(p["path"], p["depth"])
+            if p["ok"]:
+                sitemap.append(p["path"])
+            for path, depth in p.get("links", ()):
+                queued.setdefault(path, depth)
+        frontier = [(path, d) for path, d in queued.items() if path not in fetched]
+        return {"sitemap": sitemap, "fetched": fetched, "frontier": frontier, "queued": list(queued)}
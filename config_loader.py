@@ -0,0 +1,112 @@
+"""
+Scan model (roles, actions, use cases, context defaults) from JSON, YAML or TOML.
+
+    {
+      "roles":     [{"name": "Admin", "rank": 3, "cookies": {"PHPSESSID": "..."}}],
+      "actions":   [{"id": "login", "type": "state-changing", "method": "POST",
+                     "endpoint": "/login", "headers": {"username": "{user}"}}],
+      "use_cases": [{"role": "Admin", "action": "login",
+                     "dependencies": [["login", "Admin"]], "cancellation": []}],
+      "ctx_defaults": {"Admin": {"user": "admin"}}
+    }
+
+The file is normalised into plain tuples/dicts. With a cache directory, the
+validated model is stored with marshal under the SHA-256 of the file bytes, so a
+re-run on an unchanged file skips parsing and validation entirely. YAML needs
+PyYAML; TOML uses tomllib (Python 3.11+) or tomli.
+"""
+import hashlib
+import json
+import marshal
+import os
+import tempfile
+from typing import Any, Callable, Dict, Optional
+
+CACHE_VERSION = 1  # bump when the normalised layout or validation rules change
+
+Model = Dict[str, Any]
+
+
+def _parse(path: str, raw: bytes) -> Any:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        return json.loads(raw)
+    if ext in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("YAML configs need PyYAML (pip install pyyaml)") from e
+        return yaml.safe_load(raw)
+    if ext == ".toml":
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError as e:
+                raise ImportError("TOML configs need Python 3.11+ or tomli (pip install tomli)") from e
+        return tomllib.loads(raw.decode("utf-8"))
+    raise ValueError(f"Unsupported config format: {path} (use .json, .yaml/.yml or .toml)")
+
+
+def _pairs(value: Any, where: str) -> tuple:
+    out = []
+    for p in value or ():
+        if not isinstance(p, (list, tuple)) or len(p) != 2:
+            raise ValueError(f"{where}: expected [action_id, role] pairs, got {p!r}")
+        out.append((str(p[0]), str(p[1])))
+    return tuple(out)
+
+
+def normalize(data: Any) -> Model:
+    """Plain, marshal-able model; raises ValueError on structural problems."""
+    if not isinstance(data, dict):
+        raise ValueError("config: top level must be a mapping")
+    try:
+        roles = tuple((str(r["name"]), r["rank"], dict(r.get("cookies") or {})) for r in data.get("roles", ()))
+        actions = tuple((str(a["id"]), str(a["type"]), str(a.get("method", "GET")).upper(), str(a["endpoint"]),
+                         dict(a.get("headers") or {})) for a in data.get("actions", ()))
+        use_cases = tuple((str(u["role"]), str(u["action"]),
+                           _pairs(u.get("dependencies"), f"use case ({u['action']}, {u['role']}) dependencies"),
+                           _pairs(u.get("cancellation"), f"use case ({u['action']}, {u['role']}) cancellation"))
+                          for u in data.get("use_cases", ()))
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"config: missing or malformed field {e}") from e
+    ctx = {str(k): {str(kk): str(vv) for kk, vv in (v or {}).items()}
+           for k, v in (data.get("ctx_defaults") or {}).items()}
+    return {"roles": roles, "actions": actions, "use_cases": use_cases, "ctx_defaults": ctx}
+
+
+def file_digest(raw: bytes) -> str:
+    h = hashlib.sha256(raw)
+    h.update(f"v{CACHE_VERSION}".encode())
+    return h.hexdigest()
+
+
+def load_model(path: str, cache_dir: Optional[str] = None,
+               validate: Optional[Callable[[Model], None]] = None) -> Model:
+    """
+    Normalised model of `path`. `validate(model)` raises on an invalid model; only
+    models that passed it are cached.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, file_digest(raw) + ".marshal")
+        try:
+            with open(cache_path, "rb") as f:
+                return marshal.loads(f.read())  # one read; marshal.load(f) reads in small chunks
+        except (OSError, EOFError, ValueError, TypeError):
+            pass  # missing or unreadable cache entry: rebuild it
+
+    model = normalize(_parse(path, raw))
+    if validate is not None:
+        validate(model)
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(marshal.dumps(model))
+        os.replace(tmp, cache_path)  # atomic: concurrent CI jobs never see a partial entry
+    return model
@@ -0,0 +1,335 @@
+"""
+Breadth-first crawler used to grow the per-(group, role) sitemaps at runtime.
+
+Each crawl starts from the rendered seeds of a role, fetches pages with that role's
+session and follows links found in HTML (href/src/action) and JSON (string values
+that look like same-origin paths). Limits:
+  - per-host concurrency (shared by all crawls running on the same loop),
+  - bounded frontier (new links are dropped once it is full),
+  - dedup on path templates (/users/10 and /users/11 are the same page shape),
+  - crawl budget: max pages, max depth and wall-clock seconds.
+Fetching runs in worker threads, each on its own copy of the user's session (same
+connection pools, headers and hooks, private cookie jar): a requests.Session is not
+safe to share between threads. A worker's jar is refreshed from the user's session
+before every request and the cookies the target sets are merged back after it, under
+one lock per crawl, so they still end up on the user's session. With a body_store.BodyStore, the full body of every
+page in the sitemap is streamed to disk; only its head is held for link extraction.
+Every fetched page can be reported to `on_page` (checkpoint journal), and a crawl can
+continue from a `resume` state instead of its seeds (see checkpoint.ResumeState).
+With `validators` from an earlier crawl (scan_store pages), pages are fetched
+conditionally; a 304 reuses the links recorded for the page and skips its body.
+"""
+import asyncio
+import json
+import threading
+import time
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from normalizer import path_template
+
+
+@dataclass
+class CrawlBudget:
+    max_pages: int = 10000          # fetched pages per crawl
+    max_depth: int = 8              # link hops from a seed
+    max_seconds: float = 600.0      # wall clock per crawl
+    max_frontier: int = 50000       # queued, not yet fetched URLs
+    per_template: int = 3           # concrete URLs fetched per path template
+    max_body_bytes: int = 2_000_000  # larger bodies are not parsed for links
+
+
+# links that would change state or end the session are never followed
+DEFAULT_EXCLUDE = ("logout", "delete", "signout")
+
+
+class _LinkParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.links: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        for name, value in attrs:
+            if name in ("href", "src", "action") and value:
+                self.links.append(value)
+
+
+def _json_links(obj: Any, out: List[str]) -> None:
+    if isinstance(obj, dict):
+        for v in obj.values():
+            _json_links(v, out)
+    elif isinstance(obj, list):
+        for v in obj:
+            _json_links(v, out)
+    elif isinstance(obj, str) and (obj.startswith("/") or obj.startswith("http")):
+        out.append(obj)
+
+
+def extract_links(body: str, content_type: str) -> List[str]:
+    out: List[str] = []
+    if "json" in content_type:
+        try:
+            _json_links(json.loads(body), out)
+        except ValueError:
+            pass
+    elif "html" in content_type or body.lstrip().startswith("<"):
+        p = _LinkParser()
+        try:
+            p.feed(body)
+        except Exception:
+            pass
+        out = p.links
+    return out
+
+
+class _WorkerSession:
+    """A worker thread's own session over the user's `session` (see module docstring)."""
+
+    def __init__(self, session: Any, lock: threading.Lock):
+        self.user, self.lock = session, lock
+        s = self.session = session.__class__()
+        for attr in ("auth", "proxies", "verify", "cert", "trust_env", "max_redirects"):
+            setattr(s, attr, getattr(session, attr))
+        s.hooks = {k: list(v) for k, v in session.hooks.items()}
+        s.adapters.clear()
+        for prefix, adapter in session.adapters.items():
+            s.mount(prefix, adapter)  # shared pools; never closed through this copy
+
+    def get(self, url: str, **kwargs) -> Any:
+        with self.lock:
+            self.session.headers = self.user.headers.copy()
+            self.session.cookies = self.user.cookies.copy()
+        resp = self.session.get(url, **kwargs)
+        with self.lock:
+            self.user.cookies.update(resp.cookies)
+        return resp
+
+
+class HostLimiter:
+    """One semaphore per host; shared between crawls so the target sees a global cap."""
+
+    def __init__(self, per_host: int = 4):
+        self.per_host = per_host
+        self._sems: Dict[str, asyncio.Semaphore] = {}
+
+    def __call__(self, host: str) -> asyncio.Semaphore:
+        sem = self._sems.get(host)
+        if sem is None:
+            sem = self._sems[host] = asyncio.Semaphore(self.per_host)
+        return sem
+
+
+async def crawl(session: Any,
+                base_url: str,
+                seeds: Iterable[str],
+                budget: Optional[CrawlBudget] = None,
+                limiter: Optional[HostLimiter] = None,
+                workers: int = 8,
+                exclude: Tuple[str, ...] = DEFAULT_EXCLUDE,
+                timeout: float = 10.0,
+                bodies=None,
+                key: Tuple[str, str] = ("", ""),
+                on_page: Optional[Callable[[str, int, bool, List[Tuple[str, int]]], None]] = None,
+                resume: Optional[Dict[str, Any]] = None,
+                validators: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Crawl `base_url` from `seeds` with `session`. Returns
+    {"sitemap": [paths in discovery order], "stats": {...}}.
+    With `bodies`, page bodies are stored and referenced under (*key, path).
+    `on_page(path, depth, in_sitemap, enqueued_links)` is called for every page that
+    got a response. `resume` {"sitemap", "fetched", "frontier", "queued"} restores an
+    interrupted crawl: fetched pages are not requested again.
+    `validators` {path: {"etag", "last_modified", "links", "sha256"}} of an earlier
+    crawl make the requests conditional (If-None-Match / If-Modified-Since); a 304
+    reuses the recorded links. It is updated in place for every page that sent an
+    ETag or Last-Modified.
+    """
+    budget = budget or CrawlBudget()
+    limiter = limiter or HostLimiter()
+    base = base_url.rstrip("/")
+    host = urlsplit(base).netloc
+    deadline = time.monotonic() + budget.max_seconds
+
+    frontier: "asyncio.Queue[Tuple[str, int]]" = asyncio.Queue()
+    queued: Set[str] = set()
+    per_tmpl: Dict[str, int] = {}
+    sitemap: List[str] = []
+    stats = {"fetched": 0, "not_modified": 0, "errors": 0, "dropped_frontier": 0, "dropped_template": 0,
+             "status": {}}
+
+    def enqueue(path: str, depth: int) -> bool:
+        if path in queued or depth > budget.max_depth:
+            return False
+        low = path.lower()
+        if any(x in low for x in exclude):
+            return False
+        t = path_template(path)
+        if per_tmpl.get(t, 0) >= budget.per_template:
+            stats["dropped_template"] += 1
+            return False
+        if frontier.qsize() >= budget.max_frontier:
+            stats["dropped_frontier"] += 1
+            return False
+        per_tmpl[t] = per_tmpl.get(t, 0) + 1
+        queued.add(path)
+        frontier.put_nowait((path, depth))
+        return True
+
+    def to_path(link: str, page: str) -> Optional[str]:
+        u = urlsplit(urljoin(base + page, link))
+        if u.scheme not in ("http", "https") or u.netloc != host:
+            return None
+        return (u.path or "/") + (f"?{u.query}" if u.query else "")
+
+    cookie_lock = threading.Lock()
+    local = threading.local()
+
+    def fetch(path: str, known: Optional[Dict[str, Any]]):
+        ws = getattr(local, "session", None)
+        if ws is None:
+            ws = local.session = _WorkerSession(session, cookie_lock)
+        headers = {}
+        if known:
+            if known.get("etag"):
+                headers["If-None-Match"] = known["etag"]
+            if known.get("last_modified"):
+                headers["If-Modified-Since"] = known["last_modified"]
+        return ws.get(base + path, headers=headers or None, timeout=timeout, allow_redirects=False, stream=True)
+
+    def read_stored(resp, path: str) -> Tuple[bytes, str]:
+        head = bytearray()
+        limit = budget.max_body_bytes + 1
+        writer = bodies.writer()
+        try:
+            for chunk in resp.iter_content(65536):
+                writer.feed(chunk)
+                if len(head) < limit:
+                    head += chunk[:limit - len(head)]
+        except BaseException:
+            writer.abort()
+            raise
+        meta = writer.commit(resp.headers.get("Content-Type", ""))
+        bodies.add_ref(key[0], key[1], path, meta["sha256"])
+        return bytes(head), meta["sha256"]
+
+    if resume is not None:
+        sitemap.extend(resume["sitemap"])
+        stats["fetched"] = len(resume["fetched"])
+        for path in resume["queued"]:
+            queued.add(path)
+            t = path_template(path)
+            per_tmpl[t] = per_tmpl.get(t, 0) + 1
+        for path, depth in resume["frontier"]:
+            frontier.put_nowait((path, depth))
+    for s in seeds:
+        enqueue(s, 0)
+
+    def exhausted() -> bool:
+        return stats["fetched"] >= budget.max_pages or time.monotonic() >= deadline
+
+    async def visit(path: str, depth: int) -> None:
+        stats["fetched"] += 1
+        known = validators.get(path) if validators is not None else None
+        if known and bodies is not None and not known.get("sha256"):
+            known = None   # the body was not stored last time: fetch it in full
+        sha256 = None
+        try:
+            async with limiter(host):
+                resp = await asyncio.to_thread(fetch, path, known)
+                try:
+                    if resp.status_code == 304 and known:
+                        raw = b""
+                    elif bodies is not None and resp.status_code < 400:
+                        raw, sha256 = await asyncio.to_thread(read_stored, resp, path)
+                    else:
+                        raw = await asyncio.to_thread(resp.raw.read, budget.max_body_bytes + 1, decode_content=True)
+                finally:
+                    resp.close()
+        except Exception:
+            stats["errors"] += 1
+            return
+
+        st = stats["status"]
+        st[resp.status_code] = st.get(resp.status_code, 0) + 1
+        if resp.status_code >= 400:
+            if on_page is not None:
+                on_page(path, depth, False, [])
+            return
+        sitemap.append(path)
+
+        if resp.status_code == 304 and known:
+            # unchanged since the earlier crawl: its links, no body
+            stats["not_modified"] += 1
+            links = list(known.get("links", ()))
+            if bodies is not None and known.get("sha256"):
+                bodies.add_ref(key[0], key[1], path, known["sha256"])
+        else:
+            loc = resp.headers.get("Location")
+            links = [loc] if loc else []
+            if len(raw) <= budget.max_body_bytes:
+                ctype = resp.headers.get("Content-Type", "")
+                links += extract_links(raw.decode(resp.encoding or "utf-8", "replace"), ctype)
+            etag, modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+            if validators is not None and (etag or modified) and len(raw) <= budget.max_body_bytes:
+                validators[path] = {"etag": etag, "last_modified": modified, "links": links, "sha256": sha256}
+        added = []
+        for link in links:
+            p = to_path(link, path)
+            if p is not None and enqueue(p, depth + 1):
+                added.append((p, depth + 1))
+        if on_page is not None:
+            on_page(path, depth, True, added)
+
+    async def worker() -> None:
+        while True:
+            path, depth = await frontier.get()
+            try:
+                if not exhausted():  # once the budget is spent the queue is only drained
+                    await visit(path, depth)
+            finally:
+                frontier.task_done()
+
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    try:
+        await frontier.join()
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {"sitemap": sitemap, "stats": stats}
+
+
+async def crawl_all(jobs: Dict[Tuple[str, str], Tuple[Any, List[str]]],
+                    base_url: str,
+                    budget: Optional[CrawlBudget] = None,
+                    per_host: int = 4,
+                    workers: int = 8,
+                    bodies=None,
+                    on_page: Optional[Callable[..., None]] = None,
+                    resume: Optional[Dict[Tuple[str, str], Dict[str, Any]]] = None,
+                    on_done: Optional[Callable[[Tuple[str, str], Dict[str, Any]], None]] = None,
+                    validators: Optional[Dict[Tuple[str, str], Dict[str, Dict[str, Any]]]] = None,
+                    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Run one crawl per (group, role) job {key: (session, seeds)} concurrently.
+    `on_page(key, path, depth, in_sitemap, links)`, `resume` {key: state} and
+    `validators` {key: {path: validators}} are the per-crawl hooks of crawl();
+    `on_done(key, result)` fires when a crawl finishes.
+    """
+    limiter = HostLimiter(per_host)
+    keys = list(jobs)
+
+    async def one(k: Tuple[str, str]) -> Dict[str, Any]:
+        page_hook = (lambda *a: on_page(k, *a)) if on_page is not None else None
+        res = await crawl(jobs[k][0], base_url, jobs[k][1], budget=budget, limiter=limiter, workers=workers,
+                          bodies=bodies, key=k, on_page=page_hook, resume=(resume or {}).get(k),
+                          validators=None if validators is None else validators.setdefault(k, {}))
+        if on_done is not None:
+            on_done(k, res)
+        return res
+
+    out = await asyncio.gather(*(one(k) for k in keys))
+    return dict(zip(keys, out))
@@ -0,0 +1,210 @@
+"""
+Object-ID enumeration for templated actions.
+
+From the values seen for a placeholder (CTX_DEFAULTS, captures) candidate ID spaces
+are derived:
+  - the value is split into a pattern and one numeric counter, e.g.
+    "inv-10-2025" -> pattern "inv-{n}-2025", counter 10 (4-digit years stay fixed,
+    zero padding is kept),
+  - values of the same pattern give a numeric range around all of them, grown to
+    `max_ids`; when they are too far apart, only their neighbourhoods are probed.
+Spaces are lazy ranges, never materialized.
+
+Probing runs block by block through a bounded thread pool with the attacker's
+session. Every block is first sampled; when no sampled ID is accessible the rest of
+the block is skipped, and after `denied_blocks` such blocks in a row the space is
+given up. Responses are reduced to fingerprints (replay.fetch_fingerprint) and
+deduplicated on (status, normalized body hash): only distinct fingerprints with a
+count and a few example IDs are kept, so memory does not grow with the ID count.
+"""
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from replay import DENIED_STATUS, fetch_fingerprint
+
+_NUM = re.compile(r"\d+")
+
+
+@dataclass
+class EnumBudget:
+    max_ids: int = 10000          # candidate IDs per space
+    radius: int = 50              # neighbours probed on each side of an observed value
+    block: int = 1024             # IDs per sampling block
+    sample: float = 0.05          # fraction of a block probed before deciding on it
+    min_sample: int = 16
+    denied_blocks: int = 3        # consecutive denied blocks that end a space
+    workers: int = 32             # requests in flight
+    max_fingerprints: int = 256   # distinct fingerprints kept per space
+    examples: int = 5             # example IDs kept per fingerprint
+    timeout: float = 10.0
+
+
+@dataclass
+class IdSpace:
+    pattern: str                  # "inv-{n}-2025"
+    width: int                    # zero-padding width of the counter, 0 if none
+    ranges: List[Tuple[int, int]] = field(default_factory=list)   # inclusive, sorted, disjoint
+
+    def render(self, n: int) -> str:
+        return self.pattern.replace("{n}", str(n).zfill(self.width) if self.width else str(n), 1)
+
+    def __len__(self) -> int:
+        return sum(hi - lo + 1 for lo, hi in self.ranges)
+
+    def __iter__(self) -> Iterator[int]:
+        for lo, hi in self.ranges:
+            yield from range(lo, hi + 1)
+
+
+def _is_year(s: str) -> bool:
+    return len(s) == 4 and 1970 <= int(s) <= 2100
+
+
+def split_id(value: str) -> Optional[Tuple[str, int, int]]:
+    """(pattern, counter, width) of an ID value, or None if it has no number."""
+    nums = list(_NUM.finditer(value))
+    if not nums:
+        return None
+    counters = [m for m in nums if not _is_year(m.group(0))] or nums[-1:]
+    m = counters[0]
+    digits = m.group(0)
+    width = len(digits) if digits.startswith("0") and len(digits) > 1 else 0
+    return value[:m.start()] + "{n}" + value[m.end():], int(digits), width
+
+
+def _merge(ranges: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    out: List[Tuple[int, int]] = []
+    for lo, hi in sorted(ranges):
+        if out and lo <= out[-1][1] + 1:
+            out[-1] = (out[-1][0], max(out[-1][1], hi))
+        else:
+            out.append((lo, hi))
+    return out
+
+
+def _cap(ranges: List[Tuple[int, int]], limit: int) -> List[Tuple[int, int]]:
+    out = []
+    for lo, hi in ranges:
+        if limit <= 0:
+            break
+        hi = min(hi, lo + limit - 1)
+        out.append((lo, hi))
+        limit -= hi - lo + 1
+    return out
+
+
+def derive_spaces(values: Iterable[str], max_ids: int = 10000, radius: int = 50) -> List[IdSpace]:
+    """Candidate ID spaces for the observed values of one placeholder."""
+    groups: Dict[Tuple[str, int], List[int]] = {}
+    for v in dict.fromkeys(values):
+        parsed = split_id(v)
+        if parsed is not None:
+            pattern, n, width = parsed
+            groups.setdefault((pattern, width), []).append(n)
+    spaces = []
+    for (pattern, width), nums in groups.items():
+        lo, hi = max(0, min(nums) - radius), max(nums) + radius
+        if hi - lo + 1 <= max_ids:
+            # one dense range around all observed values, grown to the budget
+            lo = max(0, lo - (max_ids - (hi - lo + 1)) // 2)
+            ranges = [(lo, lo + max_ids - 1)]
+        else:
+            ranges = _cap(_merge((max(0, n - radius), n + radius) for n in sorted(nums)), max_ids)
+        if width:
+            ranges = _cap([(lo, min(hi, 10 ** width - 1)) for lo, hi in ranges if lo < 10 ** width], max_ids)
+        spaces.append(IdSpace(pattern, width, ranges))
+    return spaces
+
+
+def _blocks(space: IdSpace, size: int) -> Iterator[List[int]]:
+    block: List[int] = []
+    for n in space:
+        block.append(n)
+        if len(block) == size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def enumerate_space(session: Any,
+                    url_for: Callable[[str], str],
+                    space: IdSpace,
+                    budget: Optional[EnumBudget] = None,
+                    pool: Optional[ThreadPoolExecutor] = None,
+                    on_hit: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                    rng: Optional[random.Random] = None) -> Dict[str, Any]:
+    """
+    Probe `space` with `session`; `url_for(id_value)` gives the absolute URL.
+    `on_hit(id_value, fingerprint)` is called for the first accessible ID of every
+    distinct fingerprint. Returns a summary with counters and the distinct fingerprints.
+    """
+    budget = budget or EnumBudget()
+    rng = rng or random.Random(0)
+    stats = {"pattern": space.pattern, "candidates": len(space), "probed": 0, "skipped": 0,
+             "accessible": 0, "denied": 0, "other": 0, "errors": 0, "stopped_early": False}
+    fps: Dict[Tuple[int, str], Dict[str, Any]] = {}
+    own_pool = pool is None
+    pool = pool or ThreadPoolExecutor(max_workers=budget.workers)
+
+    def probe(n: int) -> Tuple[str, Optional[Dict[str, Any]]]:
+        value = space.render(n)
+        try:
+            return value, fetch_fingerprint(session, url_for(value), timeout=budget.timeout)
+        except Exception:
+            return value, None
+
+    def run(ids: List[int]) -> int:
+        accessible = 0
+        for value, fp in pool.map(probe, ids):
+            stats["probed"] += 1
+            if fp is None:
+                stats["errors"] += 1
+                continue
+            status = fp["status"]
+            if status in DENIED_STATUS or 300 <= status < 400:
+                stats["denied"] += 1
+                continue
+            if not 200 <= status < 300:
+                stats["other"] += 1
+                continue
+            accessible += 1
+            stats["accessible"] += 1
+            key = (status, fp["norm_hash"])
+            entry = fps.get(key)
+            if entry is None:
+                if len(fps) >= budget.max_fingerprints:
+                    continue
+                entry = fps[key] = {"status": status, "norm_hash": fp["norm_hash"], "length": fp["length"],
+                                    "count": 0, "examples": []}
+                if on_hit is not None:
+                    on_hit(value, fp)
+            entry["count"] += 1
+            if len(entry["examples"]) < budget.examples:
+                entry["examples"].append(value)
+        return accessible
+
+    denied_run = 0
+    try:
+        for block in _blocks(space, budget.block):
+            k = min(len(block), max(budget.min_sample, int(len(block) * budget.sample)))
+            picked = set(rng.sample(range(len(block)), k))
+            if run([block[i] for i in sorted(picked)]):
+                denied_run = 0
+                run([n for i, n in enumerate(block) if i not in picked])
+                continue
+            stats["skipped"] += len(block) - k
+            denied_run += 1
+            if denied_run >= budget.denied_blocks:
+                stats["skipped"] += len(space) - stats["probed"] - stats["skipped"]
+                stats["stopped_early"] = True
+                break
+    finally:
+        if own_pool:
+            pool.shutdown()
+    stats["distinct"] = len(fps)
+    stats["fingerprints"] = sorted(fps.values(), key=lambda e: -e["count"])
+    return stats
@@ -0,0 +1,191 @@
+"""
+Streaming sink for differential-analysis findings.
+
+Findings are fed one at a time and aggregated online by
+(attacker role, victim role, path template, flag set): per group a count, the count
+per confidence and per replay verdict, and the first `samples` URLs. Nothing else of
+a finding is kept, so memory and report size grow with the number of distinct
+issues, not with the number of URLs (/users/1 ... /users/50000 is one group).
+
+The groups can be written as:
+  .jsonl  one JSON object per group (write_jsonl)
+  .sarif  SARIF 2.1.0, one result per group, one rule per flag set
+  summary compact text table (to a file, or returned by summary())
+FindingSink streams instead: the JSONL, SARIF and summary files are rewritten from the
+groups at most `flush_interval` seconds apart, so partial results are on disk while
+the scan runs; on request every single finding is also appended to its own JSONL file
+as it is emitted.
+"""
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from normalizer import path_template
+
+GroupKey = Tuple[str, str, str, Tuple[str, ...]]  # (attacker, victim, template, flags)
+
+# best first: the group's reported confidence is the best one seen in it
+CONFIDENCE_RANK = {"confirmed": 4, "high": 3, "medium": 2, "low": 1, "refuted": 0}
+SARIF_LEVEL = {"confirmed": "error", "high": "error", "medium": "warning", "low": "note", "refuted": "none"}
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def _artifact_uri(g: Dict[str, Any]) -> str:
+    """A valid URI for a group: the path of its first example, the template without braces otherwise."""
+    path = urlsplit(g["examples"][0]).path if g["examples"] else _PLACEHOLDER.sub(r"\1", g["path_template"])
+    return quote(path or "/", safe="/:@!$&'()*+,;=-._~%")
+
+
+class FindingAggregator:
+    def __init__(self, samples: int = 5):
+        self.samples = samples
+        self.groups: Dict[GroupKey, Dict[str, Any]] = {}
+        self.total = 0
+
+    def emit(self, finding: Dict[str, Any]) -> None:
+        key = (finding["attacker_role"], finding["victim_role"], path_template(finding["url"]),
+               tuple(sorted(finding["flags"])))
+        g = self.groups.get(key)
+        if g is None:
+            g = self.groups[key] = {
+                "attacker_role": key[0], "victim_role": key[1], "path_template": key[2], "flags": list(key[3]),
+                "count": 0, "confidence": finding["confidence"], "by_confidence": {}, "by_verdict": {},
+                "examples": [],
+            }
+        self.total += 1
+        g["count"] += 1
+        conf = finding["confidence"]
+        g["by_confidence"][conf] = g["by_confidence"].get(conf, 0) + 1
+        if CONFIDENCE_RANK.get(conf, 0) > CONFIDENCE_RANK.get(g["confidence"], 0):
+            g["confidence"] = conf
+        verdict = (finding.get("replay") or {}).get("verdict")
+        if verdict:
+            g["by_verdict"][verdict] = g["by_verdict"].get(verdict, 0) + 1
+        if len(g["examples"]) < self.samples:
+            g["examples"].append(finding["url"])
+
+    def emit_all(self, findings: Iterable[Dict[str, Any]]) -> None:
+        for f in findings:
+            self.emit(f)
+
+    def sorted_groups(self) -> List[Dict[str, Any]]:
+        return sorted(self.groups.values(),
+                      key=lambda g: (-CONFIDENCE_RANK.get(g["confidence"], 0), -g["count"],
+                                     g["attacker_role"], g["victim_role"], g["path_template"]))
+
+    # --- writers ---
+    def jsonl(self) -> str:
+        return "".join(json.dumps(g, separators=(",", ":")) + "\n" for g in self.sorted_groups())
+
+    def write_jsonl(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.jsonl())
+
+    def sarif(self) -> Dict[str, Any]:
+        rules: Dict[str, Dict[str, Any]] = {}
+        results = []
+        for g in self.sorted_groups():
+            rule_id = "idor/" + "+".join(g["flags"])
+            rules.setdefault(rule_id, {
+                "id": rule_id,
+                "name": "".join(p.title() for f in g["flags"] for p in f.split("_")),
+                "shortDescription": {"text": "Potential IDOR: " + ", ".join(g["flags"])},
+            })
+            results.append({
+                "ruleId": rule_id,
+                "level": SARIF_LEVEL.get(g["confidence"], "warning"),
+                "message": {"text": f"{g['attacker_role']} can reach {g['victim_role']}-only "
+                                    f"{g['path_template']} ({g['count']} URLs, confidence {g['confidence']})"},
+                "locations": [{"physicalLocation": {"artifactLocation": {"uri": _artifact_uri(g)}}}],
+                "partialFingerprints": {"idorGroup/v1": "|".join((g["attacker_role"], g["victim_role"],
+                                                                   g["path_template"], rule_id))},
+                "properties": {k: g[k] for k in ("attacker_role", "victim_role", "path_template", "count",
+                                                 "confidence", "by_confidence", "by_verdict", "examples")},
+            })
+        return {
+            "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+            "version": "2.1.0",
+            "runs": [{"tool": {"driver": {"name": "IDOR-detection", "rules": list(rules.values())}},
+                      "results": results}],
+        }
+
+    def write_sarif(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.sarif(), f, indent=1)
+
+    def summary(self) -> str:
+        lines = [f"{self.total} findings in {len(self.groups)} distinct issues"]
+        for g in self.sorted_groups():
+            lines.append(f"  [{g['confidence']:>9}] {g['attacker_role']} -> {g['victim_role']} "
+                         f"{g['path_template']} x{g['count']} ({', '.join(g['flags'])})")
+        return "\n".join(lines)
+
+
+def _write_atomic(path: str, text: str) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class FindingSink(FindingAggregator):
+    """
+    FindingAggregator that streams to files: `jsonl`, `sarif` and `summary` hold the
+    aggregated issues (one JSONL record per group, as write_jsonl), `findings` gets one
+    line per finding (with its path_template) as it is emitted. All are brought up to
+    date every `flush_interval` seconds and on close(). Only the groups are kept in memory.
+    """
+
+    def __init__(self, jsonl: Optional[str] = None, sarif: Optional[str] = None,
+                 summary: Optional[str] = None, findings: Optional[str] = None,
+                 samples: int = 5, flush_interval: float = 5.0):
+        super().__init__(samples)
+        self.paths = {"jsonl": jsonl, "sarif": sarif, "summary": summary, "findings": findings}
+        self.flush_interval = flush_interval
+        self._findings = open(findings, "w", encoding="utf-8") if findings else None
+        self._flushed = time.monotonic()
+        self._dirty = False
+
+    def emit(self, finding: Dict[str, Any]) -> None:
+        super().emit(finding)
+        if self._findings is not None:
+            line = dict(finding, path_template=path_template(finding["url"]))
+            self._findings.write(json.dumps(line, separators=(",", ":"), default=str) + "\n")
+        self._dirty = True
+        if time.monotonic() - self._flushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._findings is not None:
+            self._findings.flush()
+        if self._dirty:
+            if self.paths["jsonl"]:
+                _write_atomic(self.paths["jsonl"], self.jsonl())
+            if self.paths["sarif"]:
+                _write_atomic(self.paths["sarif"], json.dumps(self.sarif(), indent=1))
+            if self.paths["summary"]:
+                _write_atomic(self.paths["summary"], self.summary() + "\n")
+            self._dirty = False
+        self._flushed = time.monotonic()
+
+    def close(self) -> None:
+        self._dirty = True  # reports exist even when nothing was found
+        self.flush()
+        if self._findings is not None:
+            self._findings.close()
+            self._findings = None
+
+    def __enter__(self) -> "FindingSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
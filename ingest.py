@@ -0,0 +1,320 @@
+"""
+Streaming ingestion of proxy captures (captures.jsonl written by proxy.py).
+
+Records are read lazily, one line at a time, from plain (optionally memory-mapped),
+gzip or zstd segments, and folded into a CaptureIndex keyed by
+(method, path_template). Each entry becomes one deduplicated endpoint with named
+placeholders (/api/users/{id} -> /api/users/{user_id}), the form fields seen in
+request bodies and a bounded sample of the observed parameter values.
+
+The index remembers how far it got in every file, so ingesting the same capture set
+again only reads what was appended since, and follow() tails the active segment.
+"""
+import base64
+import glob
+import gzip
+import json
+import mmap
+import os
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from normalizer import path_template
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def capture_files(path: str) -> List[str]:
+    """Rotated segments of `path` (oldest first) followed by the active file."""
+    d = os.path.dirname(path) or "."
+    base = os.path.basename(path)
+    m = re.match(r"^(.*?)(\.jsonl(?:\.gz|\.zst)?)$", base)
+    stem, ext = (m.group(1), m.group(2)) if m else (base, "")
+    rotated = sorted(glob.glob(os.path.join(glob.escape(d), f"{glob.escape(stem)}.[0-9]*{ext}")))
+    out = [p for p in rotated if os.path.basename(p)[len(stem) + 1:len(os.path.basename(p)) - len(ext)].isdigit()]
+    if os.path.exists(path):
+        out.append(path)
+    return out
+
+
+def _open_stream(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ValueError(f"{path}: reading zstd captures needs the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+def iter_lines(path: str, offset: int = 0, use_mmap: bool = False) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yield (end_offset, line) for every complete line after `offset`. Offsets are in
+    uncompressed bytes. A trailing partial line (still being written) is not yielded.
+    """
+    if use_mmap and not path.endswith((".gz", ".zst")):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size <= offset:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                mm.seek(offset)
+                pos = offset
+                for line in iter(mm.readline, b""):
+                    if not line.endswith(b"\n"):
+                        return
+                    pos += len(line)
+                    yield pos, line
+        return
+
+    with _open_stream(path) as f:
+        pos = 0
+        if offset:
+            if hasattr(f, "seekable") and f.seekable() and not path.endswith((".gz", ".zst")):
+                f.seek(offset)
+                pos = offset
+            else:
+                while pos < offset:  # compressed: skip what we already consumed
+                    chunk = f.read(min(1 << 20, offset - pos))
+                    if not chunk:
+                        return
+                    pos += len(chunk)
+        try:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                pos += len(line)
+                yield pos, line
+        except EOFError:
+            return  # compressed segment still being written
+
+
+def iter_records(path: str, use_mmap: bool = False) -> Iterator[Dict[str, Any]]:
+    """Capture records of a rotated set (`path` is the active file name), oldest first."""
+    for p in capture_files(path):
+        for _, line in iter_lines(p, use_mmap=use_mmap):
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def _singular(seg: str) -> str:
+    seg = re.sub(r"\W", "_", seg.lower()).strip("_")
+    if seg.endswith("ies"):
+        return seg[:-3] + "y"
+    if seg.endswith("s") and not seg.endswith("ss"):
+        return seg[:-1]
+    return seg or "param"
+
+
+def name_placeholders(template: str) -> str:
+    """/api/users/{id}/invoices/{id} -> /api/users/{user_id}/invoices/{invoice_id}"""
+    segs = template.split("/")
+    used: Dict[str, int] = {}
+    for i, seg in enumerate(segs):
+        if not _PLACEHOLDER.search(seg):
+            continue
+        prev = next((s for s in reversed(segs[:i]) if s and not _PLACEHOLDER.search(s)), "")
+        base = f"{_singular(prev)}_id" if prev else "id"
+        if not base[0].isalpha():
+            base = "p_" + base
+        n = used.get(base, 0)
+        used[base] = n + 1
+        name = base if n == 0 else f"{base}{n + 1}"
+        segs[i] = _PLACEHOLDER.sub("{" + name + "}", seg, count=1)
+    return "/".join(segs)
+
+
+def _template_regex(template: str) -> re.Pattern:
+    parts = _PLACEHOLDER.split(template)
+    rx = "".join(re.escape(p) if i % 2 == 0 else f"(?P<{p}>[^/]+?)" for i, p in enumerate(parts))
+    return re.compile(f"^{rx}$")
+
+
+def _body_fields(rec: Dict[str, Any]) -> Dict[str, str]:
+    raw = rec.get("body_b64") or ""
+    if not raw:
+        return {}
+    try:
+        body = base64.b64decode(raw)
+    except ValueError:
+        return {}
+    text = body.decode("utf-8", "replace").strip()
+    if text.startswith("{"):
+        try:
+            obj = json.loads(text)
+        except ValueError:
+            return {}
+        return {str(k): v if isinstance(v, str) else json.dumps(v) for k, v in obj.items()} if isinstance(obj, dict) else {}
+    return dict(parse_qsl(text, keep_blank_values=True))
+
+
+class Endpoint:
+    """One deduplicated (method, template) group."""
+    __slots__ = ("method", "raw_template", "template", "action_id", "count", "status", "fields", "values", "_rx")
+
+    def __init__(self, method: str, template: str):
+        self.method = method
+        self.raw_template = template
+        self.template = name_placeholders(template)
+        slug = re.sub(r"[^a-z0-9]+", "_", _PLACEHOLDER.sub(r"\1", self.template).lower()).strip("_")
+        self.action_id = f"{method.lower()}_{slug or 'root'}"
+        self.count = 0
+        self.status: Dict[int, int] = {}
+        self.fields: Dict[str, str] = {}          # form field -> "{field}" placeholder
+        self.values: Dict[str, Dict[str, None]] = {}  # placeholder -> observed values (ordered, bounded)
+        self._rx = _template_regex(self.template)
+
+    @property
+    def type(self) -> str:
+        return "state-preserving" if self.method in _SAFE_METHODS else "state-changing"
+
+    def _observe(self, name: str, value: str, max_values: int) -> None:
+        seen = self.values.setdefault(name, {})
+        if len(seen) < max_values:
+            seen[value] = None
+
+    def add(self, rec: Dict[str, Any], max_values: int) -> None:
+        self.count += 1
+        st = rec.get("status")
+        if st is not None:
+            self.status[st] = self.status.get(st, 0) + 1
+        path = urlsplit(rec.get("url") or "").path
+        m = self._rx.match(path)
+        if m:
+            for name, value in m.groupdict().items():
+                self._observe(name, value, max_values)
+        for k, v in _body_fields(rec).items():
+            self.fields.setdefault(k, "{" + k + "}")
+            self._observe(k, v, max_values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"method": self.method, "template": self.raw_template, "count": self.count,
+                "status": {str(k): v for k, v in self.status.items()},
+                "fields": self.fields, "values": {k: list(v) for k, v in self.values.items()}}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Endpoint":
+        e = cls(d["method"], d["template"])
+        e.count = d["count"]
+        e.status = {int(k): v for k, v in d["status"].items()}
+        e.fields = d["fields"]
+        e.values = {k: dict.fromkeys(v) for k, v in d["values"].items()}
+        return e
+
+
+class CaptureIndex:
+    def __init__(self, max_values: int = 1000):
+        self.max_values = max_values
+        self.endpoints: Dict[Tuple[str, str], Endpoint] = {}
+        # path -> (inode, mtime, offset): how far each file has been ingested
+        self.progress: Dict[str, Tuple[int, float, int]] = {}
+
+    def add(self, rec: Dict[str, Any]) -> None:
+        method = (rec.get("method") or "GET").upper()
+        tmpl = rec.get("path_template") or path_template(urlsplit(rec.get("url") or "").path)
+        tmpl = tmpl.split("?", 1)[0]
+        key = (method, tmpl)
+        ep = self.endpoints.get(key)
+        if ep is None:
+            ep = self.endpoints[key] = Endpoint(method, tmpl)
+        ep.add(rec, self.max_values)
+
+    def ingest_file(self, path: str, use_mmap: bool = False) -> int:
+        """Ingest new lines of one file; returns the number of records added."""
+        st = os.stat(path)
+        prev = self.progress.get(path)
+        if prev is None or prev[0] != st.st_ino:
+            # a rotated segment keeps the inode of the active file it was renamed from
+            prev = next((v for v in self.progress.values() if v[0] == st.st_ino), None)
+        ino, mtime, offset = prev or (st.st_ino, 0.0, 0)
+        if offset and mtime == st.st_mtime and path.endswith((".gz", ".zst")):
+            return 0  # compressed segment unchanged since last time
+        if not path.endswith((".gz", ".zst")) and st.st_size < offset:
+            offset = 0  # truncated
+        n = 0
+        for offset, line in iter_lines(path, offset, use_mmap=use_mmap):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                self.add(json.loads(line))
+            except ValueError:
+                continue
+            n += 1
+        self.progress[path] = (st.st_ino, st.st_mtime, offset)
+        return n
+
+    def ingest(self, path: str, use_mmap: bool = False) -> int:
+        """Ingest a capture set (rotated segments + active file). Already seen data is skipped."""
+        return sum(self.ingest_file(p, use_mmap=use_mmap) for p in capture_files(path))
+
+    def follow(self, path: str, poll_interval: float = 1.0,
+               stop_after: Optional[float] = None) -> Iterator[int]:
+        """Tail a capture set; yields the number of new records after every poll that found some."""
+        t_end = None if stop_after is None else time.monotonic() + stop_after
+        while t_end is None or time.monotonic() < t_end:
+            n = self.ingest(path)
+            if n:
+                yield n
+            time.sleep(poll_interval)
+
+    def save(self, path: str) -> None:
+        data = {"max_values": self.max_values,
+                "progress": self.progress,
+                "endpoints": [e.to_dict() for e in self.endpoints.values()]}
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CaptureIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        ix = cls(max_values=data.get("max_values", 1000))
+        ix.progress = {k: tuple(v) for k, v in data.get("progress", {}).items()}
+        for d in data.get("endpoints", []):
+            e = Endpoint.from_dict(d)
+            ix.endpoints[(e.method, e.raw_template)] = e
+        return ix
+
+
+def main() -> None:
+    import argparse
+    ap = argparse.ArgumentParser(description="Ingest proxy captures into deduplicated endpoints")
+    ap.add_argument("captures", help="active capture file, e.g. captures.jsonl")
+    ap.add_argument("--index", help="index file to resume from and save to")
+    ap.add_argument("--mmap", action="store_true", help="memory-map plain capture files")
+    ap.add_argument("--follow", action="store_true", help="keep tailing the capture set")
+    args = ap.parse_args()
+
+    ix = CaptureIndex.load(args.index) if args.index and os.path.exists(args.index) else CaptureIndex()
+    n = ix.ingest(args.captures, use_mmap=args.mmap)
+    print(f"ingested {n} records, {len(ix.endpoints)} endpoints")
+    for e in ix.endpoints.values():
+        print(f"  - {e.action_id} [{e.type}] {e.method} {e.template} x{e.count} params={sorted(e.values)}")
+    if args.index:
+        ix.save(args.index)
+    if args.follow:
+        try:
+            for n in ix.follow(args.captures):
+                print(f"+{n} records, {len(ix.endpoints)} endpoints")
+                if args.index:
+                    ix.save(args.index)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
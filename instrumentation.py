@@ -0,0 +1,164 @@
+"""
+Stage timers, counters, histograms and the scanner's log output.
+
+    METRICS.inc("findings", confidence="high")
+    METRICS.observe("http_request_seconds", 0.012, status="2xx")
+    with METRICS.stage("differential_analysis"):
+        ...
+    METRICS.dump("metrics.prom")           # Prometheus text; any other suffix -> JSON
+
+Stages can be profiled with cProfile (enable_profiling(dir) writes <stage>.prof per
+stage) and traced with hooks called as hook(stage, "start"|"end", elapsed).
+Logging goes through the "idor" logger: per-item detail is DEBUG, stage summaries
+INFO. setup_logging() picks the level and a text (message only) or JSON-lines format.
+"""
+import bisect
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.001, 0.01, 0.1, 1.0, 10.0, 60.0, 600.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.stages: Dict[str, float] = {}  # stage -> total seconds
+        self.hooks: List[Callable[[str, str, float], None]] = []
+        self.profile_dir: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels: Any) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = Histogram(buckets)
+            h.observe(value)
+
+    def record_response(self, resp, *args, **kwargs) -> None:
+        """requests response hook: request count and latency by status class."""
+        status = f"{resp.status_code // 100}xx"
+        self.inc("http_requests", status=status, method=resp.request.method)
+        self.observe("http_request_seconds", resp.elapsed.total_seconds(), status=status)
+
+    def enable_profiling(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.profile_dir = directory
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        for hook in self.hooks:
+            hook(name, "start", 0.0)
+        prof = cProfile.Profile() if self.profile_dir else None
+        t0 = time.perf_counter()
+        if prof:
+            prof.enable()
+        try:
+            yield
+        finally:
+            if prof:
+                prof.disable()
+                prof.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+            dt = time.perf_counter() - t0
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + dt
+            self.observe("stage_seconds", dt, STAGE_BUCKETS, stage=name)
+            for hook in self.hooks:
+                hook(name, "end", dt)
+
+    # --- export ---
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stages": dict(self.stages),
+                "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self.counters.items())],
+                "histograms": [{"name": n, "labels": dict(l), "count": h.count, "sum": h.sum,
+                                "buckets": dict(zip([str(b) for b in h.buckets] + ["+Inf"], h.counts))}
+                               for (n, l), h in sorted(self.histograms.items())],
+            }
+
+    def to_prometheus(self, prefix: str = "idor_") -> str:
+        def fmt(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            typed = set()
+            for (name, labels), v in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {prefix}{name}_total counter")
+                    typed.add(name)
+                lines.append(f"{prefix}{name}_total{fmt(labels)} {v}")
+            for (name, labels), h in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {prefix}{name} histogram")
+                    typed.add(name)
+                cum = 0
+                for b, c in zip([str(b) for b in h.buckets] + ["+Inf"], h.counts):
+                    cum += c
+                    lines.append(f"{prefix}{name}_bucket{fmt(labels, (('le', b),))} {cum}")
+                lines.append(f"{prefix}{name}_sum{fmt(labels)} {h.sum}")
+                lines.append(f"{prefix}{name}_count{fmt(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        data = self.to_prometheus() if path.endswith((".prom", ".txt")) else json.dumps(self.to_dict(), indent=2) + "\n"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+
+METRICS = Metrics()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {"ts": round(record.created, 3), "level": record.levelname, "logger": record.name,
+               "msg": record.getMessage()}
+        doc.update(getattr(record, "fields", None) or {})
+        return json.dumps(doc, default=str)
+
+
+def setup_logging(level: str = "INFO", fmt: str = "text", stream=None) -> logging.Logger:
+    """Configure the "idor" logger; text prints the bare message like the old console output."""
+    log = logging.getLogger("idor")
+    log.handlers.clear()
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+    log.setLevel(getattr(logging, level.upper()))
+    log.propagate = False
+    return log
@@ -0,0 +1,127 @@
+"""
+Concurrent execution of a UCL against a live target.
+
+The UCL is a serial order. Here it is turned into a small DAG so independent use
+cases can run at the same time:
+  - a use case waits for its dependencies that appear earlier in the UCL,
+  - two use cases where one cancels the other keep their UCL order,
+  - use cases of the same role (same user session) keep their UCL order,
+    so cookies and CSRF state evolve exactly as in a serial run.
+Each group (G1, G2) runs its own copy of the DAG, so work is spread across roles
+and across groups.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+UCKey = Tuple[str, str]  # (action_id, role)
+TaskKey = Tuple[str, UCKey]  # (group label, uc key)
+
+
+def ucl_predecessors(ucl: List[UCKey],
+                     deps: Dict[UCKey, Set[UCKey]],
+                     cancels: Dict[UCKey, Set[UCKey]]) -> Dict[UCKey, List[UCKey]]:
+    """For every UC in the UCL, the earlier UCs it has to wait for."""
+    pos = {k: i for i, k in enumerate(ucl)}
+    preds: Dict[UCKey, Set[UCKey]] = {k: set() for k in ucl}
+    last_of_role: Dict[str, UCKey] = {}
+
+    for k in ucl:
+        i = pos[k]
+        # same user session -> keep order (one edge to the previous UC of the role is enough)
+        prev = last_of_role.get(k[1])
+        if prev is not None:
+            preds[k].add(prev)
+        last_of_role[k[1]] = k
+        # prerequisites that were executed earlier
+        for p in deps.get(k, ()):
+            if p in pos and pos[p] < i:
+                preds[k].add(p)
+        # cancellation conflicts, in both directions
+        for v in cancels.get(k, ()):
+            if v in pos and v != k:
+                a, b = (v, k) if pos[v] < i else (k, v)
+                preds[b].add(a)
+
+    return {k: sorted(ps, key=pos.__getitem__) for k, ps in preds.items()}
+
+
+def run_ucl_concurrent(ucl: List[UCKey],
+                       preds: Dict[UCKey, List[UCKey]],
+                       groups: Dict[str, Dict[str, Any]],
+                       send: Callable[[str, Any, UCKey], Dict],
+                       max_workers: int = 8) -> List[Dict]:
+    """
+    Run `send(group_label, user, uc_key)` for every UC of the UCL in every group,
+    as soon as its predecessors (in the same group) have completed.
+    If `send` raises, its record gets an "error" and the UCs that (transitively) wait
+    on it are not sent: their records have "skipped": True and a "reason", no "error".
+    Results come back in (group, UCL) order.
+    """
+    pos = {k: i for i, k in enumerate(ucl)}
+    succs: Dict[UCKey, List[UCKey]] = {k: [] for k in ucl}
+    for k, ps in preds.items():
+        for p in ps:
+            succs[p].append(k)
+
+    waiting: Dict[TaskKey, int] = {}
+    ready: List[TaskKey] = []
+    results: Dict[TaskKey, Dict] = {}
+    for label, users in groups.items():
+        for k in ucl:
+            if k[1] not in users:
+                raise ValueError(f"Unknown role in UCL: {k[1]}")
+            t = (label, k)
+            waiting[t] = len(preds.get(k, ()))
+            if waiting[t] == 0:
+                ready.append(t)
+
+    def _run(t: TaskKey) -> Dict:
+        label, k = t
+        t0 = time.perf_counter()
+        rec = send(label, groups[label][k[1]], k)
+        rec.setdefault("elapsed", time.perf_counter() - t0)
+        return rec
+
+    def _release(t: TaskKey, failed: bool) -> None:
+        label = t[0]
+        if not failed:
+            for s in succs[t[1]]:
+                st = (label, s)
+                if st in results:
+                    continue  # already skipped through another, failed predecessor
+                waiting[st] -= 1
+                if waiting[st] == 0:
+                    ready.append(st)
+            return
+        # skip everything downstream of the failed UC; explicit stack, chains can be long
+        stack = [t[1]]
+        while stack:
+            k = stack.pop()
+            for s in succs[k]:
+                st = (label, s)
+                if st in results:
+                    continue
+                results[st] = {"group": label, "action_id": s[0], "role": s[1],
+                               "skipped": True, "reason": f"predecessor failed: {k}"}
+                stack.append(s)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+        while ready or running:
+            while ready:
+                t = ready.pop()
+                running[pool.submit(_run, t)] = t
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                t = running.pop(fut)
+                exc = fut.exception()
+                if exc is None:
+                    results[t] = fut.result()
+                else:
+                    results[t] = {"group": t[0], "action_id": t[1][0], "role": t[1][1],
+                                  "error": repr(exc)}
+                _release(t, exc is not None)
+
+    order = {label: i for i, label in enumerate(groups)}
+    return [results[t] for t in sorted(results, key=lambda t: (order[t[0]], pos[t[1]]))]
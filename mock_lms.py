@@ -0,0 +1,237 @@
+# python mock_lms.py [--port 8000] [--users 200] [--courses 50]
+# Local stand-in LMS for benchmarks and demos: serves the endpoints of the scanner's
+# ACTIONS with a handful of deliberate authorization bugs (see BUGS).
+import argparse
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Set
+from urllib.parse import parse_qs
+
+# PHPSESSID -> (role, user id); the values match ROLES[*].cookies in IDOR-detection.py
+SESSIONS = {
+    "admin_cookie_val": ("Admin", 1),
+    "instructor_cookie_val": ("Instructor", 2),
+    "student_cookie_val": ("Student", 10),
+}
+CREDENTIALS = {"admin": ("adminpw", "admin_cookie_val"),
+               "instructor": ("instructorpw", "instructor_cookie_val"),
+               "student": ("studentpw", "student_cookie_val")}
+
+# Deliberate IDOR / missing function-level access control bugs, by route.
+BUGS = {
+    "GET /users/{id}": "any logged-in user can read any profile",
+    "GET /billing/invoices/{invoice}.pdf": "invoices are served without an ownership check",
+    "GET /instructor/courses/{id}/grades": "gradebook only checks for a session, not the Instructor role",
+    "GET /admin/users/{id}": "admin user detail only checks for a session, not the Admin role",
+}
+
+_FILLER = "<p>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20 + "</p>"
+
+
+def _page(title: str, links=(), body: str = "") -> bytes:
+    items = "".join(f'<li><a href="{h}">{h}</a></li>' for h in links)
+    return (f"<html><head><title>{title}</title></head><body><h1>{title}</h1>"
+            f"<ul>{items}</ul>{body}{_FILLER}</body></html>").encode("utf-8")
+
+
+class LMSState:
+    def __init__(self, n_users: int = 200, n_courses: int = 50):
+        self.users = {1: "Admin", 2: "Instructor"}
+        self.users.update({uid: "Student" for uid in range(10, 10 + n_users)})
+        self.courses: Dict[int, int] = {cid: 2 for cid in range(101, 101 + n_courses)}  # course -> owner
+        self.enrolled: Dict[int, Set[int]] = {cid: {10} for cid in self.courses}
+        self.deleted: Set[int] = set()
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "MockLMS/0.1"
+    protocol_version = "HTTP/1.1"
+    state: LMSState  # set on the subclass by make_server
+
+    def log_message(self, *args) -> None:
+        pass
+
+    # --- helpers ---
+    def _session(self):
+        for part in (self.headers.get("Cookie") or "").split(";"):
+            k, _, v = part.strip().partition("=")
+            if k == "PHPSESSID" and v in SESSIONS:
+                return SESSIONS[v]
+        return None
+
+    def _send(self, status: int, body: bytes = b"", ctype: str = "text/html", headers=None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _form(self) -> Dict[str, str]:
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(n).decode("utf-8", "replace") if n else ""
+        return {k: v[0] for k, v in parse_qs(raw).items()}
+
+    def _course(self, cid: str) -> Optional[int]:
+        c = int(cid)
+        return c if c in self.state.courses and c not in self.state.deleted else None
+
+    # --- routing ---
+    def do_GET(self) -> None:
+        with self.state.lock:
+            self.state.requests += 1
+        path = self.path.split("?", 1)[0]
+        sess = self._session()
+        st = self.state
+
+        if path == "/":
+            links = ["/courses"]
+            if sess:
+                role, uid = sess
+                links.append(f"/users/{uid}")
+                if role == "Admin":
+                    links.append("/admin/users")
+                if role == "Student":
+                    links.append(f"/billing/invoices/inv-{uid}-2025.pdf")
+                    links += [f"/student/courses/{c}/grades" for c, us in st.enrolled.items() if uid in us]
+                if role == "Instructor":
+                    links += [f"/instructor/courses/{c}/grades" for c, o in st.courses.items() if o == uid]
+            return self._send(200, _page("Dashboard", links))
+        if path == "/courses":
+            return self._send(200, _page("Courses", [f"/courses/{c}" for c in st.courses if c not in st.deleted]))
+
+        m = re.fullmatch(r"/courses/(\d+)", path)
+        if m:
+            c = self._course(m.group(1))
+            return self._send(200, _page(f"Course {c}")) if c else self._send(404, _page("Not found"))
+        if not sess:
+            return self._send(401, _page("Login required"))
+        role, uid = sess
+
+        m = re.fullmatch(r"/instructor/courses/(\d+)/grades", path)
+        if m:  # BUG: no role / ownership check
+            c = self._course(m.group(1))
+            if not c:
+                return self._send(404, _page("Not found"))
+            rows = "".join(f"<tr><td>{u}</td><td>{(u * 7 + c) % 100}</td></tr>" for u in sorted(st.enrolled[c]))
+            return self._send(200, _page(f"Gradebook {c}", body=f"<table>{rows}</table>"))
+        m = re.fullmatch(r"/student/courses/(\d+)/grades", path)
+        if m:
+            c = self._course(m.group(1))
+            if not c or uid not in st.enrolled[c]:
+                return self._send(403, _page("Forbidden"))
+            return self._send(200, _page(f"My grades {c}", body=f"<p>{(uid * 7 + c) % 100}</p>"))
+        m = re.fullmatch(r"/users/(\d+)", path)
+        if m:  # BUG: any session can read any profile
+            u = int(m.group(1))
+            if u not in st.users:
+                return self._send(404, _page("Not found"))
+            links = [f"/billing/invoices/inv-{u}-2025.pdf"] if st.users[u] == "Student" else []
+            return self._send(200, _page(f"Profile {u}", links, f"<p>user{u}@example.edu</p>"))
+        m = re.fullmatch(r"/billing/invoices/inv-(\d+)-(\d{4})\.pdf", path)
+        if m:  # BUG: no ownership check
+            u = int(m.group(1))
+            if u not in st.users:
+                return self._send(404, b"", "application/pdf")
+            return self._send(200, f"%PDF-1.4 invoice {u} {m.group(2)} total {u * 13}.00".encode(), "application/pdf")
+        if path == "/admin/users":
+            if role != "Admin":
+                return self._send(403, _page("Forbidden"))
+            return self._send(200, _page("Users", [f"/admin/users/{u}" for u in st.users]))
+        m = re.fullmatch(r"/admin/users/(\d+)", path)
+        if m:  # BUG: no Admin check
+            u = int(m.group(1))
+            if u not in st.users:
+                return self._send(404, _page("Not found"))
+            return self._send(200, _page(f"User {u}", body=f"<p>role={st.users[u]} email=user{u}@example.edu</p>"))
+        return self._send(404, _page("Not found"))
+
+    do_HEAD = do_GET
+
+    def do_POST(self) -> None:
+        with self.state.lock:
+            self.state.requests += 1
+        path = self.path.split("?", 1)[0]
+        form = self._form()
+        st = self.state
+
+        if path == "/login":
+            cred = CREDENTIALS.get(form.get("username", ""))
+            if not cred or cred[0] != form.get("password"):
+                return self._send(401, _page("Bad credentials"))
+            return self._send(200, _page("Welcome", ["/"]), headers={"Set-Cookie": f"PHPSESSID={cred[1]}; Path=/"})
+        sess = self._session()
+        if path == "/logout":
+            return self._send(200, _page("Bye"))
+        if not sess:
+            return self._send(401, _page("Login required"))
+        role, uid = sess
+
+        if path == "/api/courses":
+            if role not in ("Admin", "Instructor"):
+                return self._send(403, b'{"error":"forbidden"}', "application/json")
+            with st.lock:
+                cid = max(st.courses) + 1
+                st.courses[cid] = uid
+                st.enrolled[cid] = set()
+            return self._send(201, json.dumps({"id": cid, "title": form.get("title")}).encode(), "application/json")
+        m = re.fullmatch(r"/api/courses/(\d+)/(delete|enroll)", path)
+        if m:
+            c = self._course(m.group(1))
+            if not c:
+                return self._send(404, b'{"error":"not found"}', "application/json")
+            if role != "Admin" and st.courses[c] != uid:
+                return self._send(403, b'{"error":"forbidden"}', "application/json")
+            with st.lock:
+                if m.group(2) == "delete":
+                    st.deleted.add(c)
+                elif (form.get("userId") or "").isdigit():
+                    st.enrolled[c].add(int(form["userId"]))
+            return self._send(200, b'{"ok":true}', "application/json")
+        m = re.fullmatch(r"/users/(\d+)", path)
+        if m:
+            if role != "Admin" and int(m.group(1)) != uid:
+                return self._send(403, _page("Forbidden"))
+            return self._send(200, _page("Saved"))
+        return self._send(404, _page("Not found"))
+
+
+def make_server(host: str = "127.0.0.1", port: int = 0, n_users: int = 200, n_courses: int = 50) -> ThreadingHTTPServer:
+    """Server with fresh state (server.state); port 0 picks a free port."""
+    state = LMSState(n_users, n_courses)
+    handler = type("BoundHandler", (Handler,), {"state": state})
+    srv = ThreadingHTTPServer((host, port), handler)
+    srv.daemon_threads = True
+    srv.state = state
+    return srv
+
+
+def start_in_thread(**kwargs) -> ThreadingHTTPServer:
+    srv = make_server(**kwargs)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Mock LMS with deliberate IDOR bugs")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--courses", type=int, default=50)
+    args = ap.parse_args()
+    srv = make_server(args.host, args.port, args.users, args.courses)
+    print(f"Mock LMS on http://{args.host}:{srv.server_port} (bugs: {', '.join(BUGS)})")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Path-template normalizer shared by proxy.py, the crawler, capture ingestion and the
+scanner.
+
+    normalize_path("/billing/invoices/inv-10-2025.pdf")
+    -> PathTemplate(template="/billing/invoices/{slug}.pdf", values=("inv-10-2025",), kinds=("slug",))
+
+The path is split into segments once and each segment is classified with a single
+precompiled pattern:
+    {uuid}   8-4-4-4-12 hex
+    {id}     decimal integer
+    {hash}   16+ hex chars with a digit (sha1/md5/object ids)
+    {token}  20+ base64/base64url chars with letters and digits
+    {slug}   word-number slugs such as inv-10-2025 or 2025-10-16
+A short file extension (.pdf, .json, ...) is kept literal. The query string is not
+part of the template. Results are cached per raw path.
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+_SEGMENT = re.compile(
+    r"(?:"
+    r"(?P<uuid>[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})"
+    r"|(?P<id>\d+)"
+    r"|(?P<hash>(?=[a-fA-F]*\d)[0-9a-fA-F]{16,})"
+    r"|(?P<token>(?=[\w-]*\d)(?=[\w-]*[A-Za-z])[A-Za-z0-9_-]{20,}={0,2})"
+    r"|(?P<slug>(?:[A-Za-z]+|\d+)(?:[-_]\d+)+)"
+    r")(?P<ext>\.[A-Za-z][A-Za-z0-9]{0,4})?"
+)
+_KINDS = ("uuid", "id", "hash", "token", "slug")
+
+
+class PathTemplate(NamedTuple):
+    template: str
+    values: Tuple[str, ...]   # extracted ids, in path order
+    kinds: Tuple[str, ...]    # placeholder kind of every value ("id", "uuid", ...)
+
+
+@lru_cache(maxsize=65536)
+def normalize_path(path: str) -> PathTemplate:
+    path = path.split("?", 1)[0].split("#", 1)[0]
+    segs = path.split("/")
+    values = []
+    kinds = []
+    match = _SEGMENT.fullmatch
+    for i, seg in enumerate(segs):
+        if not seg or seg.isalpha():
+            continue  # plain words are by far the most common segment
+        if seg.isdigit():
+            values.append(seg)
+            kinds.append("id")
+            segs[i] = "{id}"
+            continue
+        m = match(seg)
+        if m is None:
+            continue
+        kind = next(k for k in _KINDS if m.group(k) is not None)
+        value = m.group(kind)
+        values.append(value)
+        kinds.append(kind)
+        segs[i] = "{" + kind + "}" + (m.group("ext") or "")
+    return PathTemplate("/".join(segs), tuple(values), tuple(kinds))
+
+
+def path_template(path: str) -> str:
+    """/users/10/edit?x=1 -> /users/{id}/edit"""
+    return normalize_path(path).template
+
+
+def first_id(path: str, kind: str = "id") -> Optional[str]:
+    """First extracted value of the given kind (default: decimal id), or None."""
+    t = normalize_path(path)
+    for k, v in zip(t.kinds, t.values):
+        if k == kind:
+            return v
+    return None
@@ -1,15 +1,27 @@
 # mitmdump -s super_simple_forwarder.py -p 8080
 from mitmproxy import http
-import json, base64, re
+import base64, os
 from urllib.parse import urlparse
+from capture_sink import CaptureSink
+from normalizer import path_template
 
 ALLOWED_HOSTS = {"localhost", "127.0.0.1"}   # restrict to local dev
 INCLUDE_PATHS = ("/api/", "/rest/")          # less noise
 
+# capture output: one long-lived buffered writer instead of open/append/close per flow
+CAPTURE_PATH = os.environ.get("IDOR_CAPTURE_PATH", "captures.jsonl")
+CAPTURE_MAX_BYTES = int(os.environ.get("IDOR_CAPTURE_MAX_BYTES", 256 * 1024 * 1024))  # rotate size, 0 = never
+CAPTURE_COMPRESS = os.environ.get("IDOR_CAPTURE_COMPRESS") or None                   # "gzip" | "zstd"
+_sink = None
+
+def _get_sink():
+    global _sink
+    if _sink is None:
+        _sink = CaptureSink(CAPTURE_PATH, max_bytes=CAPTURE_MAX_BYTES or None, compress=CAPTURE_COMPRESS)
+    return _sink
+
 def _b64(b): return base64.b64encode(b).decode("ascii") if b else ""
-def _norm(path):
-    path = re.sub(r'/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', '/{uuid}', path, flags=re.I)
-    return re.sub(r'/\d+', '/{id}', path)
+def _norm(path): return path_template(path)  # shared, cached normalizer (same templates as the scanner)
 
 def response(flow: http.HTTPFlow):
     req, resp = flow.request, flow.response
@@ -28,5 +40,11 @@ def response(flow: http.HTTPFlow):
         "body_b64": _b64(req.raw_content or b""),
         "status": resp.status_code,
     }
-    with open("captures.jsonl", "a", encoding="utf-8") as f:
-        f.write(json.dumps(rec) + "\n")
+    _get_sink().write(rec)
+
+def done():
+    # mitmproxy shutdown: drain the queue and close the active segment
+    global _sink
+    if _sink is not None:
+        _sink.close()
+        _sink = None
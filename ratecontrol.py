@@ -0,0 +1,283 @@
+"""
+Adaptive per-host concurrency control for every request the scanner sends.
+
+Each host gets two independent budgets, one for state-changing and one for
+state-preserving requests, so a slow crawl never starves logins/UCL steps and
+vice versa. A budget is an AIMD window on in-flight requests:
+  - every successful response grows the window by `increase / window`
+    (about +increase per round trip), up to a learned cap: a throttle at window W
+    caps the window at W-1, and the cap is raised by one only after
+    `probe_interval` seconds without throttling, so the host's limit is not hit
+    again every few round trips,
+  - 429/503 (or latency far above the best seen for the same endpoint template,
+    a latency-gradient signal) shrinks it multiplicatively,
+  - Retry-After (seconds or HTTP date) pauses the whole host budget until then.
+ControlledAdapter plugs this into requests, so login, UCL execution, crawling and
+replay all go through it once the SessionManager is given a controller. A request
+holds its budget slot until its body has been read or the response closed, so
+streamed responses count as in flight while they are being consumed. The budget
+follows the method unless the request is sent inside `use_budget(kind)`; the choice
+travels in a context variable, never in the request, so nothing reaches the target.
+Controllers of several scans can share a `gate` (a semaphore): it caps the requests
+in flight across all of them, e.g. one worker budget for many tenants. GatedAdapter
+applies only the gate, for scans without rate control.
+"""
+import contextlib
+import email.utils
+import threading
+import time
+import weakref
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+from normalizer import path_template
+
+THROTTLE_STATUS = (429, 503)
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+BUDGETS = ("state-changing", "state-preserving")
+_BUDGET: ContextVar[Optional[str]] = ContextVar("idor_budget", default=None)
+
+
+@contextlib.contextmanager
+def use_budget(kind: str) -> Iterator[None]:
+    """Requests sent in this block (same thread/task) use the `kind` budget, whatever their method."""
+    if kind not in BUDGETS:
+        raise ValueError(f"Unknown budget: {kind!r}")
+    token = _BUDGET.set(kind)
+    try:
+        yield
+    finally:
+        _BUDGET.reset(token)
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header value, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        ts = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, ts - (now if now is not None else time.time()))
+
+
+class AIMDLimiter:
+    def __init__(self, initial: float = 4, minimum: float = 1, maximum: float = 256,
+                 increase: float = 1.0, decrease: float = 0.5, latency_tolerance: float = 3.0,
+                 probe_interval: float = 10.0):
+        self.limit = float(initial)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.probe_interval = probe_interval
+        self.inflight = 0
+        self.paused_until = 0.0
+        self.min_latency: Optional[float] = None      # host-wide, paces the backoffs
+        self.baselines: Dict[str, float] = {}         # best latency per endpoint template
+        self.ceiling = float(maximum)  # learned host limit
+        self._last_throttle = 0.0
+        self.stats = {"requests": 0, "throttled": 0, "backoffs": 0}
+        self._cond = threading.Condition()
+        self._last_decrease = 0.0
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.inflight < int(self.limit):
+                    self.inflight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def _backoff(self, now: float) -> None:
+        # at most one multiplicative decrease per window of in-flight requests
+        if now - self._last_decrease > (self.min_latency or 0.0):
+            self.limit = max(self.minimum, self.limit * self.decrease)
+            self._last_decrease = now
+            self.stats["backoffs"] += 1
+
+    def release(self, status: Optional[int], latency: float, retry_after: Optional[float] = None,
+                endpoint: str = "") -> None:
+        """
+        Give the slot back with the outcome of the request. `endpoint` (method and path
+        template) selects the latency baseline: a slow report page is not queueing just
+        because a login answered faster.
+        """
+        with self._cond:
+            self.inflight -= 1
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            if status in THROTTLE_STATUS:
+                self.stats["throttled"] += 1
+                self.ceiling = max(self.minimum, min(self.ceiling, float(int(self.limit) - 1)))
+                self._last_throttle = now
+                self._backoff(now)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            elif status is None or status >= 500:
+                self._backoff(now)
+            else:
+                if self.min_latency is None or latency < self.min_latency:
+                    self.min_latency = latency
+                base = self.baselines.get(endpoint)
+                if base is None or latency < base:
+                    if base is None and len(self.baselines) >= 4096:
+                        self.baselines.clear()
+                    base = self.baselines[endpoint] = latency
+                if latency > self.latency_tolerance * base + 0.05:
+                    self._backoff(now)  # queueing at the target: latency gradient says slow down
+                else:
+                    if self.ceiling < self.maximum and now - self._last_throttle > self.probe_interval:
+                        self.ceiling += 1
+                        self._last_throttle = now
+                    self.limit = min(self.ceiling, self.limit + self.increase / self.limit)
+            self._cond.notify_all()
+
+
+class HostController:
+    def __init__(self, **limiter_kwargs):
+        self.budgets: Dict[str, AIMDLimiter] = {kind: AIMDLimiter(**limiter_kwargs) for kind in BUDGETS}
+
+    def pause(self, seconds: float) -> None:
+        until = time.monotonic() + seconds
+        for b in self.budgets.values():
+            with b._cond:
+                b.paused_until = max(b.paused_until, until)
+
+
+class RateController:
+    """Registry of HostControllers, keyed by host:port."""
+
+    def __init__(self, gate: Optional[threading.Semaphore] = None, **limiter_kwargs):
+        self.gate = gate
+        self.limiter_kwargs = limiter_kwargs
+        self._hosts: Dict[str, HostController] = {}
+        self._lock = threading.Lock()
+
+    def host(self, host: str) -> HostController:
+        hc = self._hosts.get(host)
+        if hc is None:
+            with self._lock:
+                hc = self._hosts.get(host)
+                if hc is None:
+                    hc = self._hosts[host] = HostController(**self.limiter_kwargs)
+        return hc
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict]]:
+        return {h: {k: dict(b.stats, limit=round(b.limit, 2)) for k, b in hc.budgets.items()}
+                for h, hc in self._hosts.items()}
+
+
+class GatedAdapter(HTTPAdapter):
+    """HTTPAdapter that holds a slot of a shared gate (semaphore) until the body is consumed, nothing else."""
+
+    def __init__(self, gate: threading.Semaphore, **kwargs):
+        self.gate = gate
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        self.gate.acquire()
+        try:
+            resp = super().send(request, **kwargs)
+        except BaseException:
+            self.gate.release()
+            raise
+        _release_with_body(resp, _once(self.gate, None, resp.status_code, 0.0, None, ""))
+        return resp
+
+
+class ControlledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that acquires the host budget before sending and feeds the response
+    back into it. Idempotent requests that get 429/503 are retried (up to
+    `throttle_retries`) after the Retry-After pause; state-changing ones never are.
+    """
+
+    def __init__(self, controller: RateController, throttle_retries: int = 3, **kwargs):
+        self.controller = controller
+        self.throttle_retries = throttle_retries
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        budget = _BUDGET.get()
+        method = (request.method or "GET").upper()
+        if budget is None:
+            budget = "state-preserving" if method in SAFE_METHODS else "state-changing"
+        parts = urlsplit(request.url)
+        hc = self.controller.host(parts.netloc)
+        limiter = hc.budgets[budget]
+        endpoint = f"{method} {path_template(parts.path or '/')}"
+
+        attempt = 0
+        while True:
+            limiter.acquire()
+            gate = self.controller.gate
+            if gate is not None:
+                gate.acquire()
+            t0 = time.monotonic()
+            try:
+                resp = super().send(request, **kwargs)
+            except BaseException:
+                if gate is not None:
+                    gate.release()
+                limiter.release(None, time.monotonic() - t0, endpoint=endpoint)
+                raise
+            latency = time.monotonic() - t0
+            wait = parse_retry_after(resp.headers.get("Retry-After")) if resp.status_code in THROTTLE_STATUS else None
+            _release_with_body(resp, _once(gate, limiter, resp.status_code, latency, wait, endpoint))
+            if wait:
+                hc.pause(wait)  # the host asked us to stop: both budgets wait
+            if resp.status_code in THROTTLE_STATUS and method in SAFE_METHODS and attempt < self.throttle_retries:
+                attempt += 1
+                resp.close()
+                if not wait:
+                    time.sleep(min(5.0, 0.1 * 2 ** attempt))
+                continue
+            return resp
+
+
+def _once(gate: Optional[threading.Semaphore], limiter: Optional[AIMDLimiter], status: int, latency: float,
+          wait: Optional[float], endpoint: str) -> Callable[[], None]:
+    """Releases the gate slot and the budget slot of one response, the first time it is called."""
+    lock = threading.Lock()
+    pending = [True]
+
+    def release() -> None:
+        with lock:
+            if not pending[0]:
+                return
+            pending[0] = False
+        if gate is not None:
+            gate.release()
+        if limiter is not None:
+            limiter.release(status, latency, wait, endpoint=endpoint)
+    return release
+
+
+def _release_with_body(resp, release: Callable[[], None]) -> None:
+    """
+    Call `release` once the body of `resp` is consumed: urllib3 calls release_conn
+    when the body has been read to the end and requests when the response is closed.
+    A response dropped without either releases when it is garbage collected.
+    """
+    raw = resp.raw
+    orig = getattr(raw, "release_conn", None)
+    if orig is None:
+        release()
+        return
+
+    def release_conn() -> None:
+        try:
+            orig()
+        finally:
+            release()
+    raw.release_conn = release_conn
+    weakref.finalize(resp, release)
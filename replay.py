@@ -0,0 +1,228 @@
+"""
+Response-differential replay of differential_analysis candidates.
+
+Every candidate URL is fetched with the victim's session (G1) and the attacker's
+session (G2). Bodies are streamed and reduced on the fly to a fingerprint:
+status, length, sha256 of the raw bytes, a hash of the normalized token stream and
+a 64-bit simhash. Only fingerprints are kept in memory, never bodies; with a
+body_store.BodyStore the bodies are also streamed to disk under their sha256.
+"""
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+MAX_TOKEN = 256              # longer \w runs are cut into MAX_TOKEN-byte tokens
+_TOKEN = re.compile(rb"\w{1,%d}" % MAX_TOKEN)
+_VOLATILE = re.compile(rb"^(?:[0-9a-f]{16,}|[A-Za-z0-9_]{32,})$", re.I)  # csrf tokens, nonces, hashes
+
+SIMHASH_MAX_TOKENS = 2048    # distinct tokens fed to the simhash (head of very large bodies)
+SIMHASH_THRESHOLD = 3        # max differing bits to call two bodies "the same page"
+DENIED_STATUS = (401, 403, 404, 405)
+
+
+def _token_hash(tok: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(tok, digest_size=8).digest(), "big")
+
+
+class BodyFingerprint:
+    """Incremental fingerprint; feed() chunks then call result()."""
+
+    def __init__(self):
+        self.length = 0
+        self._raw = hashlib.sha256()
+        self._norm = hashlib.sha256()
+        self._features = set()
+        self._tail = b""
+
+    def _add_tokens(self, data: bytes) -> None:
+        for m in _TOKEN.finditer(data):
+            tok = m.group(0)
+            if _VOLATILE.match(tok):
+                tok = b"#"
+            self._norm.update(tok + b" ")
+            if len(self._features) < SIMHASH_MAX_TOKENS:
+                self._features.add(tok)
+
+    def feed(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        self.length += len(chunk)
+        self._raw.update(chunk)
+        data = self._tail + chunk
+        # keep a trailing partial token for the next chunk; a run already MAX_TOKEN
+        # bytes long is cut there, the same place _TOKEN cuts it in one piece
+        cut = len(data)
+        while cut and _TOKEN.fullmatch(data, cut - 1, cut):
+            cut -= 1
+        cut += (len(data) - cut) // MAX_TOKEN * MAX_TOKEN
+        self._tail = data[cut:]
+        self._add_tokens(data[:cut])
+
+    def result(self) -> Dict[str, Any]:
+        if self._tail:
+            self._add_tokens(self._tail)
+            self._tail = b""
+        weights = [0] * 64
+        for tok in self._features:
+            h = _token_hash(tok)
+            for i in range(64):
+                weights[i] += 1 if (h >> i) & 1 else -1
+        sim = 0
+        for i, v in enumerate(weights):
+            if v > 0:
+                sim |= 1 << i
+        return {
+            "length": self.length,
+            "sha256": self._raw.hexdigest(),
+            "norm_hash": self._norm.hexdigest()[:32],
+            "simhash": sim,
+        }
+
+
+def fingerprint_chunks(chunks: Iterable[bytes]) -> Dict[str, Any]:
+    fp = BodyFingerprint()
+    for c in chunks:
+        fp.feed(c)
+    return fp.result()
+
+
+def fetch_fingerprint(session: Any, url: str, timeout: float = 10.0, chunk_size: int = 65536,
+                      previous: Optional[Dict[str, Any]] = None, bodies=None) -> Dict[str, Any]:
+    """
+    GET url with session and return {status, location, content_type, etag, last_modified,
+    **body fingerprint}. With a `previous` fingerprint the request is conditional
+    (If-None-Match / If-Modified-Since) and a 304 returns the previous fingerprint
+    with not_modified=True. With `bodies` (a BodyStore) the body is written to the
+    store chunk by chunk while it is fingerprinted.
+    """
+    headers = {}
+    if previous:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    resp = session.get(url, headers=headers or None, timeout=timeout, allow_redirects=False, stream=True)
+    if resp.status_code == 304 and previous:
+        resp.close()
+        return dict(previous, not_modified=True)
+    writer = bodies.writer() if bodies is not None else None
+    try:
+        fp = BodyFingerprint()
+        for chunk in resp.iter_content(chunk_size):
+            fp.feed(chunk)
+            if writer is not None:
+                writer.feed(chunk)
+        fp = fp.result()
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        resp.close()
+    if writer is not None:
+        writer.commit(resp.headers.get("Content-Type", ""))
+    fp["status"] = resp.status_code
+    fp["location"] = resp.headers.get("Location")
+    fp["content_type"] = resp.headers.get("Content-Type", "")
+    fp["etag"] = resp.headers.get("ETag")
+    fp["last_modified"] = resp.headers.get("Last-Modified")
+    fp["not_modified"] = bool(previous) and previous.get("sha256") == fp["sha256"]
+    return fp
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def compare(victim: Dict[str, Any], attacker: Dict[str, Any]) -> str:
+    """
+    confirmed    - attacker gets a 2xx with (almost) the victim's content
+    denied       - attacker is refused or redirected away
+    different    - attacker gets a 2xx with other content (own view, error page, ...)
+    inconclusive - the victim itself could not fetch the URL
+    """
+    if not 200 <= victim["status"] < 300:
+        return "inconclusive"
+    if attacker["status"] in DENIED_STATUS or 300 <= attacker["status"] < 400:
+        return "denied"
+    if not 200 <= attacker["status"] < 300:
+        return "different"
+    if attacker.get("sha256") and attacker["sha256"] == victim.get("sha256"):
+        return "confirmed"
+    if attacker["norm_hash"] == victim["norm_hash"] or hamming(attacker["simhash"], victim["simhash"]) <= SIMHASH_THRESHOLD:
+        return "confirmed"
+    return "different"
+
+
+def replay(candidates: List[Tuple[str, str, str]],
+           sessions: Dict[Tuple[str, str], Any],
+           base_url: str,
+           max_workers: int = 16,
+           timeout: float = 10.0,
+           fingerprints: Optional[Dict[Tuple[str, str, str], Dict[str, Any]]] = None,
+           bodies=None,
+           done: Optional[Dict[Tuple[str, str, str], Dict[str, Any]]] = None,
+           on_fetch: Optional[Callable[[Tuple[str, str, str], Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    candidates: (victim_role, attacker_role, url) triples.
+    sessions: {("G1", role): session, ("G2", role): session}.
+    Each distinct (group, role, url) is fetched once, all fetches run concurrently.
+    `fingerprints` {(group, role, url): fp} from an earlier scan makes the fetches
+    conditional; it is updated in place with the new fingerprints.
+    With `bodies` (body_store.BodyStore) every fetched body is kept on disk, once per
+    distinct content, and referenced by (group, role, url).
+    `done` {(group, role, url): fp} are fetches completed before an interruption
+    (checkpoint journal); they are not sent again. `on_fetch(job, fp)` is called from
+    the worker threads for every new successful fetch.
+    Returns one record per candidate, in input order.
+    """
+    previous = fingerprints if fingerprints is not None else {}
+    base = base_url.rstrip("/")
+    jobs: Dict[Tuple[str, str, str], Optional[Dict[str, Any]]] = {}
+    for victim, attacker, url in candidates:
+        jobs.setdefault(("G1", victim, url), None)
+        jobs.setdefault(("G2", attacker, url), None)
+
+    def _one(job: Tuple[str, str, str]) -> Dict[str, Any]:
+        label, rname, url = job
+        try:
+            fp = fetch_fingerprint(sessions[(label, rname)], base + url, timeout=timeout,
+                                   previous=previous.get(job), bodies=bodies)
+        except Exception as e:
+            return {"status": 0, "error": repr(e)}
+        if bodies is not None and fp.get("sha256"):
+            bodies.add_ref(label, rname, url, fp["sha256"])
+        if on_fetch is not None:
+            on_fetch(job, fp)
+        return fp
+
+    for k in jobs:
+        if done and k in done:
+            jobs[k] = done[k]
+    keys = [k for k, fp in jobs.items() if fp is None]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for k, fp in zip(keys, pool.map(_one, keys)):
+            jobs[k] = fp
+    if fingerprints is not None:
+        fingerprints.update(jobs)
+
+    out: List[Dict[str, Any]] = []
+    for victim, attacker, url in candidates:
+        v = jobs[("G1", victim, url)]
+        a = jobs[("G2", attacker, url)]
+        if "error" in v or "error" in a:
+            verdict = "inconclusive"
+        else:
+            verdict = compare(v, a)
+        out.append({
+            "victim_role": victim,
+            "attacker_role": attacker,
+            "url": url,
+            "verdict": verdict,
+            "victim": {k: v.get(k) for k in ("status", "length", "sha256", "norm_hash")},
+            "attacker": {k: a.get(k) for k in ("status", "length", "sha256", "norm_hash")},
+            "simhash_distance": hamming(v["simhash"], a["simhash"]) if "simhash" in v and "simhash" in a else None,
+            "unchanged": bool(v.get("not_modified") and a.get("not_modified")),
+        })
+    return out
@@ -0,0 +1,177 @@
+"""
+Data-driven URL flag rules for differential analysis.
+
+A rule is plain data (see DEFAULT_RULES, or a JSON file with a list of rules):
+  flag         - flag name reported on a match
+  confidence   - "high" | "medium" | "low"
+  prefix       - URL must start with this
+  contains     - list of substrings the URL must contain
+  suffix       - URL must end with this
+  pattern      - extra regex searched in the URL
+  roles_only   - rule only applies to these attacker roles
+  roles_exclude- rule never applies to these attacker roles
+  foreign_id   - {"kind": "id", "ctx_key": "user_id"}: only flag when the first id of
+                 that normalizer kind in the URL is not the attacker's own ctx value
+                 ("pattern": regex with one group can be used instead of "kind")
+Rules are compiled once per attacker role around a single literal-alternation regex.
+"""
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from normalizer import first_id
+
+CONFIDENCE_ORDER = {"low": 0, "medium": 1, "high": 2}
+
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    # Admin namespace seen by non-admin
+    {"flag": "admin_namespace_visible", "confidence": "high",
+     "prefix": "/admin", "roles_exclude": ["Admin"]},
+    # Other users' profile paths (/users/{id}) seen by non-admin
+    {"flag": "cross_user_profile_candidate", "confidence": "medium",
+     "prefix": "/users/", "roles_exclude": ["Admin"],
+     "foreign_id": {"kind": "id", "ctx_key": "user_id"}},
+    # Instructor-only resources visible to Student
+    {"flag": "instructor_area_visible", "confidence": "medium",
+     "contains": ["/instructor/"], "roles_only": ["Student"]},
+    # Invoice artifacts visible to non-admin
+    {"flag": "billing_artifact_visible", "confidence": "medium",
+     "contains": ["/billing/invoices/"], "roles_exclude": ["Admin"]},
+    # Gradebook endpoints visible to non-instructor
+    {"flag": "gradebook_visible", "confidence": "medium",
+     "suffix": "/grades", "contains": ["/instructor/"], "roles_exclude": ["Admin", "Instructor"]},
+]
+
+
+def _foreign_id(fid: Mapping[str, Any]) -> Callable[[str, Mapping[str, Any]], bool]:
+    """foreign_id test: the URL's id is known and not the attacker's own (or no own id is known)."""
+    key = fid.get("ctx_key", "")
+    if "pattern" in fid:
+        search = re.compile(fid["pattern"]).search
+
+        def get_id(u: str) -> Optional[str]:
+            m = search(u)
+            return m.group(1) if m else None
+    else:
+        kind = fid.get("kind", "id")
+
+        def get_id(u: str) -> Optional[str]:
+            return first_id(u, kind)
+
+    def foreign(u: str, ctx: Mapping[str, Any]) -> bool:
+        v = get_id(u)
+        own = ctx.get(key)
+        return v is not None and (own is None or v != str(own))
+    return foreign
+
+
+class _Classifier:
+    """
+    The rules that apply to one attacker role. The prefix / contains / suffix literals
+    of all of them form a single alternation regex: search() tells whether a URL holds
+    any literal, findall() of a zero-width match at every position lists the longest
+    literal starting at each place (the shorter literals it starts with are there too).
+    The rules whose literals are all present are resolved once per distinct findall()
+    result; per URL only their position, `pattern` and `foreign_id` checks remain.
+    """
+    __slots__ = ("checks", "always", "prefilter", "scan", "_prefixes_of", "_resolved")
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self.checks = []
+        for r in rules:
+            lits = frozenset(c for c in [r.get("prefix")] + list(r.get("contains", ())) + [r.get("suffix")] if c)
+            self.checks.append((lits, r["flag"], r.get("prefix") or None, r.get("suffix") or None,
+                                re.compile(r["pattern"]).search if r.get("pattern") else None,
+                                _foreign_id(r["foreign_id"]) if r.get("foreign_id") else None))
+        self.always = [c[1:] for c in self.checks if not c[0]]
+        texts = sorted({t for c in self.checks for t in c[0]}, key=len, reverse=True)
+        alternation = "|".join(map(re.escape, texts))
+        self.prefilter = re.compile(alternation).search if texts else None
+        self.scan = re.compile("(?=(" + alternation + "))").findall if texts else None
+        self._prefixes_of = {t: [p for p in texts if t.startswith(p)] for t in texts}
+        self._resolved: Dict[Tuple[str, ...], List[Tuple]] = {}
+
+    def _resolve(self, hits: Tuple[str, ...]) -> List[Tuple]:
+        present = {p for h in hits for p in self._prefixes_of[h]}
+        if len(self._resolved) >= 4096:
+            self._resolved.clear()
+        out = self._resolved[hits] = [c[1:] for c in self.checks if c[0] <= present]
+        return out
+
+    def __call__(self, urls: Iterable[str], ctx: Mapping[str, Any]) -> List[List[str]]:
+        out = []
+        resolved = self._resolved
+        for u in urls:
+            if self.prefilter is None or self.prefilter(u) is None:
+                if not self.always:
+                    out.append([])   # no literal of any rule in the URL: the common case
+                    continue
+                rules = self.always
+            else:
+                hits = tuple(self.scan(u))
+                rules = resolved.get(hits)
+                if rules is None:
+                    rules = self._resolve(hits)
+            f = []
+            for flag, prefix, suffix, search, foreign in rules:
+                if (prefix and not u.startswith(prefix)) or (suffix and not u.endswith(suffix)):
+                    continue
+                if (search is not None and search(u) is None) or (foreign is not None and not foreign(u, ctx)):
+                    continue
+                f.append(flag)
+            out.append(f)
+        return out
+
+
+class RuleSet:
+    """
+    Rules compiled into one classifier per attacker role (see _Classifier); role
+    conditions are resolved at compile time. No per-rule work for URLs that hold none
+    of the rules' literals, which is most of them.
+    """
+
+    def __init__(self, rules: Iterable[Dict[str, Any]]):
+        self.rules: List[Dict[str, Any]] = [dict(r) for r in rules]
+        for r in self.rules:
+            if "flag" not in r:
+                raise ValueError(f"Rule without flag: {r}")
+            if r.get("confidence", "low") not in CONFIDENCE_ORDER:
+                raise ValueError(f"Unknown confidence in rule {r['flag']}: {r.get('confidence')}")
+            if r.get("pattern"):
+                re.compile(r["pattern"])
+            if r.get("foreign_id") and "pattern" in r["foreign_id"]:
+                if re.compile(r["foreign_id"]["pattern"]).groups != 1:
+                    raise ValueError(f"foreign_id pattern of rule {r['flag']} needs exactly one group")
+        self.confidence_of: Dict[str, str] = {r["flag"]: r.get("confidence", "low") for r in self.rules}
+        self._compiled: Dict[str, _Classifier] = {}
+
+    def _applies(self, r: Dict[str, Any], role: str) -> bool:
+        return role not in r.get("roles_exclude", ()) and ("roles_only" not in r or role in r["roles_only"])
+
+    def classify(self, urls: Iterable[str], attacker_role: str,
+                 ctx: Optional[Mapping[str, Any]] = None) -> List[List[str]]:
+        """Flags for every URL (in rule order) as seen by `attacker_role`."""
+        fn = self._compiled.get(attacker_role)
+        if fn is None:
+            fn = self._compiled[attacker_role] = _Classifier([r for r in self.rules if self._applies(r, attacker_role)])
+        return fn(urls, ctx or {})
+
+    def flags(self, url: str, attacker_role: str, ctx: Optional[Mapping[str, Any]] = None) -> List[str]:
+        return self.classify((url,), attacker_role, ctx)[0]
+
+    def confidence(self, flags: Iterable[str]) -> str:
+        best = "low"
+        for f in flags:
+            c = self.confidence_of.get(f, "low")
+            if CONFIDENCE_ORDER[c] > CONFIDENCE_ORDER[best]:
+                best = c
+        return best
+
+
+def load_rules(path: str) -> RuleSet:
+    """Rules from a JSON file holding a list of rule objects (same shape as DEFAULT_RULES)."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("rules", [])
+    return RuleSet(data)
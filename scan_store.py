@@ -0,0 +1,153 @@
+"""
+SQLite-backed store for incremental re-scans.
+
+Everything is keyed by a hash of the scan configuration (roles, actions, use cases,
+context defaults, rules), so a changed config never reuses stale results:
+  artifacts    - UCL, rendered exec plan, ... as JSON blobs
+  sitemaps     - per (group, role) URL list plus a digest of its content
+  pair_results - differential-analysis findings of a (victim, attacker) pair together
+                 with the two sitemap digests they were computed from
+  fingerprints - per (target, group, role, url) response fingerprint with its
+                 validators (ETag, Last-Modified, body hash) for conditional replays
+  pages        - per (target, group, role, path) crawled page validators and links,
+                 so a re-crawl fetches conditionally and skips unchanged pages' bodies
+The connection is not shared between threads; call the store from the main thread.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    config_hash TEXT NOT NULL, kind TEXT NOT NULL, data TEXT NOT NULL, updated REAL NOT NULL,
+    PRIMARY KEY (config_hash, kind));
+CREATE TABLE IF NOT EXISTS sitemaps (
+    config_hash TEXT NOT NULL, grp TEXT NOT NULL, role TEXT NOT NULL,
+    digest TEXT NOT NULL, urls TEXT NOT NULL, updated REAL NOT NULL,
+    PRIMARY KEY (config_hash, grp, role));
+CREATE TABLE IF NOT EXISTS pair_results (
+    config_hash TEXT NOT NULL, victim TEXT NOT NULL, attacker TEXT NOT NULL,
+    victim_digest TEXT NOT NULL, attacker_digest TEXT NOT NULL,
+    findings TEXT NOT NULL, updated REAL NOT NULL,
+    PRIMARY KEY (config_hash, victim, attacker));
+CREATE TABLE IF NOT EXISTS fingerprints (
+    target TEXT NOT NULL, grp TEXT NOT NULL, role TEXT NOT NULL, url TEXT NOT NULL,
+    etag TEXT, last_modified TEXT, body_hash TEXT, data TEXT NOT NULL, updated REAL NOT NULL,
+    PRIMARY KEY (target, grp, role, url));
+CREATE TABLE IF NOT EXISTS pages (
+    target TEXT NOT NULL, grp TEXT NOT NULL, role TEXT NOT NULL, path TEXT NOT NULL,
+    data TEXT NOT NULL, updated REAL NOT NULL,
+    PRIMARY KEY (target, grp, role, path));
+"""
+
+
+def config_hash(*parts: Any) -> str:
+    """Stable hash of JSON-serialisable config parts."""
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32]
+
+
+def sitemap_digest(urls: Iterable[str]) -> str:
+    h = hashlib.sha256()
+    for u in sorted(set(urls)):
+        h.update(u.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()[:32]
+
+
+class ScanStore:
+    def __init__(self, path: str = "scan_store.db"):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
+
+    def __enter__(self) -> "ScanStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- artifacts (ucl, exec_plan, ...) ---
+    def get_artifact(self, cfg: str, kind: str) -> Optional[Any]:
+        row = self.db.execute("SELECT data FROM artifacts WHERE config_hash=? AND kind=?", (cfg, kind)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_artifact(self, cfg: str, kind: str, data: Any) -> None:
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO artifacts VALUES (?,?,?,?)",
+                            (cfg, kind, json.dumps(data), time.time()))
+
+    # --- sitemaps ---
+    def put_sitemap(self, cfg: str, grp: str, role: str, urls: List[str]) -> Tuple[str, bool]:
+        """Store a sitemap; returns (digest, changed since the previous run)."""
+        digest = sitemap_digest(urls)
+        row = self.db.execute("SELECT digest FROM sitemaps WHERE config_hash=? AND grp=? AND role=?",
+                              (cfg, grp, role)).fetchone()
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO sitemaps VALUES (?,?,?,?,?,?)",
+                            (cfg, grp, role, digest, json.dumps(urls), time.time()))
+        return digest, row is None or row[0] != digest
+
+    def get_sitemap(self, cfg: str, grp: str, role: str) -> Optional[List[str]]:
+        row = self.db.execute("SELECT urls FROM sitemaps WHERE config_hash=? AND grp=? AND role=?",
+                              (cfg, grp, role)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # --- differential analysis per role pair ---
+    def get_pair_findings(self, cfg: str, victim: str, attacker: str,
+                          victim_digest: str, attacker_digest: str) -> Optional[List[Dict]]:
+        """Findings of the pair if both sitemaps are unchanged since they were computed."""
+        row = self.db.execute(
+            "SELECT findings FROM pair_results WHERE config_hash=? AND victim=? AND attacker=? "
+            "AND victim_digest=? AND attacker_digest=?",
+            (cfg, victim, attacker, victim_digest, attacker_digest)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_pair_findings(self, cfg: str, victim: str, attacker: str,
+                          victim_digest: str, attacker_digest: str, findings: List[Dict]) -> None:
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO pair_results VALUES (?,?,?,?,?,?,?)",
+                            (cfg, victim, attacker, victim_digest, attacker_digest,
+                             json.dumps(findings), time.time()))
+
+    # --- response fingerprints ---
+    def get_fingerprints(self, target: str, keys: Iterable[Tuple[str, str, str]]) -> Dict[Tuple[str, str, str], Dict]:
+        """Stored fingerprints for (group, role, url) keys that have one."""
+        out: Dict[Tuple[str, str, str], Dict] = {}
+        cur = self.db.cursor()
+        for grp, role, url in keys:
+            row = cur.execute("SELECT data FROM fingerprints WHERE target=? AND grp=? AND role=? AND url=?",
+                              (target, grp, role, url)).fetchone()
+            if row:
+                out[(grp, role, url)] = json.loads(row[0])
+        return out
+
+    def put_fingerprints(self, target: str, fps: Dict[Tuple[str, str, str], Dict]) -> None:
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?,?,?,?,?,?,?,?,?)",
+                [(target, grp, role, url, fp.get("etag"), fp.get("last_modified"), fp.get("sha256"),
+                  json.dumps(fp), now)
+                 for (grp, role, url), fp in fps.items() if "error" not in fp])
+
+    # --- crawled pages ---
+    def get_pages(self, target: str, grp: str, role: str) -> Dict[str, Dict]:
+        """{path: {"etag", "last_modified", "links", "sha256"}} recorded by the last crawl."""
+        rows = self.db.execute("SELECT path, data FROM pages WHERE target=? AND grp=? AND role=?",
+                               (target, grp, role))
+        return {path: json.loads(data) for path, data in rows}
+
+    def put_pages(self, target: str, grp: str, role: str, pages: Dict[str, Dict]) -> None:
+        now = time.time()
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO pages VALUES (?,?,?,?,?,?)",
+                                [(target, grp, role, path, json.dumps(v), now) for path, v in pages.items()])
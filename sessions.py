@@ -0,0 +1,102 @@
+"""
+Pooled HTTP sessions for scanner users.
+
+Every user still gets its own requests.Session (own cookie jar, headers, CSRF state),
+but the transport adapters are tuned and, by default, shared:
+  - one HTTPAdapter (urllib3 pool manager) per manager, mounted on every session it
+    creates, so many users of the same target reuse keep-alive connections instead
+    of each opening their own pool. Cookies live on the Session, not the adapter,
+    so sharing the pool does not leak state between users. Set share_pools=False
+    for targets that bind auth to the TCP connection (NTLM/Negotiate).
+  - pool size sized for the number of concurrent workers (no "pool is full" churn)
+  - retries with exponential backoff and jitter for idempotent requests on
+    connection errors and 429/502/503/504, honoring Retry-After.
+  - optionally, an adaptive per-host rate controller (ratecontrol.RateController):
+    every request then waits for its host's concurrency budget, and 429/503 are
+    handled by the controller (backoff + Retry-After pause) instead of urllib3.
+    Without one, a `gate` (semaphore) still caps the requests in flight.
+With shared pools, closing one session closes the pool for all of them: close the
+manager at the end of a scan instead.
+"""
+import inspect
+import threading
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ratecontrol import ControlledAdapter, GatedAdapter, RateController, THROTTLE_STATUS
+
+RETRY_STATUS = (429, 502, 503, 504)
+
+
+def make_retry(total: int = 3, backoff_factor: float = 0.3, jitter: float = 0.2,
+               status_forcelist=RETRY_STATUS, respect_retry_after: bool = True) -> Retry:
+    kwargs = dict(
+        total=total,
+        connect=total,
+        read=total,
+        status=total,
+        backoff_factor=backoff_factor,
+        status_forcelist=status_forcelist,
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),  # never replay state-changing requests
+        respect_retry_after_header=respect_retry_after,
+        raise_on_status=False,
+    )
+    if "backoff_jitter" in inspect.signature(Retry).parameters:  # urllib3 >= 2
+        kwargs["backoff_jitter"] = jitter
+    return Retry(**kwargs)
+
+
+class SessionManager:
+    def __init__(self, pool_connections: int = 16, pool_maxsize: int = 64,
+                 retries: int = 3, backoff_factor: float = 0.3, jitter: float = 0.2,
+                 share_pools: bool = True, controller: Optional[RateController] = None,
+                 on_response: Optional[Callable] = None, gate: Optional[threading.Semaphore] = None):
+        self.pool_connections = pool_connections
+        self.on_response = on_response  # requests response hook added to every session (e.g. metrics)
+        self.pool_maxsize = pool_maxsize
+        self.controller = controller
+        self.gate = gate  # only used without a controller (the controller has its own)
+        # with a controller, throttling statuses and Retry-After are its job (urllib3
+        # would otherwise retry them itself, hidden from the controller)
+        forcelist = tuple(s for s in RETRY_STATUS if s not in THROTTLE_STATUS) if controller else RETRY_STATUS
+        self.retry = make_retry(retries, backoff_factor, jitter, forcelist, respect_retry_after=controller is None)
+        self.share_pools = share_pools
+        self._shared: Optional[HTTPAdapter] = None
+
+    def _new_adapter(self) -> HTTPAdapter:
+        kwargs = dict(pool_connections=self.pool_connections,
+                      pool_maxsize=self.pool_maxsize, max_retries=self.retry)
+        if self.controller is not None:
+            return ControlledAdapter(self.controller, **kwargs)
+        if self.gate is not None:
+            return GatedAdapter(self.gate, **kwargs)
+        return HTTPAdapter(**kwargs)
+
+    def _adapter(self) -> HTTPAdapter:
+        if self.share_pools:
+            if self._shared is None:
+                self._shared = self._new_adapter()
+            return self._shared
+        return self._new_adapter()
+
+    def new_session(self, base_headers: Optional[Dict[str, str]] = None,
+                    cookies: Optional[Dict[str, str]] = None) -> requests.Session:
+        s = requests.Session()
+        adapter = self._adapter()
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        if self.on_response is not None:
+            s.hooks["response"].append(self.on_response)
+        if base_headers:
+            s.headers.update(base_headers)
+        if cookies:
+            s.cookies.update(dict(cookies))  # copy to avoid shared refs
+        return s
+
+    def close(self) -> None:
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
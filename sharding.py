@@ -0,0 +1,130 @@
+"""
+Multi-process differential analysis.
+
+The parent writes every (group, role) sitemap once to a sorted, newline-separated
+file in a scratch directory; workers read the files they need (memory-mapped,
+cached per process) instead of receiving pickled lists. Work is split into units of
+(victim, attacker, slice of the victim's sorted sitemap), so one large pair is
+spread over several processes too. Each unit computes its slice of
+sorted(sm1 - sm2), classifies it with the rule set and streams its findings back;
+the parent merges them in unit order, which gives exactly the serial order.
+"""
+import mmap
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Set, Tuple
+
+from rules import RuleSet
+
+Unit = Tuple[int, str, str, int, int]  # (order, victim, attacker, lo, hi)
+
+# per-process state, set by _init
+_files: Dict[Tuple[str, str], str] = {}
+_rules: Optional[RuleSet] = None
+_ctx: Dict[str, Mapping[str, Any]] = {}
+_lines: Dict[str, List[str]] = {}
+_sets: Dict[str, Set[str]] = {}
+
+
+def write_sitemaps(sitemaps: Mapping[Tuple[str, str], List[str]], directory: str) -> Dict[Tuple[str, str], str]:
+    """One sorted, deduplicated file per (group, role); returns {key: path}."""
+    out = {}
+    for i, (key, urls) in enumerate(sitemaps.items()):
+        path = os.path.join(directory, f"sitemap-{i}.txt")
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            f.write("\n".join(sorted(set(urls))))
+        out[key] = path
+    return out
+
+
+def _read_lines(path: str) -> List[str]:
+    lines = _lines.get(path)
+    if lines is None:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                lines = []
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    lines = mm[:].decode("utf-8").split("\n")
+        _lines[path] = lines
+    return lines
+
+
+def _read_set(path: str) -> Set[str]:
+    s = _sets.get(path)
+    if s is None:
+        s = _sets[path] = set(_read_lines(path))
+    return s
+
+
+def _init(files: Dict[Tuple[str, str], str], rules: List[Dict[str, Any]],
+          ctx: Dict[str, Mapping[str, Any]]) -> None:
+    global _files, _rules, _ctx
+    _files, _rules, _ctx = files, RuleSet(rules), ctx
+    _lines.clear()
+    _sets.clear()
+
+
+def _run_unit(unit: Unit) -> Tuple[int, int, List[Dict[str, Any]]]:
+    order, victim, attacker, lo, hi = unit
+    sm1 = _read_lines(_files[("G1", victim)])[lo:hi]
+    p2 = _files.get(("G2", attacker))
+    sm2 = _read_set(p2) if p2 else set()
+    candidates = [u for u in sm1 if u not in sm2]  # sm1 is sorted, so this is sorted(sm1 - sm2)
+    findings = []
+    for url, flags in zip(candidates, _rules.classify(candidates, attacker, _ctx.get(attacker, {}))):
+        if flags:
+            findings.append({
+                "attacker_role": attacker,
+                "victim_role": victim,
+                "url": url,
+                "flags": flags,
+                "confidence": _rules.confidence(flags),
+            })
+    return order, len(candidates), findings
+
+
+def plan_units(pairs: List[Tuple[str, str]], sizes: Mapping[str, int], chunk: int) -> List[Unit]:
+    """Split every (victim, attacker) pair into slices of at most `chunk` victim URLs."""
+    units: List[Unit] = []
+    for victim, attacker in pairs:
+        n = sizes.get(victim, 0)
+        for lo in range(0, n, chunk):
+            units.append((len(units), victim, attacker, lo, min(n, lo + chunk)))
+    return units
+
+
+def sharded_differential(sitemaps: Mapping[Tuple[str, str], List[str]],
+                         pairs: List[Tuple[str, str]],
+                         rules: List[Dict[str, Any]],
+                         ctx: Dict[str, Mapping[str, Any]],
+                         processes: Optional[int] = None,
+                         chunk: int = 50000) -> Iterator[Tuple[Unit, int, List[Dict[str, Any]]]]:
+    """
+    Yield (unit, n_candidates, findings) for every unit, in deterministic unit order,
+    as soon as the unit and all units before it are done.
+    `pairs` is the ordered list of (victim_role, attacker_role) to analyse.
+    """
+    tmp = tempfile.mkdtemp(prefix="idor-sitemaps-")
+    try:
+        files = write_sitemaps(sitemaps, tmp)
+        sizes = {role: len(set(urls)) for (grp, role), urls in sitemaps.items() if grp == "G1"}
+        units = plan_units([p for p in pairs if ("G1", p[0]) in files], sizes, chunk)
+        if not units:
+            return
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init,
+                                 initargs=(files, rules, ctx)) as pool:
+            futs = [pool.submit(_run_unit, u) for u in units]
+            done: Dict[int, Tuple[int, List[Dict[str, Any]]]] = {}
+            nxt = 0
+            for fut in as_completed(futs):
+                order, n, findings = fut.result()
+                done[order] = (n, findings)
+                while nxt in done:  # release in order as the prefix completes
+                    n, findings = done.pop(nxt)
+                    yield units[nxt], n, findings
+                    nxt += 1
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,125 @@
+"""
+Batched sitemap set algebra for the differential analysis.
+
+Every URL of the sitemaps involved is interned once to an integer id, assigned in
+sorted URL order. A sitemap is then a sorted array of unique ids, and
+sorted(sm1 - sm2) is the ids of sm1 that are not in sm2, in order: no per-pair
+re-hashing of URL strings and no per-pair sort.
+
+Attacker (G2) sitemaps become membership bitmaps over the id universe, built once
+each; a victim (G1) sitemap is tested against the bitmaps of all its attackers in
+one batched pass. Identical sitemaps are stored once, so attackers that see the same
+pages (typically roles of the same rank, or unauthenticated ones) share a bitmap,
+and victims with the same sitemap share their differences.
+
+With NumPy the bitmaps are packed bit rows stacked into one matrix and a victim is
+one gather over it; without NumPy, bitmaps are bytearrays (one byte per id) and the
+test is a comprehension over the victim's ids.
+"""
+from array import array
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+Key = Tuple[str, str]  # (group, role)
+Pair = Tuple[str, str]  # (victim_role, attacker_role)
+
+
+class SitemapIndex:
+    def __init__(self, sitemaps: Mapping[Key, Iterable[str]], keys: Optional[Iterable[Key]] = None):
+        keys = list(sitemaps) if keys is None else [k for k in dict.fromkeys(keys) if k in sitemaps]
+        universe = set()
+        for k in keys:
+            universe.update(sitemaps[k])
+        self.urls: List[str] = sorted(universe)
+        ids = {u: i for i, u in enumerate(self.urls)}
+        del universe
+
+        self._arrays: List[array] = []          # distinct sorted id arrays
+        self._slot: Dict[Key, int] = {}         # key -> index into _arrays
+        by_content: Dict[bytes, int] = {}
+        for k in keys:
+            arr = array("i", sorted({ids[u] for u in sitemaps[k]}))
+            content = arr.tobytes()
+            slot = by_content.get(content)
+            if slot is None:
+                slot = by_content[content] = len(self._arrays)
+                self._arrays.append(arr)
+            self._slot[k] = slot
+        del ids, by_content
+        self._bitmaps: Dict[int, object] = {}
+        self._urls_np = None
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def _slot_of(self, key: Key) -> int:
+        """Slot of a key; a missing sitemap is the empty one."""
+        slot = self._slot.get(key)
+        if slot is None:
+            slot = self._slot[key] = len(self._arrays)
+            self._arrays.append(array("i"))
+        return slot
+
+    def _bitmap(self, slot: int):
+        bm = self._bitmaps.get(slot)
+        if bm is None:
+            arr = self._arrays[slot]
+            if np is not None:
+                bits = np.zeros(len(self.urls), dtype=bool)
+                bits[np.frombuffer(arr, dtype=np.int32)] = True
+                bm = np.packbits(bits, bitorder="little")
+            else:
+                bm = bytearray(len(self.urls))
+                for i in arr:
+                    bm[i] = 1
+            self._bitmaps[slot] = bm
+        return bm
+
+    def _missing(self, victim_slot: int, attacker_slots: List[int]) -> Dict[int, List[str]]:
+        """{attacker slot: victim URLs not in it, sorted} for one victim."""
+        ids = self._arrays[victim_slot]
+        out: Dict[int, List[str]] = {}
+        if not ids:
+            return {s: [] for s in attacker_slots}
+        urls = self.urls
+        if np is not None:
+            if self._urls_np is None:
+                self._urls_np = np.array(urls, dtype=object)
+            a = np.frombuffer(ids, dtype=np.int32)
+            rows = np.stack([self._bitmap(s) for s in attacker_slots])
+            member = (rows[:, a >> 3] >> (a & 7).astype(np.uint8)) & 1   # (attackers, victim urls)
+            for j, s in enumerate(attacker_slots):
+                out[s] = self._urls_np[a[member[j] == 0]].tolist()
+        else:
+            for s in attacker_slots:
+                bm = self._bitmap(s)
+                out[s] = [urls[i] for i in ids if not bm[i]]
+        return out
+
+    def differences(self, pairs: List[Pair]) -> Iterator[Tuple[Pair, List[str]]]:
+        """
+        (pair, sorted(G1 victim sitemap - G2 attacker sitemap)) for every pair, in
+        order. All attackers of a victim are computed together when the victim first
+        comes up; only that victim's results are held at a time.
+        """
+        by_victim: Dict[str, List[int]] = {}
+        for v, a in pairs:
+            s = self._slot_of(("G2", a))
+            if s not in by_victim.setdefault(v, []):
+                by_victim[v].append(s)
+        done: Dict[Tuple[int, Tuple[int, ...]], Dict[int, List[str]]] = {}
+        current: Optional[str] = None
+        results: Dict[int, List[str]] = {}
+        for v, a in pairs:
+            if v != current:
+                vs = self._slot_of(("G1", v))
+                shape = (vs, tuple(by_victim[v]))
+                if shape not in done:
+                    done.clear()  # only the last victim is kept: equal sitemaps in a row share it
+                    done[shape] = self._missing(vs, list(shape[1]))
+                results, current = done[shape], v
+            yield (v, a), results[self._slot_of(("G2", a))]
@@ -0,0 +1,69 @@
+"""
+Scan targets for multi-tenant runs, from JSON, YAML or TOML.
+
+    {"targets": [
+      {"name": "tenant-a", "base_url": "https://a.lms.example",
+       "ctx": {"Admin": {"user": "admin@a", "pass": "..."}, "Student": {"user_id": "4711"}},
+       "cookies": {"Admin": {"PHPSESSID": "..."}},
+       "workers": 8}
+    ]}
+
+`ctx` overrides CTX_DEFAULTS per role (credentials, object ids), `cookies` replace
+the role's static cookies, `workers` caps the target's own concurrency. A bare list
+of targets is accepted too. Names must be unique; they key the per-target results.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional
+
+from config_loader import _parse
+
+
+@dataclass
+class Target:
+    name: str
+    base_url: str
+    ctx: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    cookies: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    workers: Optional[int] = None
+
+    def context(self, defaults: Mapping[str, Mapping[str, str]]) -> Dict[str, Dict[str, str]]:
+        """CTX_DEFAULTS with this target's per-role overrides applied."""
+        out = {r: dict(v) for r, v in defaults.items()}
+        for r, v in self.ctx.items():
+            out.setdefault(r, {}).update(v)
+        return out
+
+
+def _str_map(value: Any, where: str) -> Dict[str, Dict[str, str]]:
+    if not isinstance(value, dict) or not all(isinstance(v, dict) for v in value.values()):
+        raise ValueError(f"{where}: expected {{role: {{key: value}}}}, got {value!r}")
+    return {str(r): {str(k): str(v) for k, v in m.items()} for r, m in value.items()}
+
+
+def parse_targets(data: Any) -> List[Target]:
+    items = data.get("targets") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ValueError("Invalid targets file: expected a non-empty list of targets")
+    out: List[Target] = []
+    seen = set()
+    for i, t in enumerate(items):
+        where = f"target #{i}"
+        if not isinstance(t, dict) or not t.get("base_url"):
+            raise ValueError(f"Invalid targets file: {where} needs a base_url")
+        name = str(t.get("name") or t["base_url"])
+        if name in seen:
+            raise ValueError(f"Invalid targets file: duplicate target name {name!r}")
+        seen.add(name)
+        workers = t.get("workers")
+        if workers is not None and (not isinstance(workers, int) or workers < 1):
+            raise ValueError(f"Invalid targets file: {name}: workers must be a positive integer")
+        out.append(Target(name=name, base_url=str(t["base_url"]),
+                          ctx=_str_map(t.get("ctx") or {}, f"{name}.ctx"),
+                          cookies=_str_map(t.get("cookies") or {}, f"{name}.cookies"),
+                          workers=workers))
+    return out
+
+
+def load_targets(path: str) -> List[Target]:
+    with open(path, "rb") as f:
+        return parse_targets(_parse(path, f.read()))
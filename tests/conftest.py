@@ -0,0 +1,48 @@
+import importlib.util
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def local_server():
+    """Factory: local_server(HandlerClass) -> base URL of a stand-in server on 127.0.0.1."""
+    servers = []
+
+    def start(handler) -> str:
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        srv.daemon_threads = True
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        return f"http://127.0.0.1:{srv.server_address[1]}"
+
+    yield start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
+
+@pytest.fixture(scope="session")
+def idor():
+    """IDOR-detection.py loaded as a module (its file name is not importable)."""
+    spec = importlib.util.spec_from_file_location("idor_detection", os.path.join(ROOT, "IDOR-detection.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture
+def mock_lms():
+    """Base URL of a fresh mock_lms server."""
+    from mock_lms import start_in_thread
+
+    srv = start_in_thread(n_users=20, n_courses=5)
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+import auth_cache
+from auth_cache import AuthCache, SecretBox
+
+
+@pytest.fixture
+def key_env(tmp_path, monkeypatch):
+    monkeypatch.delenv("IDOR_AUTH_CACHE_KEY", raising=False)
+    monkeypatch.setenv("IDOR_AUTH_CACHE_KEY_FILE", str(tmp_path / "keys" / "auth.key"))
+    return tmp_path / "keys" / "auth.key"
+
+
+def test_key_is_kept_apart_from_the_cache(tmp_path, key_env):
+    cache = AuthCache(str(tmp_path / "cache"))
+    cache.put("https://t", "Admin", "G1", cookies=[{"name": "sid", "value": "s3cret"}])
+
+    assert key_env.exists() and oct(key_env.stat().st_mode & 0o777) == "0o600"
+    files = os.listdir(tmp_path / "cache")
+    assert files and all(f.endswith(".auth") for f in files)
+    assert b"s3cret" not in (tmp_path / "cache" / files[0]).read_bytes()
+    assert AuthCache(str(tmp_path / "cache")).get("https://t", "Admin", "G1")["cookies"][0]["value"] == "s3cret"
+
+
+def test_wrong_key_and_tampering_are_rejected(tmp_path, key_env):
+    box = SecretBox(os.urandom(32))
+    blob = box.encrypt(b"payload")
+    assert box.decrypt(blob) == b"payload"
+    with pytest.raises(ValueError):
+        SecretBox(os.urandom(32)).decrypt(blob)
+    with pytest.raises(ValueError):
+        box.decrypt(blob[:-1] + bytes([blob[-1] ^ 1]))
+
+
+def test_refuses_to_cache_without_cryptography(tmp_path, key_env, monkeypatch):
+    monkeypatch.setattr(auth_cache, "Fernet", None)
+    with pytest.raises(ImportError):
+        AuthCache(str(tmp_path / "cache"))
+    assert not (tmp_path / "cache").exists()
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import threading
+
+import pytest
+
+from body_store import BodyStore
+
+
+def _chunks(data, n):
+    return [data[i:i + n] for i in range(0, len(data), n)]
+
+
+def test_same_body_is_stored_once(tmp_path):
+    store = BodyStore(str(tmp_path / "bodies"))
+    a = store.put_stream([b"invoice ", b"#10"], "application/pdf")
+    b = store.put_stream([b"invoice #10"], "application/pdf")
+    c = store.put_stream([b"other"])
+    assert a["new"] and not b["new"] and c["new"] and a["sha256"] == b["sha256"]
+    assert store.stats == {"stored": 2, "deduplicated": 1, "bytes_written": 16, "bytes_saved": 11}
+    assert store.meta(a["sha256"]) == {"sha256": a["sha256"], "length": 11, "content_type": "application/pdf"}
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_streamed_body_round_trips(tmp_path):
+    store = BodyStore(str(tmp_path / "bodies"))
+    data = os.urandom(1_000_003)
+    w = store.writer()
+    for c in _chunks(data, 4099):
+        w.feed(c)
+    meta = w.commit("application/octet-stream")
+    assert meta["sha256"] == hashlib.sha256(data).hexdigest() and meta["length"] == len(data)
+    assert b"".join(store.iter_body(meta["sha256"], 65536)) == data
+
+    store.add_ref("G1", "Admin", "/files/1", meta["sha256"])
+    assert store.ref("G1", "Admin", "/files/1") == meta["sha256"] and store.ref("G2", "Admin", "/files/1") is None
+
+    def broken():
+        yield b"partial"
+        raise RuntimeError("connection reset")
+
+    with pytest.raises(RuntimeError):
+        store.put_stream(broken())
+    assert os.listdir(store.tmp_dir) == [] and store.stats["stored"] == 1
+
+
+@pytest.mark.parametrize("writers", [2, 16])
+def test_concurrent_commits_of_one_body_count_one_store(tmp_path, monkeypatch, writers):
+    # every writer finds the name free, as if all checked before any of them committed
+    monkeypatch.setattr(os.path, "exists", lambda p: False)
+    store = BodyStore(str(tmp_path / "bodies"))
+    body = b"same page for every role" * 1000
+    barrier = threading.Barrier(writers)
+    results = []
+
+    def one():
+        w = store.writer()
+        for c in _chunks(body, 1000):
+            w.feed(c)
+        barrier.wait()
+        results.append(w.commit("text/html"))
+
+    threads = [threading.Thread(target=one) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(r["new"] for r in results) == 1
+    assert store.stats["stored"] == 1 and store.stats["deduplicated"] == writers - 1
+    assert store.stats["bytes_written"] == len(body)
+    assert b"".join(store.iter_body(results[0]["sha256"])) == body
+    assert store.meta(results[0]["sha256"])["length"] == len(body)
+    assert os.listdir(store.tmp_dir) == []
@@ -0,0 +1,78 @@
+import glob
+import gzip
+import json
+import os
+import time
+
+import pytest
+
+from capture_sink import CaptureSink
+
+
+def _records(n):
+    return [{"i": i, "url": f"http://127.0.0.1/api/users/{i}", "pad": "x" * 50} for i in range(n)]
+
+
+def _read(path, opener=open):
+    with opener(path, "rb") as f:
+        return [json.loads(line) for line in f]
+
+
+def _segments(d, ext):
+    rotated = sorted(glob.glob(os.path.join(d, "captures.*" + ext)))
+    rotated = [p for p in rotated if p != os.path.join(d, "captures" + ext)]
+    return rotated + [os.path.join(d, "captures" + ext)]
+
+
+@pytest.mark.parametrize("compress,opener", [(None, open), ("gzip", gzip.open)])
+def test_rotation_keeps_every_record_in_order(tmp_path, compress, opener):
+    ext = ".jsonl" + (".gz" if compress else "")
+    sink = CaptureSink(str(tmp_path / "captures.jsonl"), max_bytes=4096, compress=compress,
+                       flush_bytes=1024, flush_interval=0.05)
+    recs = _records(500)
+    for r in recs:
+        sink.write(r)
+    sink.close()
+
+    segs = _segments(str(tmp_path), ext)
+    assert sink.stats["rotations"] == len(segs) - 1 >= 5
+    assert [r for p in segs if os.path.exists(p) for r in _read(p, opener)] == recs
+    assert sink.stats["records"] == 500 and sink.error is None
+    if compress is None:
+        assert all(os.path.getsize(p) < 4096 + 1024 + 200 for p in segs[:-1])
+
+
+def test_new_sink_continues_the_segment_numbering(tmp_path):
+    path = str(tmp_path / "captures.jsonl")
+    for _ in range(2):
+        sink = CaptureSink(path, max_bytes=1000, compress="gzip", flush_bytes=1)
+        for r in _records(30):
+            sink.write(r)
+        sink.close()
+    segs = _segments(str(tmp_path), ".jsonl.gz")
+    assert len(segs) == len(set(segs))
+    assert sum(len(_read(p, gzip.open)) for p in segs if os.path.exists(p)) == 60
+
+
+def test_dead_writer_raises_instead_of_blocking(tmp_path, monkeypatch):
+    def broken_flush(self, buf):
+        if buf:
+            raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(CaptureSink, "_flush", broken_flush)
+    sink = CaptureSink(str(tmp_path / "captures.jsonl"), flush_bytes=1, queue_size=2)
+    deadline = time.monotonic() + 10
+    with pytest.raises(RuntimeError, match="No space left") as exc:
+        while time.monotonic() < deadline:   # the queue fills up long before the deadline
+            sink.write({"i": 1})
+    assert isinstance(exc.value.__cause__, OSError) and isinstance(sink.error, OSError)
+    sink.close(timeout=5)   # returns, nothing left to drain
+
+
+def test_write_after_close_raises(tmp_path):
+    sink = CaptureSink(str(tmp_path / "captures.jsonl"))
+    sink.write({"i": 1})
+    sink.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        sink.write({"i": 2})
+    assert _read(str(tmp_path / "captures.jsonl")) == [{"i": 1}]
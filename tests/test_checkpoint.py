@@ -0,0 +1,39 @@
+import os
+import time
+
+import pytest
+
+from checkpoint import Checkpoint
+
+
+@pytest.fixture(autouse=True)
+def key_env(tmp_path, monkeypatch):
+    monkeypatch.delenv("IDOR_AUTH_CACHE_KEY", raising=False)
+    monkeypatch.setenv("IDOR_AUTH_CACHE_KEY_FILE", str(tmp_path / "keys" / "auth.key"))
+
+
+def test_no_key_file_next_to_the_journal(tmp_path):
+    with Checkpoint(str(tmp_path / "run" / "ck.jsonl")) as ck:
+        ck.record_session("G1", "Admin", {"cookies": [{"name": "sid", "value": "s3cret"}], "headers": {}})
+
+    assert os.listdir(tmp_path / "run") == ["ck.jsonl"]
+    assert b"s3cret" not in (tmp_path / "run" / "ck.jsonl").read_bytes()
+    with Checkpoint(str(tmp_path / "run" / "ck.jsonl"), resume=True) as ck:
+        assert ck.state.sessions[("G1", "Admin")]["cookies"][0]["value"] == "s3cret"
+
+
+def test_lines_are_batched_on_the_flush_interval(tmp_path):
+    path = tmp_path / "ck.jsonl"
+    ck = Checkpoint(str(path), flush_interval=0.5)
+    ck.record("pair", v="Admin", a="Student", findings=[])
+    time.sleep(0.2)
+    ck.record("pair", v="Admin", a="Public", findings=[])
+    time.sleep(0.1)
+    assert path.read_bytes() == b""                      # still inside the interval
+    time.sleep(0.5)
+    assert path.read_bytes().count(b"\n") == 2           # one batch, both lines
+    ck.record("pair", v="Student", a="Public", findings=[])
+    ck.close()                                           # close writes what is pending
+    assert path.read_bytes().count(b"\n") == 3
+    with Checkpoint(str(path), resume=True) as resumed:
+        assert len(resumed.state.pairs) == 3
@@ -0,0 +1,89 @@
+import json
+import os
+
+import pytest
+
+import config_loader
+from config_loader import load_model
+
+MODEL = {
+    "roles": [{"name": "Admin", "rank": 3}, {"name": "Student", "rank": 1}],
+    "actions": [{"id": "login", "type": "state-changing", "method": "post", "endpoint": "/login",
+                 "headers": {"username": "{user}"}},
+                {"id": "view", "type": "state-preserving", "endpoint": "/users/{user_id}"}],
+    "use_cases": [{"role": "Admin", "action": "login"},
+                  {"role": "Student", "action": "view", "dependencies": [["login", "Admin"]]}],
+    "ctx_defaults": {"Student": {"user_id": 10}},
+}
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Counts the real parses (cache misses)."""
+    calls = []
+    real = config_loader._parse
+
+    def counting(path, raw):
+        calls.append(path)
+        return real(path, raw)
+    monkeypatch.setattr(config_loader, "_parse", counting)
+    return calls
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def test_unchanged_file_is_served_from_the_cache(tmp_path, parses):
+    cfg = _write(tmp_path / "scan.json", MODEL)
+    cache = str(tmp_path / "cache")
+    first = load_model(cfg, cache)
+    assert load_model(cfg, cache) == first and len(parses) == 1
+    assert first["actions"][0][2] == "POST" and first["ctx_defaults"] == {"Student": {"user_id": "10"}}
+    assert load_model(cfg) == first and len(parses) == 2        # no cache_dir: always parsed
+
+
+def test_changed_file_or_cache_version_invalidates(tmp_path, parses, monkeypatch):
+    cfg = tmp_path / "scan.json"
+    cache = str(tmp_path / "cache")
+    old = load_model(_write(cfg, MODEL), cache)
+    changed = dict(MODEL, ctx_defaults={"Student": {"user_id": 11}})
+    new = load_model(_write(cfg, changed), cache)
+    assert new["ctx_defaults"]["Student"]["user_id"] == "11" != old["ctx_defaults"]["Student"]["user_id"]
+    assert len(parses) == 2 and len(os.listdir(cache)) == 2
+
+    monkeypatch.setattr(config_loader, "CACHE_VERSION", config_loader.CACHE_VERSION + 1)
+    assert load_model(str(cfg), cache) == new and len(parses) == 3
+
+
+def test_corrupt_entry_is_rebuilt_and_invalid_models_are_not_cached(tmp_path, parses):
+    cfg = _write(tmp_path / "scan.json", MODEL)
+    cache = tmp_path / "cache"
+    good = load_model(cfg, str(cache))
+    (entry,) = cache.iterdir()
+    entry.write_bytes(b"\x00garbage")
+    assert load_model(cfg, str(cache)) == good and len(parses) == 2
+    assert load_model(cfg, str(cache)) == good and len(parses) == 2
+
+    bad = _write(tmp_path / "bad.json", dict(MODEL, roles=[]))
+
+    def reject(model):
+        raise ValueError("no roles")
+    for _ in range(2):
+        with pytest.raises(ValueError, match="no roles"):
+            load_model(bad, str(cache), validate=reject)
+    assert len(list(cache.iterdir())) == 1
+
+
+def test_load_config_uses_the_cache(idor, tmp_path, parses):
+    cfg = _write(tmp_path / "scan.json", MODEL)
+    roles, actions, ucs, ctx = idor.load_config(cfg, str(tmp_path / "cache"))
+    assert idor.load_config(cfg, str(tmp_path / "cache")) == (roles, actions, ucs, ctx) and len(parses) == 1
+    assert [r.name for r in roles] == ["Admin", "Student"]
+    assert ucs[1].dependencies == [("login", "Admin")]
+
+    broken = _write(tmp_path / "broken.json", dict(MODEL, use_cases=[{"role": "Ghost", "action": "view"}]))
+    with pytest.raises(ValueError, match="unknown role 'Ghost'"):
+        idor.load_config(broken, str(tmp_path / "cache"))
+    assert len(os.listdir(tmp_path / "cache")) == 1
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import requests
+
+from checkpoint import ResumeState
+from crawler import CrawlBudget, crawl
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """
+    / -> /users/1..20, /courses, /logout; /users/N -> /users/N+1 and /users/N/grades.
+    Pages need the sid=ok cookie; every page sets last=<n> for the cookie write-back.
+    """
+    protocol_version = "HTTP/1.1"
+    requested = []
+    lock = threading.Lock()
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        with self.lock:
+            self.requested.append(self.path)
+            n = len(self.requested)
+        if "sid=ok" not in (self.headers.get("Cookie") or ""):
+            return self._send(403, b"")
+        if self.path == "/":
+            links = [f"/users/{i}" for i in range(1, 21)] + ["/courses", "/logout"]
+        elif self.path.startswith("/users/") and self.path.count("/") == 2:
+            i = int(self.path.rsplit("/", 1)[1])
+            links = [f"/users/{i + 1}", f"/users/{i}/grades"]
+        else:
+            links = []
+        body = "".join(f'<a href="{h}">x</a>' for h in links).encode()
+        self._send(200, b"<html>" + body + b"</html>", {"Set-Cookie": f"last={n}; Path=/"})
+
+    def _send(self, status, body, headers=None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _site(local_server):
+    handler = type("Site", (SiteHandler,), {"requested": [], "lock": threading.Lock()})
+    return handler, local_server(handler)
+
+
+def _session():
+    s = requests.Session()
+    s.cookies.set("sid", "ok")
+    return s
+
+
+def test_per_template_dedup_and_exclusions(local_server):
+    handler, base = _site(local_server)
+    session = _session()
+    res = asyncio.run(crawl(session, base, ["/"], budget=CrawlBudget(per_template=3), workers=8))
+
+    users = [p for p in res["sitemap"] if p.startswith("/users/") and p.count("/") == 2]
+    grades = [p for p in res["sitemap"] if p.endswith("/grades")]
+    assert len(users) == 3 and len(grades) == 3       # /users/{id} and /users/{id}/grades: 3 each
+    assert res["stats"]["dropped_template"] > 0
+    assert "/logout" not in handler.requested
+    assert len(handler.requested) == len(set(handler.requested))
+    # every worker sent the user's cookie, and the cookies the target set came back to the user's session
+    assert res["stats"]["status"] == {200: res["stats"]["fetched"]}
+    assert session.cookies.get("last") is not None and session.cookies.get("sid") == "ok"
+
+
+def test_page_and_depth_budget(local_server):
+    handler, base = _site(local_server)
+    res = asyncio.run(crawl(_session(), base, ["/"], budget=CrawlBudget(max_pages=4, per_template=100)))
+    assert res["stats"]["fetched"] == 4 and len(handler.requested) == 4
+
+    handler, base = _site(local_server)
+    res = asyncio.run(crawl(_session(), base, ["/"], budget=CrawlBudget(max_depth=1, per_template=100)))
+    assert not [p for p in handler.requested if p.endswith("/grades")]   # depth 2
+    assert len([p for p in res["sitemap"] if p.startswith("/users/")]) == 20
+
+
+def test_resume_fetches_only_what_is_left(local_server):
+    handler, base = _site(local_server)
+    full = asyncio.run(crawl(_session(), base, ["/"], budget=CrawlBudget(per_template=5), workers=1))
+
+    handler, base = _site(local_server)
+    state = ResumeState()
+    pages = state.pages[("G1", "Student")] = []
+
+    def on_page(path, depth, ok, links):
+        pages.append({"path": path, "depth": depth, "ok": ok, "links": links})
+
+    asyncio.run(crawl(_session(), base, ["/"], budget=CrawlBudget(per_template=5, max_pages=4),
+                      workers=1, on_page=on_page))
+    first = list(handler.requested)
+    resumed = asyncio.run(crawl(_session(), base, ["/"], budget=CrawlBudget(per_template=5), workers=1,
+                                resume=state.crawl_resume(("G1", "Student"))))
+
+    assert len(first) == 4
+    assert sorted(handler.requested) == sorted(set(handler.requested))   # nothing fetched twice
+    assert sorted(resumed["sitemap"]) == sorted(full["sitemap"])
+
+
+class ETagSiteHandler(SiteHandler):
+    """SiteHandler with an ETag per page; If-None-Match on an unchanged page gets a 304."""
+    changed = ()
+
+    def do_GET(self) -> None:
+        etag = f'"{self.path}{"-v2" if self.path in self.changed else ""}"'
+        if self.headers.get("If-None-Match") == etag and "sid=ok" in (self.headers.get("Cookie") or ""):
+            with self.lock:
+                self.requested.append(self.path)
+                self.not_modified.append(self.path)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        super().do_GET()
+
+    def _send(self, status, body, headers=None) -> None:
+        headers = dict(headers or {})
+        headers["ETag"] = f'"{self.path}{"-v2" if self.path in self.changed else ""}"'
+        super()._send(status, body, headers)
+
+
+def test_recrawl_with_stored_validators_skips_unchanged_bodies(local_server, tmp_path):
+    from scan_store import ScanStore
+
+    handler = type("Site", (ETagSiteHandler,), {"requested": [], "not_modified": [], "lock": threading.Lock()})
+    base = local_server(handler)
+    budget = CrawlBudget(per_template=4)
+    with ScanStore(str(tmp_path / "store.db")) as store:
+        validators = {}
+        first = asyncio.run(crawl(_session(), base, ["/"], budget=budget, validators=validators))
+        store.put_pages(base, "G1", "Student", validators)
+    assert first["stats"]["not_modified"] == 0 and not handler.not_modified
+    assert set(validators) == set(first["sitemap"])
+
+    handler.requested.clear()
+    handler.changed = ("/users/2",)     # a new ETag: this page is fetched in full again
+    with ScanStore(str(tmp_path / "store.db")) as store:
+        validators = store.get_pages(base, "G1", "Student")
+        second = asyncio.run(crawl(_session(), base, ["/"], budget=budget, validators=validators))
+
+    assert sorted(second["sitemap"]) == sorted(first["sitemap"])
+    assert sorted(handler.requested) == sorted(first["sitemap"])
+    assert sorted(handler.not_modified) == sorted(p for p in first["sitemap"] if p != "/users/2")
+    assert second["stats"]["not_modified"] == len(first["sitemap"]) - 1
+    assert validators["/users/2"]["etag"] == '"/users/2-v2"'
@@ -0,0 +1,61 @@
+import pytest
+
+from enumeration import IdSpace, _cap, _merge, derive_spaces, split_id
+
+
+@pytest.mark.parametrize("value, want", [
+    ("42", ("{n}", 42, 0)),
+    ("inv-10-2025", ("inv-{n}-2025", 10, 0)),
+    ("2025-inv-10", ("2025-inv-{n}", 10, 0)),
+    ("2024", ("{n}", 2024, 0)),                          # only a year: it is the counter
+    ("2024-2025", ("2024-{n}", 2025, 0)),                # all years: the last one counts
+    ("1969-7", ("{n}-7", 1969, 0)),                      # out of the year range
+    ("u-007", ("u-{n}", 7, 3)),
+    ("0", ("{n}", 0, 0)),                                # a lone zero is not padding
+    ("a00-2025", ("a{n}-2025", 0, 2)),
+    ("me", None),
+])
+def test_split_id(value, want):
+    assert split_id(value) == want
+
+
+def test_render_keeps_padding_and_fixed_parts():
+    pattern, n, width = split_id("inv-007-2025")
+    space = IdSpace(pattern, width, [(n, n + 1)])
+    assert [space.render(i) for i in space] == ["inv-007-2025", "inv-008-2025"]
+    assert IdSpace("u{n}", 0, [(9, 10)]).render(10) == "u10"
+
+
+def test_merge_and_cap():
+    assert _merge([(10, 20), (0, 5), (6, 8), (19, 30), (40, 40)]) == [(0, 8), (10, 30), (40, 40)]
+    assert _merge([]) == []
+    assert _cap([(0, 8), (10, 30), (40, 40)], 12) == [(0, 8), (10, 12)]
+    assert _cap([(0, 8)], 0) == []
+    assert _cap([(0, 8)], 100) == [(0, 8)]
+
+
+def test_dense_range_is_grown_to_the_budget():
+    space, = derive_spaces(["100", "110", "100"], max_ids=1000, radius=5)
+    assert space.pattern == "{n}" and space.width == 0
+    lo, hi = space.ranges[0]
+    assert lo == 0 and hi == 999                      # grown around 95..115, clamped at 0
+
+    space, = derive_spaces(["5000"], max_ids=101, radius=10)
+    assert space.ranges == [(4950, 5050)]
+
+
+def test_sparse_values_probe_only_their_neighbourhoods():
+    space, = derive_spaces(["10", "12", "100000"], max_ids=1000, radius=5)
+    assert space.ranges == [(5, 17), (99995, 100005)]
+    space, = derive_spaces(["10", "100000", "200000"], max_ids=15, radius=5)
+    assert space.ranges == [(5, 15), (99995, 99998)]
+    assert len(space) == 15
+
+
+def test_padding_bounds_the_space_and_patterns_are_separate():
+    spaces = {s.pattern: s for s in derive_spaces(["u-09", "inv-3-2025", "x"], max_ids=200, radius=2)}
+    assert set(spaces) == {"u-{n}", "inv-{n}-2025"}
+    padded = spaces["u-{n}"]
+    assert padded.width == 2 and padded.ranges == [(0, 99)]         # no 3-digit IDs
+    assert padded.render(0) == "u-00"
+    assert len(spaces["inv-{n}-2025"]) == 200
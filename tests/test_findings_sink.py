@@ -0,0 +1,65 @@
+import json
+
+from findings_sink import FindingSink
+
+
+def _finding(i, flags=("cross_user_profile_candidate",)):
+    return {"attacker_role": "Student", "victim_role": "Admin", "url": f"/users/{i}",
+            "flags": list(flags), "confidence": "medium"}
+
+
+def test_findings_reach_disk_while_the_scan_runs(tmp_path):
+    jsonl, sarif, summary = tmp_path / "f.jsonl", tmp_path / "f.sarif", tmp_path / "s.txt"
+    stream = tmp_path / "all.jsonl"
+    sink = FindingSink(str(jsonl), str(sarif), str(summary), str(stream), samples=3, flush_interval=0.0)
+    for i in range(1000):
+        sink.emit(_finding(i))
+    sink.emit(_finding(1, ("admin_area_visible",)))
+
+    # before close(): the reports hold the current issues, every finding is streamed
+    groups = [json.loads(line) for line in jsonl.read_text().splitlines()]
+    assert [(g["path_template"], g["count"]) for g in groups] == [("/users/{id}", 1000), ("/users/{id}", 1)]
+    assert groups[0]["examples"] == ["/users/0", "/users/1", "/users/2"]
+    lines = [json.loads(line) for line in stream.read_text().splitlines()]
+    assert len(lines) == 1001 and lines[0]["path_template"] == "/users/{id}"
+    results = json.loads(sarif.read_text())["runs"][0]["results"]
+    assert sorted(r["properties"]["count"] for r in results) == [1, 1000]
+    assert summary.read_text().startswith("1001 findings in 2 distinct issues")
+    # memory holds the groups and a bounded sample only
+    assert len(sink.groups) == 2
+    assert all(len(g["examples"]) <= 3 for g in sink.groups.values())
+
+    sink.close()
+    assert len(stream.read_text().splitlines()) == 1001
+    assert jsonl.read_text() == sink.jsonl()
+    sink.write_jsonl(str(tmp_path / "again.jsonl"))
+    assert (tmp_path / "again.jsonl").read_text() == jsonl.read_text()
+
+
+def test_per_finding_stream_is_opt_in(tmp_path):
+    with FindingSink(str(tmp_path / "f.jsonl"), flush_interval=60) as sink:
+        sink.emit(_finding(1))
+        sink.emit(_finding(2))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["f.jsonl"]
+    assert len((tmp_path / "f.jsonl").read_text().splitlines()) == 1
+
+
+def test_sarif_artifact_uris_are_valid(tmp_path):
+    sink = FindingSink(samples=1)
+    sink.emit(dict(_finding(0), url="/users/7/files/a b.pdf?download=1"))
+    sink.emit(dict(_finding(0), url="/courses/12/grades"))
+    sink.samples = 0
+    sink.emit(dict(_finding(0), url="/billing/invoices/0123456789abcdef0123"))
+    uris = {r["properties"]["path_template"]: r["locations"][0]["physicalLocation"]["artifactLocation"]["uri"]
+            for r in sink.sarif()["runs"][0]["results"]}
+    assert uris == {"/users/{id}/files/a b.pdf": "/users/7/files/a%20b.pdf",
+                    "/courses/{id}/grades": "/courses/12/grades",
+                    "/billing/invoices/{hash}": "/billing/invoices/hash"}
+    assert not any(c in u for u in uris.values() for c in "{} ")
+
+
+def test_reports_are_written_when_nothing_is_found(tmp_path):
+    with FindingSink(str(tmp_path / "f.jsonl"), str(tmp_path / "f.sarif"), flush_interval=60) as sink:
+        assert sink.total == 0
+    assert (tmp_path / "f.jsonl").read_text() == ""
+    assert json.loads((tmp_path / "f.sarif").read_text())["runs"][0]["results"] == []
@@ -0,0 +1,106 @@
+import base64
+import gzip
+import json
+import os
+
+import pytest
+
+from capture_sink import CaptureSink
+from ingest import CaptureIndex, capture_files, name_placeholders
+
+
+def _rec(i, method="GET", body=b""):
+    path = f"/api/users/{i % 7}/invoices/inv-{i}-2025" if method == "GET" else "/api/courses/3/enroll"
+    return {"method": method, "url": f"http://127.0.0.1{path}", "headers": {},
+            "body_b64": base64.b64encode(body).decode() if body else "", "status": 200}
+
+
+def _append(path, recs, partial=b""):
+    with open(path, "ab") as f:
+        for r in recs:
+            f.write((json.dumps(r) + "\n").encode())
+        f.write(partial)
+
+
+def _count(ix):
+    return sum(e.count for e in ix.endpoints.values())
+
+
+def test_endpoints_are_deduplicated_with_named_placeholders(tmp_path):
+    path = str(tmp_path / "captures.jsonl")
+    _append(path, [_rec(i) for i in range(20)] + [_rec(0, "POST", b"user=5&role=student"),
+                                                   _rec(0, "POST", b'{"user": 6, "note": "x"}')])
+    ix = CaptureIndex(max_values=3)
+    assert ix.ingest(path) == 22
+    get = ix.endpoints[("GET", "/api/users/{id}/invoices/{slug}")]
+    assert get.template == "/api/users/{user_id}/invoices/{invoice_id}"
+    assert get.count == 20 and get.type == "state-preserving"
+    assert list(get.values["user_id"]) == ["0", "1", "2"]          # bounded sample
+    post = ix.endpoints[("POST", "/api/courses/{id}/enroll")]
+    assert post.action_id == "post_api_courses_course_id_enroll" and post.type == "state-changing"
+    assert post.fields == {"user": "{user}", "role": "{role}", "note": "{note}"}
+    assert list(post.values["user"]) == ["5", "6"]
+    assert name_placeholders("/a/{id}/{id}/b/{id}") == "/a/{a_id}/{a_id2}/b/{b_id}"
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_reingest_reads_only_appended_complete_lines(tmp_path, use_mmap):
+    path = str(tmp_path / "captures.jsonl")
+    _append(path, [_rec(i) for i in range(10)], partial=b'{"method": "GET", "url": "http://127.0.0.1/api/us')
+    ix = CaptureIndex()
+    assert ix.ingest(path, use_mmap=use_mmap) == 10
+    assert ix.ingest(path, use_mmap=use_mmap) == 0
+    with open(path, "ab") as f:                                   # the writer finishes the line
+        f.write(b'ers/1"}\n')
+    _append(path, [_rec(i) for i in range(5)])
+    assert ix.ingest(path, use_mmap=use_mmap) == 6
+    assert _count(ix) == 16
+
+    with open(path, "wb"):                                        # truncated: start over
+        pass
+    _append(path, [_rec(1)])
+    assert ix.ingest(path, use_mmap=use_mmap) == 1
+
+
+@pytest.mark.parametrize("compress", [None, "gzip"])
+def test_resume_follows_a_rotated_segment_by_inode(tmp_path, compress):
+    path = str(tmp_path / "captures.jsonl")
+    active = path + (".gz" if compress else "")
+    sink = CaptureSink(path, max_bytes=None, compress=compress)
+    for i in range(30):
+        sink.write(_rec(i))
+    sink.close()
+
+    ix = CaptureIndex()
+    assert ix.ingest(active) == 30
+    ix.save(str(tmp_path / "index.json"))
+    ix = CaptureIndex.load(str(tmp_path / "index.json"))
+
+    # more records, then the active file is renamed to a segment the index has never seen by name
+    sink = CaptureSink(path, max_bytes=None, compress=compress)
+    for i in range(30, 45):
+        sink.write(_rec(i))
+    sink.close()
+    sink._rotate()
+    sink = CaptureSink(path, max_bytes=None, compress=compress)
+    for i in range(45, 50):
+        sink.write(_rec(i))
+    sink.close()
+
+    assert len(capture_files(active)) == 2
+    assert ix.ingest(active) == 20                                # 15 from the segment, 5 new
+    assert ix.ingest(active) == 0
+    assert _count(ix) == 50
+
+    fresh = CaptureIndex()
+    assert fresh.ingest(active) == 50
+    assert {k: e.to_dict() for k, e in fresh.endpoints.items()} == {k: e.to_dict() for k, e in ix.endpoints.items()}
+
+
+def test_unreadable_lines_are_skipped(tmp_path):
+    path = str(tmp_path / "captures.jsonl.gz")
+    with gzip.open(path, "wb") as f:
+        f.write(b"not json\n\n" + (json.dumps(_rec(1)) + "\n").encode())
+    ix = CaptureIndex()
+    assert ix.ingest(path) == 1
+    assert os.path.basename(capture_files(path)[0]) == "captures.jsonl.gz"
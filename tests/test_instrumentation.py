@@ -0,0 +1,97 @@
+import io
+import json
+import logging
+import os
+
+import pytest
+
+from instrumentation import Metrics, setup_logging
+
+
+@pytest.fixture
+def idor_logger():
+    log = logging.getLogger("idor")
+    saved = (list(log.handlers), log.level, log.propagate)
+    yield
+    log.handlers[:], log.level, log.propagate = saved
+
+
+def test_counters_histograms_and_prometheus_text():
+    m = Metrics()
+    m.inc("findings", confidence="high")
+    m.inc("findings", 2, confidence="high")
+    m.inc("findings", confidence="low")
+    for v in (0.003, 0.02, 0.02, 20.0):
+        m.observe("http_request_seconds", v, status="2xx")
+
+    d = m.to_dict()
+    assert {(c["labels"]["confidence"], c["value"]) for c in d["counters"]} == {("high", 3), ("low", 1)}
+    (h,) = d["histograms"]
+    assert h["count"] == 4 and h["sum"] == pytest.approx(20.043)
+    assert h["buckets"]["0.005"] == 1 and h["buckets"]["0.025"] == 2 and h["buckets"]["+Inf"] == 1
+
+    text = m.to_prometheus()
+    assert "# TYPE idor_findings_total counter" in text
+    assert 'idor_findings_total{confidence="high"} 3' in text
+    assert 'idor_http_request_seconds_bucket{status="2xx",le="0.025"} 3' in text   # cumulative
+    assert 'idor_http_request_seconds_bucket{status="2xx",le="+Inf"} 4' in text
+    assert 'idor_http_request_seconds_count{status="2xx"} 4' in text
+
+
+def test_stages_hooks_profiles_and_dump(tmp_path):
+    m = Metrics()
+    events = []
+    m.hooks.append(lambda stage, what, dt: events.append((stage, what)))
+    m.enable_profiling(str(tmp_path / "prof"))
+    for _ in range(2):
+        with m.stage("crawl"):
+            pass
+    with pytest.raises(ValueError):
+        with m.stage("replay"):
+            raise ValueError("boom")
+
+    assert events == [("crawl", "start"), ("crawl", "end")] * 2 + [("replay", "start"), ("replay", "end")]
+    assert set(m.stages) == {"crawl", "replay"}
+    assert sorted(os.listdir(tmp_path / "prof")) == ["crawl.prof", "replay.prof"]
+
+    m.dump(str(tmp_path / "m.json"))
+    m.dump(str(tmp_path / "m.prom"))
+    data = json.loads((tmp_path / "m.json").read_text())
+    assert data["stages"].keys() == {"crawl", "replay"}
+    assert 'idor_stage_seconds_count{stage="crawl"} 2' in (tmp_path / "m.prom").read_text()
+
+
+def test_log_levels_and_text_format(idor_logger):
+    out = io.StringIO()
+    log = setup_logging("INFO", "text", stream=out)
+    log.debug("per-item detail")
+    log.info("stage summary %d", 3)
+    assert out.getvalue() == "stage summary 3\n"
+
+    out = io.StringIO()
+    log = setup_logging("debug", "text", stream=out)
+    log.debug("per-item detail")
+    assert out.getvalue() == "per-item detail\n" and len(log.handlers) == 1 and not log.propagate
+
+
+def test_json_format_carries_extra_fields(idor_logger):
+    out = io.StringIO()
+    log = setup_logging("WARNING", "json", stream=out)
+    log.info("hidden")
+    log.warning("confirmed %s", "/users/2", extra={"fields": {"finding": {"url": "/users/2"}}})
+    (line,) = out.getvalue().splitlines()
+    doc = json.loads(line)
+    assert doc["level"] == "WARNING" and doc["logger"] == "idor" and doc["msg"] == "confirmed /users/2"
+    assert doc["finding"] == {"url": "/users/2"}
+
+
+def test_pipeline_log_level(idor, idor_logger):
+    out = io.StringIO()
+    setup_logging("WARNING", stream=out)
+    idor.differential_analysis({("G1", "Admin"): ["/admin/x"], ("G2", "Student"): []},
+                               {"Admin": object()}, {"Student": object()})
+    assert out.getvalue() == ""
+    setup_logging("INFO", stream=out)
+    idor.differential_analysis({("G1", "Admin"): ["/admin/x"], ("G2", "Student"): []},
+                               {"Admin": object()}, {"Student": object()})
+    assert "Potential findings: 1" in out.getvalue() and "FLAGGED" not in out.getvalue()
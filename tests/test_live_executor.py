@@ -0,0 +1,94 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import requests
+
+from live_executor import run_ucl_concurrent, ucl_predecessors
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Records (path, start, end) of every request; /fail/* answers 500."""
+    protocol_version = "HTTP/1.1"
+    log = []
+    lock = threading.Lock()
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        t0 = time.perf_counter()
+        time.sleep(0.05)
+        status = 500 if self.path.startswith("/fail/") else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        with self.lock:
+            self.log.append((self.path, t0, time.perf_counter()))
+
+
+def _sender(base_url):
+    def send(label, user, key):
+        action, role = key
+        r = requests.get(f"{base_url}/{action}/{label}/{role}", timeout=5)
+        r.raise_for_status()
+        return {"group": label, "action_id": action, "role": role, "status": r.status_code}
+    return send
+
+
+def _spans(log, prefix):
+    return sorted((t0, t1) for path, t0, t1 in log if path.startswith(prefix))
+
+
+def test_role_order_and_overlap(local_server):
+    SlowHandler.log = []
+    base = local_server(SlowHandler)
+    ucl = [(f"a{i}", role) for i in range(4) for role in ("Admin", "Student")]
+    preds = ucl_predecessors(ucl, {}, {})
+    groups = {"G1": {"Admin": None, "Student": None}}
+
+    results = run_ucl_concurrent(ucl, preds, groups, _sender(base), max_workers=4)
+
+    assert [(r["action_id"], r["role"]) for r in results] == ucl
+    assert all(r["status"] == 200 for r in results)
+    for role in ("Admin", "Student"):
+        mine = sorted((t0, t1, p) for p, t0, t1 in SlowHandler.log if p.endswith("/" + role))
+        # one session per role: its requests are sent in UCL order and never overlap
+        assert [p for _, _, p in mine] == [f"/a{i}/G1/{role}" for i in range(4)]
+        assert all(a[1] <= b[0] for a, b in zip(mine, mine[1:]))
+    # the Admin and Student chains are independent and run side by side
+    admin = _spans([e for e in SlowHandler.log if e[0].endswith("/Admin")], "/")
+    student = _spans([e for e in SlowHandler.log if e[0].endswith("/Student")], "/")
+    assert any(a0 < s1 and s0 < a1 for a0, a1 in admin for s0, s1 in student)
+
+
+def test_failed_predecessor_skips_dependents(local_server):
+    SlowHandler.log = []
+    base = local_server(SlowHandler)
+    ucl = [("fail", "Admin"), ("b", "Admin"), ("c", "Student"), ("d", "Student")]
+    deps = {("d", "Student"): {("fail", "Admin")}}
+    preds = ucl_predecessors(ucl, deps, {})
+
+    results = {(r["action_id"], r["role"]): r
+               for r in run_ucl_concurrent(ucl, preds, {"G1": {"Admin": None, "Student": None}},
+                                           _sender(base), max_workers=4)}
+
+    assert "error" in results[("fail", "Admin")] and not results[("fail", "Admin")].get("skipped")
+    for k in (("b", "Admin"), ("d", "Student")):
+        # a skip is not an error: only the request that failed counts as one
+        assert results[k]["skipped"] is True and "error" not in results[k]
+        assert results[k]["reason"].startswith("predecessor failed")
+    assert results[("c", "Student")]["status"] == 200
+    assert {p for p, _, _ in SlowHandler.log} == {"/fail/G1/Admin", "/c/G1/Student"}
+
+
+def test_long_failed_chain_is_skipped_without_recursion():
+    ucl = [(f"a{i}", "Admin") for i in range(5000)]
+
+    def send(label, user, key):
+        raise RuntimeError("down")
+
+    results = run_ucl_concurrent(ucl, ucl_predecessors(ucl, {}, {}), {"G1": {"Admin": None}}, send)
+
+    assert len(results) == 5000
+    assert sum(1 for r in results if r.get("skipped")) == 4999
@@ -0,0 +1,43 @@
+import re
+
+import pytest
+
+from normalizer import first_id, normalize_path, path_template
+
+
+@pytest.mark.parametrize("path,template,values", [
+    ("/", "/", ()),
+    ("/users/10/edit?x=1#top", "/users/{id}/edit", ("10",)),
+    ("/api/users/10/invoices/20", "/api/users/{id}/invoices/{id}", ("10", "20")),
+    ("/billing/invoices/inv-10-2025.pdf", "/billing/invoices/{slug}.pdf", ("inv-10-2025",)),
+    ("/o/123e4567-e89b-12d3-a456-426614174000/x", "/o/{uuid}/x", ("123e4567-e89b-12d3-a456-426614174000",)),
+    ("/c/5f2b6a9e1c3d4e7f8a9b0c1d", "/c/{hash}", ("5f2b6a9e1c3d4e7f8a9b0c1d",)),
+    ("/s/dGhpcyBpcyBhIHRva2VuMTIz==", "/s/{token}", ("dGhpcyBpcyBhIHRva2VuMTIz==",)),
+    ("/r/2025-10-16/report.json", "/r/{slug}/report.json", ("2025-10-16",)),
+    ("/files/7.json", "/files/{id}.json", ("7",)),
+    ("/courses/intro/deadbeefdeadbeef", "/courses/intro/deadbeefdeadbeef", ()),   # hex without a digit
+    ("/users/me/settings", "/users/me/settings", ()),
+    ("//double//slash/3", "//double//slash/{id}", ("3",)),
+])
+def test_templates(path, template, values):
+    t = normalize_path(path)
+    assert t.template == template and path_template(path) == template
+    assert t.values == values and len(t.kinds) == len(values)
+
+
+@pytest.mark.parametrize("path", ["/api/users/10/edit", "/a/1/b/22/c", "/x/123e4567-e89b-12d3-a456-426614174000/5",
+                                  "/users/", "/admin/logs"])
+def test_ids_and_uuids_match_the_proxy_regexes(path):
+    old = re.sub(r"/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", "/{uuid}", path, flags=re.I)
+    old = re.sub(r"/\d+", "/{id}", old)
+    assert path_template(path) == old
+
+
+def test_first_id():
+    assert first_id("/users/10/courses/20") == "10"
+    assert first_id("/users/me") is None
+    assert first_id("/users/me?id=5") is None                       # the query string is not part of the path
+    assert first_id("/o/123e4567-e89b-12d3-a456-426614174000/7") == "7"
+    assert first_id("/o/123e4567-e89b-12d3-a456-426614174000/7", "uuid") == "123e4567-e89b-12d3-a456-426614174000"
+    assert first_id("/billing/invoices/inv-10-2025", "slug") == "inv-10-2025"
+    assert first_id("/billing/invoices/inv-10-2025", "hash") is None
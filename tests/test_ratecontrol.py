@@ -0,0 +1,158 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+from ratecontrol import AIMDLimiter, RateController, use_budget
+from sessions import SessionManager
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """Answers 429 + Retry-After for requests number throttle_from .. throttle_from+2, else 200."""
+    protocol_version = "HTTP/1.1"
+    throttle_from = 30
+    retry_after = 1
+    lock = threading.Lock()
+    seen = []
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _answer(self) -> None:
+        with self.lock:
+            n = len(self.seen)
+            self.seen.append((time.monotonic(), self.command, dict(self.headers)))
+        n_body = int(self.headers.get("Content-Length") or 0)
+        if n_body:
+            self.rfile.read(n_body)
+        time.sleep(0.005)
+        if self.throttle_from <= n < self.throttle_from + 3:
+            self.send_response(429)
+            self.send_header("Retry-After", str(self.retry_after))
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_POST = _answer
+
+
+def _serve(local_server, **attrs):
+    handler = type("Handler", (ThrottlingHandler,), dict(seen=[], lock=threading.Lock(), **attrs))
+    return handler, local_server(handler)
+
+
+def test_backoff_on_429_and_recovery(local_server):
+    handler, base = _serve(local_server)
+    # only the 429s may shrink the window: a latency spike on a loaded test machine must not
+    controller = RateController(initial=4, maximum=16, probe_interval=0.0, latency_tolerance=1000.0)
+    manager = SessionManager(controller=controller)
+    session = manager.new_session()
+    limiter = controller.host(base.split("/")[2]).budgets["state-preserving"]
+
+    def get(_):
+        return session.get(base + "/page", timeout=10).status_code
+
+    limits = []
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        for batch in range(6):
+            statuses = list(pool.map(get, range(15)))
+            limits.append(limiter.limit)
+            # every throttled GET was retried after the pause
+            assert statuses == [200] * 15
+    manager.close()
+    assert limiter.inflight == 0 and limiter.stats["requests"] == len(handler.seen)
+
+    before, after_throttle = limits[1], min(limits[2:])
+    assert limiter.stats["throttled"] == 3
+    assert limiter.stats["backoffs"] >= 1
+    assert after_throttle < before                    # multiplicative decrease
+    assert limits[-1] > after_throttle                # window grows back afterwards
+    # Retry-After paused the host: besides requests already in flight, nothing reached the server for ~1s
+    times = [t for t, _, _ in handler.seen[handler.throttle_from:]]
+    assert max(b - a for a, b in zip(times, times[1:])) >= 0.9 * handler.retry_after
+
+
+def test_budget_choice_never_reaches_the_target(local_server):
+    handler, base = _serve(local_server, throttle_from=10 ** 9)
+    controller = RateController()
+    host = base.split("/")[2]
+    for ctrl in (controller, None):
+        manager = SessionManager(controller=ctrl)
+        session = manager.new_session()
+        with use_budget("state-changing"):
+            session.get(base + "/a", timeout=10)
+        session.post(base + "/b", data={"x": "1"}, timeout=10)
+        manager.close()
+
+    budgets = controller.host(host).budgets
+    assert budgets["state-changing"].stats["requests"] == 2
+    assert budgets["state-preserving"].stats["requests"] == 0
+    assert len(handler.seen) == 4
+    assert not [h for _, _, headers in handler.seen for h in headers if h.lower().startswith("x-idor")]
+
+
+class BodyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = b"x" * 300000
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+
+def test_slot_is_held_until_the_body_is_consumed(local_server):
+    base = local_server(BodyHandler)
+    gate = threading.Semaphore(2)
+    controller = RateController(gate=gate)
+    manager = SessionManager(controller=controller)
+    session = manager.new_session()
+    limiter = controller.host(base.split("/")[2]).budgets["state-preserving"]
+
+    resp = session.get(base + "/a", stream=True, timeout=10)
+    assert limiter.inflight == 1 and gate._value == 1        # headers are in, the body is not
+    assert sum(len(c) for c in resp.iter_content(65536)) == len(BodyHandler.body)
+    assert limiter.inflight == 0 and gate._value == 2
+    resp.close()                                             # released once, not twice
+    assert limiter.inflight == 0 and gate._value == 2 and limiter.stats["requests"] == 1
+
+    resp = session.get(base + "/b", stream=True, timeout=10)
+    resp.close()                                             # closed unread
+    assert limiter.inflight == 0 and gate._value == 2
+
+    assert len(session.get(base + "/c", timeout=10).content) == len(BodyHandler.body)
+    assert limiter.inflight == 0 and gate._value == 2 and limiter.stats["requests"] == 3
+    manager.close()
+
+
+def test_gate_only_is_held_until_the_body_is_consumed(local_server):
+    base = local_server(BodyHandler)
+    gate = threading.Semaphore(1)
+    manager = SessionManager(gate=gate)
+    session = manager.new_session()
+    resp = session.get(base + "/a", stream=True, timeout=10)
+    assert not gate.acquire(blocking=False)
+    resp.close()
+    assert gate.acquire(blocking=False)
+    gate.release()
+    manager.close()
+
+
+def test_latency_baseline_is_per_endpoint():
+    limiter = AIMDLimiter(initial=8)
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(200, 0.01, endpoint="GET /login")
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(200, 0.5, endpoint="GET /reports/{id}")   # slow, but always this slow
+    assert limiter.stats["backoffs"] == 0 and limiter.limit > 8
+
+    limiter.acquire()
+    limiter.release(200, 2.0, endpoint="GET /reports/{id}")       # 4x its own baseline
+    assert limiter.stats["backoffs"] == 1
@@ -0,0 +1,65 @@
+import random
+import time
+
+import pytest
+
+from replay import MAX_TOKEN, BodyFingerprint, compare, fingerprint_chunks
+
+PAGE = (b"<html><body><h1>Grades for user 42</h1><input name=csrf value=9f86d081884c7d659a2feaa0c55ad015>"
+        + b"".join(b"<tr><td>course %d</td><td>%d</td></tr>" % (i, i * 7 % 100) for i in range(200))
+        + b"</body></html>")
+
+
+def _chunked(data, rng):
+    out, i = [], 0
+    while i < len(data):
+        n = rng.randint(1, 97)
+        out.append(data[i:i + n])
+        i += n
+    return out
+
+
+@pytest.mark.parametrize("data", [PAGE, b"a" * (5 * MAX_TOKEN + 17) + b" tail", b"x" * MAX_TOKEN, b""])
+def test_fingerprint_does_not_depend_on_chunking(data):
+    whole = fingerprint_chunks([data])
+    for seed in range(10):
+        assert fingerprint_chunks(_chunked(data, random.Random(seed))) == whole
+    assert fingerprint_chunks([data[i:i + 1] for i in range(len(data))]) == whole
+    assert whole["length"] == len(data)
+
+
+def test_long_token_keeps_the_tail_bounded():
+    fp = BodyFingerprint()
+    t0 = time.perf_counter()
+    for _ in range(4096):
+        fp.feed(b"a" * 1024)
+        assert len(fp._tail) < MAX_TOKEN
+    assert time.perf_counter() - t0 < 5
+    assert fp.result()["length"] == 4 * 1024 * 1024
+
+
+def test_normalized_hash_ignores_volatile_tokens_only():
+    other_csrf = PAGE.replace(b"9f86d081884c7d659a2feaa0c55ad015", b"e3b0c44298fc1c149afbf4c8996fb924")
+    a, b = fingerprint_chunks([PAGE]), fingerprint_chunks([other_csrf])
+    assert a["sha256"] != b["sha256"] and a["norm_hash"] == b["norm_hash"]
+
+    other_user = fingerprint_chunks([PAGE.replace(b"user 42", b"user 43")])
+    assert other_user["norm_hash"] != a["norm_hash"]
+    # whitespace and punctuation are not tokens
+    assert fingerprint_chunks([b"<b>x y</b>"])["norm_hash"] == fingerprint_chunks([b"<b x=\"y\">\n</b>"])["norm_hash"]
+
+
+def _fp(status, body=PAGE):
+    return dict(fingerprint_chunks([body]), status=status)
+
+
+def test_compare_verdicts():
+    victim = _fp(200)
+    assert compare(victim, _fp(200)) == "confirmed"
+    assert compare(victim, _fp(200, PAGE.replace(b"9f86d081", b"0badc0de"))) == "confirmed"   # norm_hash
+    assert compare(victim, _fp(200, PAGE + b"<p>x</p>")) == "confirmed"                       # simhash
+    assert compare(victim, _fp(200, b"<html>Your own profile</html>")) == "different"
+    for status in (302, 401, 403, 404):
+        assert compare(victim, _fp(status, b"")) == "denied"
+    assert compare(victim, _fp(500, b"")) == "different"
+    assert compare(_fp(404, b""), _fp(200)) == "inconclusive"
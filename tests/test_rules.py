@@ -0,0 +1,121 @@
+import itertools
+import random
+import re
+
+import pytest
+
+from rules import DEFAULT_RULES, RuleSet
+
+ROLES = ("Admin", "Instructor", "Student", "Public")
+CTX = {"Admin": {"user_id": "1"}, "Instructor": {"user_id": "2"}, "Student": {"user_id": "10"}, "Public": {}}
+
+
+def hard_coded_flags(url, attacker_role, ctx):
+    """The heuristics DEFAULT_RULES replaced, as they were written in IDOR-detection.py."""
+    flags = []
+    if url.startswith("/admin") and attacker_role != "Admin":
+        flags.append("admin_namespace_visible")
+    if url.startswith("/users/") and attacker_role != "Admin":
+        m = re.search(r"/(\d+)(?:/|$)", url)
+        uid_in_url = m.group(1) if m else None
+        atk_uid = ctx.get("user_id")
+        if uid_in_url and (atk_uid is None or str(uid_in_url) != str(atk_uid)):
+            flags.append("cross_user_profile_candidate")
+    if "/instructor/" in url and attacker_role == "Student":
+        flags.append("instructor_area_visible")
+    if "/billing/invoices/" in url and attacker_role != "Admin":
+        flags.append("billing_artifact_visible")
+    if url.endswith("/grades") and "/instructor/" in url and attacker_role not in ("Admin", "Instructor"):
+        flags.append("gradebook_visible")
+    return flags
+
+
+def url_corpus(rng, n):
+    parts = ["admin", "administrator", "users", "10", "2", "1", "77", "me", "instructor", "billing", "invoices",
+             "inv-10-2025", "grades", "courses", "102", "profile", "x"]
+    urls = ["/", "/admin", "/users/", "/users/10", "/users/11/grades", "/instructor/grades",
+            "/courses/102/instructor/grades", "/billing/invoices/inv-10-2025", "/users/me/77"]
+    for _ in range(n):
+        urls.append("/" + "/".join(rng.choice(parts) for _ in range(rng.randint(1, 5))))
+    return urls
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_default_rules_match_the_hard_coded_heuristics(seed):
+    rs = RuleSet(DEFAULT_RULES)
+    urls = url_corpus(random.Random(seed), 400)
+    for role in ROLES:
+        got = rs.classify(urls, role, CTX[role])
+        assert got == [hard_coded_flags(u, role, CTX[role]) for u in urls]
+        assert rs.flags(urls[-1], role, CTX[role]) == got[-1]
+    # every flag is reachable by the corpus
+    assert {f for role in ROLES for fs in rs.classify(urls, role, CTX[role]) for f in fs} == \
+        {r["flag"] for r in DEFAULT_RULES}
+
+
+def test_pattern_and_foreign_id_pattern_rules():
+    rs = RuleSet([
+        {"flag": "export", "confidence": "high", "contains": ["/export"], "pattern": r"\.(csv|xlsx)$"},
+        {"flag": "other_course", "prefix": "/courses/", "suffix": "/roster",
+         "foreign_id": {"pattern": r"^/courses/(\w+)/", "ctx_key": "course_id"}},
+        {"flag": "everything", "roles_only": ["Public"]},
+        {"flag": "special.chars", "contains": ["a+b(", "[x]"]},
+    ])
+    ctx = {"course_id": "102"}
+    urls = ["/export/grades.csv", "/export/grades.pdf", "/courses/101/roster", "/courses/102/roster",
+            "/courses/101/roster/x", "/q/a+b(/[x]", "/q/ab/x"]
+    assert rs.classify(urls, "Student", ctx) == [["export"], [], ["other_course"], [], [], ["special.chars"], []]
+    assert rs.classify(urls[:1], "Public", {})[0] == ["export", "everything"]
+    assert rs.classify(["/courses/5/roster"], "Student", {}) == [["other_course"]]   # own id unknown
+    assert rs.confidence(["export", "other_course"]) == "high"
+    assert rs.confidence([]) == "low"
+
+
+def test_invalid_rules_are_rejected():
+    for bad in ({"confidence": "high"}, {"flag": "x", "confidence": "huge"}, {"flag": "x", "pattern": "("},
+                {"flag": "x", "foreign_id": {"pattern": "no-group"}}):
+        with pytest.raises((ValueError, re.error)):
+            RuleSet([bad])
+
+
+def test_rules_without_conditions_or_rules_at_all():
+    assert RuleSet([]).classify(["/a", "/b"], "Student") == [[], []]
+    rs = RuleSet([{"flag": "a"}, {"flag": "b", "roles_exclude": ["Admin"]}])
+    for role, n in itertools.product(("Admin", "Student"), (0, 3)):
+        want = ["a"] if role == "Admin" else ["a", "b"]
+        assert rs.classify(["/x"] * n, role) == [want] * n
+
+
+def naive_flags(rules, url, role):
+    out = []
+    for r in rules:
+        if role in r.get("roles_exclude", ()) or ("roles_only" in r and role not in r["roles_only"]):
+            continue
+        if (url.startswith(r.get("prefix", "")) and url.endswith(r.get("suffix", ""))
+                and all(c in url for c in r.get("contains", ()))):
+            out.append(r["flag"])
+    return out
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_overlapping_literals_match_a_naive_evaluator(seed):
+    rng = random.Random(seed)
+    alphabet = "ab/"
+
+    def lit():
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+
+    rules = []
+    for i in range(rng.randint(1, 12)):
+        r = {"flag": f"f{i}", "contains": [lit() for _ in range(rng.randint(0, 3))]}
+        if rng.random() < 0.4:
+            r["prefix"] = lit()
+        if rng.random() < 0.4:
+            r["suffix"] = lit()
+        if rng.random() < 0.2:
+            r["roles_only"] = ["Student"]
+        rules.append(r)
+    rs = RuleSet(rules)
+    urls = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))) for _ in range(300)]
+    for role in ("Admin", "Student"):
+        assert rs.classify(urls, role) == [naive_flags(rules, u, role) for u in urls]
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+
+def baseline_traverse(ucs):
+    """The original set-based greedy traversal, kept as the reference for UCGraph.traverse."""
+    keys = {(uc.action.id, uc.role) for uc in ucs}
+    deps = {(uc.action.id, uc.role): {k for k in uc.dependencies if k in keys} for uc in ucs}
+    cancels = {(uc.action.id, uc.role): {k for k in uc.cancellation if k in keys} for uc in ucs}
+    dependents = {k: set() for k in keys}
+    for k, ps in deps.items():
+        for p in ps:
+            dependents[p].add(k)
+    visited, canceled, ucl = set(), set(), []
+
+    def is_available(k):
+        if k in visited or k in canceled:
+            return False
+        return {p for p in deps[k] if p not in canceled}.issubset(visited)
+
+    def count_cancels(k):
+        return len([x for x in cancels[k] if x not in visited and x not in canceled])
+
+    def count_satisfied_deps(k):
+        return sum(1 for u in dependents.get(k, ()) if u not in visited and u not in canceled and k in deps[u])
+
+    while True:
+        remaining = [k for k in keys if k not in visited and k not in canceled]
+        if not remaining:
+            break
+        available = sorted(k for k in keys if is_available(k))
+        if not available:
+            chosen = sorted(remaining, key=lambda k: (len([p for p in deps[k] if p not in visited]), k))[0]
+        else:
+            chosen = sorted(available, key=lambda k: (count_cancels(k), -count_satisfied_deps(k), k))[0]
+        ucl.append(chosen)
+        visited.add(chosen)
+        for victim in cancels.get(chosen, ()):
+            if victim not in visited:
+                canceled.add(victim)
+                for w in deps:
+                    deps[w].discard(victim)
+    return ucl
+
+
+def random_use_cases(idor, rng, n, dep_p, cancel_p, roles=("Admin", "Instructor", "Student")):
+    actions = [idor.Action(f"a{i:03d}", "state-preserving", idor.Requesttype("GET", f"/p/{i}")) for i in range(n)]
+    ucs = [idor.usecase(rng.choice(roles), a) for a in actions]
+    keys = [(uc.action.id, uc.role) for uc in ucs]
+    for i, uc in enumerate(ucs):
+        # mostly forward edges, some backward ones for cycles, some dangling references
+        uc.dependencies = [keys[j] for j in range(n) if j != i and rng.random() < dep_p * (0.2 if j > i else 1)]
+        uc.cancellation = [keys[j] for j in range(n) if j != i and rng.random() < cancel_p]
+        if rng.random() < 0.05:
+            uc.dependencies.append(("missing", "Admin"))
+    return ucs
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_traversal_matches_the_baseline_on_random_graphs(idor, seed):
+    rng = random.Random(seed)
+    ucs = random_use_cases(idor, rng, n=rng.randint(1, 60), dep_p=rng.choice([0.0, 0.03, 0.1]),
+                           cancel_p=rng.choice([0.0, 0.01, 0.05]))
+    assert idor.traverse_use_case_graph(ucs) == baseline_traverse(ucs)
+
+
+def test_default_model_matches_the_baseline(idor):
+    assert idor.traverse_use_case_graph(idor.USE_CASES) == baseline_traverse(idor.USE_CASES)
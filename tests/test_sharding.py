@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from rules import DEFAULT_RULES, RuleSet
+from sharding import plan_units, sharded_differential
+
+CTX = {"Student": {"user_id": "10"}, "Instructor": {"user_id": "2"}}
+
+
+def _sitemaps(rng):
+    pool = [f"/users/{i}" for i in range(120)] + [f"/admin/users/{i}" for i in range(40)] + \
+           [f"/instructor/courses/{i}/grades" for i in range(40)] + ["/", "/courses"]
+    sm = {}
+    for role, n in (("Admin", 180), ("Instructor", 100), ("Student", 60)):
+        sm[("G1", role)] = rng.sample(pool, n) + pool[:3]          # duplicates too
+        sm[("G2", role)] = rng.sample(pool, n // 2)
+    sm[("G1", "Empty")] = []
+    return sm
+
+
+def serial(sm, pairs):
+    rs = RuleSet(DEFAULT_RULES)
+    out = []
+    for victim, attacker in pairs:
+        if ("G1", victim) not in sm:
+            continue
+        cands = sorted(set(sm[("G1", victim)]) - set(sm.get(("G2", attacker), [])))
+        for url, flags in zip(cands, rs.classify(cands, attacker, CTX.get(attacker, {}))):
+            if flags:
+                out.append({"attacker_role": attacker, "victim_role": victim, "url": url,
+                            "flags": flags, "confidence": rs.confidence(flags)})
+    return out
+
+
+def test_plan_units_cover_every_slice_in_order():
+    units = plan_units([("A", "B"), ("C", "B"), ("A", "C")], {"A": 10, "C": 0}, chunk=4)
+    assert units == [(0, "A", "B", 0, 4), (1, "A", "B", 4, 8), (2, "A", "B", 8, 10),
+                     (3, "A", "C", 0, 4), (4, "A", "C", 4, 8), (5, "A", "C", 8, 10)]
+
+
+@pytest.mark.parametrize("chunk", [7, 50000])
+def test_sharded_findings_equal_the_serial_ones(chunk):
+    sm = _sitemaps(random.Random(chunk))
+    roles = ["Admin", "Instructor", "Student", "Empty", "Ghost"]
+    pairs = [(v, a) for v in roles for a in roles]
+
+    got = list(sharded_differential(sm, pairs, DEFAULT_RULES, CTX, processes=3, chunk=chunk))
+
+    assert [u[0] for u, _, _ in got] == list(range(len(got)))
+    assert [f for _, _, fs in got for f in fs] == serial(sm, pairs)
+    per_pair = {}
+    for (_, v, a, _, _), n, _ in got:
+        per_pair[(v, a)] = per_pair.get((v, a), 0) + n
+    for (v, a), n in per_pair.items():
+        assert n == len(set(sm[("G1", v)]) - set(sm.get(("G2", a), [])))
+    assert not [u for u, _, _ in got if u[1] in ("Empty", "Ghost")]
@@ -0,0 +1,42 @@
+import random
+
+from sitemap_sets import SitemapIndex
+
+
+def _sitemaps(rng):
+    pool = [f"/users/{i}" for i in range(300)] + [f"/courses/{i}/grades" for i in range(100)]
+    sm = {}
+    for i, role in enumerate(("Admin", "Instructor", "Student", "Public")):
+        sm[("G1", role)] = rng.sample(pool, 400 - 100 * i) + pool[:5]   # duplicates too
+        sm[("G2", role)] = rng.sample(pool, 400 - 100 * i)
+    sm[("G2", "Public")] = list(sm[("G2", "Student")])                  # identical sitemaps share a slot
+    return sm
+
+
+def test_differences_match_set_algebra():
+    sm = _sitemaps(random.Random(7))
+    roles = ["Admin", "Instructor", "Student", "Public", "Ghost"]
+    pairs = [(v, a) for v in roles for a in roles]
+
+    got = list(SitemapIndex(sm).differences(pairs))
+
+    assert [p for p, _ in got] == pairs
+    for (v, a), cands in got:
+        assert cands == sorted(set(sm.get(("G1", v), [])) - set(sm.get(("G2", a), [])))
+
+
+def test_sharded_and_single_process_findings_agree(idor):
+    idor.enumerate_all()
+    sm = {}
+    rng = random.Random(3)
+    paths = [f"/users/{i}" for i in range(200)] + [f"/admin/users/{i}" for i in range(50)] + \
+            [f"/instructor/courses/{i}/grades" for i in range(50)]
+    for r in idor.ROLES:
+        for g in ("G1", "G2"):
+            sm[(g, r.name)] = rng.sample(paths, 60 * (r.rank + 1))
+    users = {r.name: object() for r in idor.ROLES}
+
+    single = idor.differential_analysis(sm, users, users)
+    sharded = idor.differential_analysis(sm, users, users, processes=2)
+
+    assert single and single == sharded
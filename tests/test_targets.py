@@ -0,0 +1,19 @@
+import pytest
+
+from targets import Target
+
+
+@pytest.mark.parametrize("rate_control", [True, False])
+def test_scan_targets_honours_rate_control(idor, mock_lms, rate_control):
+    idor.enumerate_all()
+    ucl = idor.traverse_use_case_graph(idor.USE_CASES)
+    targets = [Target("a", mock_lms), Target("b", mock_lms, workers=2)]
+
+    results = idor.scan_targets(targets, ucl, total_workers=4, rate_control=rate_control)
+
+    assert list(results) == ["a", "b"]
+    for res in results.values():
+        assert "error" not in res
+        assert res["ucl_requests"] == 2 * len(ucl)
+        assert res["findings"] > 0
+        assert bool(res["rate"]) is rate_control
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from templates import CompiledRequest, compile_template
+
+
+def replace_render(s, ctx):
+    """The original renderer: one str.replace per context key."""
+    for k, v in ctx.items():
+        s = s.replace("{" + k + "}", str(v))
+    return s
+
+
+def random_template(rng):
+    pieces = ["/api", "/courses/", "{course_id}", "/users/", "{user_id}", "{missing}", "?q=", "{user_id}",
+              "-", "{{", "}", "{not a name}", "%s", "/"]
+    return "".join(rng.choice(pieces) for _ in range(rng.randint(0, 8)))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_render_matches_str_replace(seed):
+    rng = random.Random(seed)
+    ctx = {"course_id": rng.randint(1, 99), "user_id": "u{1}", "unused": "x"}
+    for _ in range(20):
+        src = random_template(rng)
+        assert compile_template(src).render(ctx) == replace_render(src, ctx)
+        cr = CompiledRequest("post", src, {"a": src, "n": 3})
+        assert cr.render(ctx) == (replace_render(src, ctx), {"a": replace_render(src, ctx), "n": 3})
+
+
+def test_render_is_memoized_on_used_names_and_returns_fresh_form_data():
+    cr = CompiledRequest("POST", "/courses/{course_id}/enroll", {"user": "{user_id}", "role": "student"},
+                         cache_size=2)
+    ep, data = cr.render({"course_id": 1, "user_id": 7, "other": "a"})
+    data["user"] = "mutated"
+    assert cr.render({"course_id": 1, "user_id": 7, "other": "b"}) == ("/courses/1/enroll", {"user": "7", "role": "student"})
+    assert len(cr._cache) == 1
+    cr.render({"course_id": 2, "user_id": 7})
+    cr.render({"course_id": 3, "user_id": 7})
+    assert len(cr._cache) <= 2
+    assert cr.render(None) == ("/courses/{course_id}/enroll", {"user": "{user_id}", "role": "student"})
+
+
+def test_render_column_matches_per_value_render():
+    tpl = compile_template("/c/{course_id}/u/{user_id}/{missing}?x={{}}&u={user_id}")
+    values = ["1", 22, "{weird}", "}{"]
+    ctx = {"course_id": "c{0}"}
+    assert tpl.render_column("user_id", values, ctx) == [tpl.render(dict(ctx, user_id=v)) for v in values]
+    # a column the template does not use renders the same string once per value
+    assert tpl.render_column("nope", iter(values), ctx) == [tpl.render(ctx)] * len(values)
+    cr = CompiledRequest("GET", "/u/{user_id}")
+    assert cr.render_endpoints("user_id", range(3)) == ["/u/0", "/u/1", "/u/2"]
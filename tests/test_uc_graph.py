@@ -0,0 +1,144 @@
+import logging
+import random
+
+import pytest
+
+from uc_graph import UCGraph
+
+
+def baseline_dicts(ucs):
+    """build_uc_graph as it was before the interned graph: dicts of sets of keys."""
+    uc_by_key = {(uc.action.id, uc.role): uc for uc in ucs}
+    deps = {k: {p for p in uc.dependencies if p in uc_by_key} for k, uc in uc_by_key.items()}
+    cancels = {k: {c for c in uc.cancellation if c in uc_by_key} for k, uc in uc_by_key.items()}
+    dependents = {k: set() for k in uc_by_key}
+    for k, ps in deps.items():
+        for p in ps:
+            dependents[p].add(k)
+    return uc_by_key, deps, cancels, dependents
+
+
+def random_graph(idor, rng, n, dep_p=0.05, cancel_p=0.02):
+    roles = ("Admin", "Instructor", "Student")
+    ucs = [idor.usecase(rng.choice(roles), idor.Action(f"a{i % (n // 2 + 1)}", "state-preserving",
+                                                       idor.Requesttype("GET", f"/p/{i}")))
+           for i in range(n)]
+    seen, out = set(), []
+    for uc in ucs:                      # shared action ids across roles, unique keys
+        if (uc.action.id, uc.role) not in seen:
+            seen.add((uc.action.id, uc.role))
+            out.append(uc)
+    keys = [(uc.action.id, uc.role) for uc in out]
+    for uc in out:
+        uc.dependencies = [k for k in keys if rng.random() < dep_p] * rng.choice([1, 2])   # repeated edges
+        uc.cancellation = [k for k in keys if rng.random() < cancel_p]
+        if rng.random() < 0.1:
+            uc.dependencies.append(("missing", "Admin"))
+    return out
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_to_dicts_matches_the_dict_of_sets_graph(idor, seed):
+    rng = random.Random(seed)
+    ucs = random_graph(idor, rng, rng.randint(1, 80))
+    g = UCGraph(ucs)
+    assert g.to_dicts() == baseline_dicts(ucs)
+    assert idor.build_uc_graph(ucs) == baseline_dicts(ucs)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_interning_and_csr_views(idor, seed):
+    rng = random.Random(seed)
+    ucs = random_graph(idor, rng, 60, dep_p=0.1, cancel_p=0.05)
+    g = UCGraph(ucs)
+    assert len(set(g.actions)) == len(g.actions) and len(set(g.roles)) == len(g.roles)
+    assert g.keys() == [(uc.action.id, uc.role) for uc in ucs]
+    assert [g.key(i) for i in range(len(g))] == g.keys()
+    for i in range(len(g)):
+        assert list(g.dependents_of(i)) == [u for u in range(len(g)) if i in g.deps_of(u)]
+        assert len(set(g.deps_of(i))) == len(g.deps_of(i))          # edges deduplicated
+        rc = g.rcancel[g.rcancel_off[i]:g.rcancel_off[i + 1]]
+        assert list(rc) == [u for u in range(len(g)) if i in g.cancels_of(u)]
+    assert g.dep_off[-1] == len(g.dep) and g.rdep_off[-1] == len(g.rdep) == len(g.dep)
+
+
+def test_duplicate_keys_raise_and_unknown_refs_are_dropped(idor, caplog):
+    a = idor.Action("view", "state-preserving", idor.Requesttype("GET", "/v"))
+    with pytest.raises(ValueError, match="Duplicate use case key"):
+        UCGraph([idor.usecase("Admin", a), idor.usecase("Admin", a)])
+
+    uc = idor.usecase("Admin", a, [("nope", "Admin"), ("view", "Ghost")], [("view", "Admin")])
+    with caplog.at_level(logging.WARNING, logger="idor"):
+        g = UCGraph([uc])
+    assert len(g.deps_of(0)) == 0 and list(g.cancels_of(0)) == [0]
+    assert sum("unknown use case" in r.getMessage() for r in caplog.records) == 2
+
+
+def _graph(idor, deps, cancels=(), n=None):
+    """Use cases u0..u{n-1} (all Admin); deps/cancels are (from, to) index pairs."""
+    n = n if n is not None else 1 + max((x for e in list(deps) + list(cancels) for x in e), default=0)
+    acts = [idor.Action(f"u{i}", "state-preserving", idor.Requesttype("GET", f"/u/{i}")) for i in range(n)]
+    ucs = [idor.usecase("Admin", a) for a in acts]
+    for a, b in deps:
+        ucs[a].dependencies.append((f"u{b}", "Admin"))
+    for a, b in cancels:
+        ucs[a].cancellation.append((f"u{b}", "Admin"))
+    return UCGraph(ucs)
+
+
+def test_cycles_block_themselves_and_their_dependents(idor):
+    # 1 -> 2 -> 3 -> 1 is a cycle, 4 depends on it, 5 depends on itself, 0 and 6 -> 0 are fine
+    rep = _graph(idor, [(1, 2), (2, 3), (3, 1), (4, 3), (5, 5), (6, 0)]).analyse()
+    assert sorted(rep.cycles) == [[1, 2, 3], [5]]
+    assert rep.unreachable == [1, 2, 3, 4, 5]
+    assert rep.waves == [[0], [6]]
+    assert rep.conflicts == []
+
+
+def test_cancel_conflicts(idor):
+    # 1 depends on 0 but 0 cancels it; 2 <-> 3 cancel each other (3 loses); 4 depends on 3;
+    # 5 cancels 6 one way only, which just orders them
+    g = _graph(idor, [(1, 0), (4, 3)], [(0, 1), (2, 3), (3, 2), (5, 6)])
+    rep = g.analyse()
+    assert sorted(rep.conflicts) == [(0, 1), (2, 3)]
+    assert rep.unreachable == [1, 3, 4]
+    assert [sorted(w) for w in rep.waves] == [[0, 2, 6], [5]]
+
+    # a use case canceling itself conflicts with nothing
+    assert _graph(idor, [], [(0, 0)], n=1).analyse().conflicts == []
+
+
+def test_wave_ordering(idor):
+    # diamond 0 -> {1, 2} -> 3 plus a cancel: 4 cancels 3, so 3 (the victim) runs first
+    rep = _graph(idor, [(1, 0), (2, 0), (3, 1), (3, 2)], [(4, 3)]).analyse()
+    assert [sorted(w) for w in rep.waves] == [[0], [1, 2], [3], [4]]
+    assert rep.max_parallelism == 2 and rep.unreachable == []
+
+    # a cancellation cycle of three never drains: all of it is unreachable
+    rep = _graph(idor, [], [(0, 1), (1, 2), (2, 0)], n=4).analyse()
+    assert rep.conflicts == [] and rep.unreachable == [0, 1, 2] and rep.waves == [[3]]
+
+
+def naive_conflicts(g):
+    out = []
+    for u in range(len(g)):
+        for v in g.cancels_of(u):
+            if u in g.deps_of(v) or (u in g.cancels_of(v) and u < v):
+                out.append((u, v))
+    return out
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_conflicts_and_waves_on_random_graphs(idor, seed):
+    rng = random.Random(seed)
+    g = UCGraph(random_graph(idor, rng, rng.randint(1, 120), dep_p=0.03, cancel_p=0.05))
+    rep = g.analyse()
+    assert rep.conflicts == naive_conflicts(g)
+    unreachable = set(rep.unreachable)
+    assert {v for _, v in rep.conflicts} <= unreachable
+    wave_of = {i: w for w, layer in enumerate(rep.waves) for i in layer}
+    assert set(wave_of) == set(range(len(g))) - unreachable
+    for i in wave_of:
+        # prerequisites run in an earlier wave, and so do the victims of i
+        assert all(wave_of[p] < wave_of[i] for p in g.deps_of(i))
+        assert all(v in unreachable or wave_of[v] < wave_of[i] for v in g.cancels_of(i) if v != i)
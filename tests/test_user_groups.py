@@ -0,0 +1,22 @@
+def test_user_slots(idor):
+    groups = idor.create_user_groups(idor.index_roles(idor.ROLES), users_per_role=3)
+    slots = idor.user_slots(groups)
+
+    assert sorted(slots) == ["G1", "G1.1", "G1.2", "G2", "G2.1", "G2.2"]
+    assert slots["G1.2"]["Admin"] is groups["G1"]["Admin"][2]
+    sessions = {id(u.session) for g in slots.values() for u in g.values()}
+    assert len(sessions) == 6 * len(idor.ROLES)
+
+
+def test_every_user_runs_the_live_ucl(idor, mock_lms):
+    idor.enumerate_all()
+    ucl = idor.traverse_use_case_graph(idor.USE_CASES)
+    slots = idor.user_slots(idor.create_user_groups(idor.index_roles(idor.ROLES), users_per_role=2))
+    extra = {k: g for k, g in slots.items() if k not in ("G1", "G2")}
+
+    results = idor.execute_ucl_live(ucl, slots["G1"], slots["G2"], mock_lms, max_workers=8, extra_groups=extra)
+
+    assert len(results) == 4 * len(ucl)
+    assert not [r for r in results if "error" in r]
+    for label in slots:
+        assert [(r["action_id"], r["role"]) for r in results if r["group"] == label] == list(ucl)
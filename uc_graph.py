@@ -0,0 +1,386 @@
+"""
+Interned use-case graph.
+
+Roles and actions are interned to small integers and every use case gets an integer
+id (its position in the input list). Edges are stored as CSR int arrays
+(offsets + targets) instead of dicts of sets of (action_id, role) tuples, and
+liveness during traversal is a bytearray. The (action_id, role) tuples of the public
+API are only materialised on output (keys(), to_dicts()), so a 1M-use-case graph
+costs a few int arrays rather than millions of tuples and sets.
+
+analyse() is a linear-time pass over the same arrays: dependency cycles (Tarjan SCC),
+cancellation conflicts, use cases that can never run, and topological "waves" of
+use cases without a dependency or cancellation edge between them.
+"""
+import heapq
+import logging
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+log = logging.getLogger("idor")
+
+UCKey = Tuple[str, str]  # (action_id, role)
+
+
+def _csr(n: int, edges: List[List[int]]) -> Tuple[array, array]:
+    off = array("i", [0]) * (n + 1)
+    flat = array("i")
+    for i, targets in enumerate(edges):
+        flat.extend(targets)
+        off[i + 1] = len(flat)
+    return off, flat
+
+
+def _reverse(n: int, off: array, flat: array) -> Tuple[array, array]:
+    counts = [0] * (n + 1)
+    for t in flat:
+        counts[t + 1] += 1
+    for i in range(n):
+        counts[i + 1] += counts[i]
+    roff = array("i", counts)
+    rflat = array("i", [0]) * len(flat)
+    fill = counts[:]
+    for s in range(n):
+        for j in range(off[s], off[s + 1]):
+            t = flat[j]
+            rflat[fill[t]] = s
+            fill[t] += 1
+    return roff, rflat
+
+
+class GraphReport(NamedTuple):
+    cycles: List[List[int]]              # dependency SCCs (size > 1 or self-dependency)
+    conflicts: List[Tuple[int, int]]     # (canceler, victim) that cannot both run
+    unreachable: List[int]               # never runnable: cycles, conflicts and what depends on them
+    waves: List[List[int]]               # parallel layers over the runnable use cases
+
+    @property
+    def max_parallelism(self) -> int:
+        return max((len(w) for w in self.waves), default=0)
+
+
+class UCGraph:
+    __slots__ = ("use_cases", "actions", "roles", "action_of", "role_of",
+                 "dep_off", "dep", "cancel_off", "cancel", "rdep_off", "rdep", "rcancel_off", "rcancel")
+
+    def __init__(self, ucs: Sequence):
+        self.use_cases = list(ucs)
+        n = len(self.use_cases)
+        action_ix: Dict[str, int] = {}
+        role_ix: Dict[str, int] = {}
+        self.actions: List[str] = []
+        self.roles: List[str] = []
+        self.action_of = array("i", [0]) * n
+        self.role_of = array("i", [0]) * n
+
+        def intern(name: str, ix: Dict[str, int], names: List[str]) -> int:
+            i = ix.get(name)
+            if i is None:
+                i = ix[name] = len(names)
+                names.append(name)
+            return i
+
+        # temporary (action, role) -> uc lookup, only needed to resolve edges
+        by_pair: Dict[Tuple[int, int], int] = {}
+        for i, uc in enumerate(self.use_cases):
+            a = intern(uc.action.id, action_ix, self.actions)
+            r = intern(uc.role, role_ix, self.roles)
+            if (a, r) in by_pair:
+                raise ValueError(f"Duplicate use case key: {(uc.action.id, uc.role)}")
+            by_pair[(a, r)] = i
+            self.action_of[i] = a
+            self.role_of[i] = r
+
+        def resolve(pairs: Iterable[Tuple[str, str]]) -> List[int]:
+            out: List[int] = []
+            for aid, role_name in pairs:
+                j = by_pair.get((action_ix.get(aid, -1), role_ix.get(role_name, -1)))
+                if j is None:
+                    log.warning("Use case dependency/cancellation refers to unknown use case: %s", (aid, role_name))
+                    continue
+                if j not in out:  # same semantics as the sets of the dict representation
+                    out.append(j)
+            return out
+
+        self.dep_off, self.dep = _csr(n, [resolve(uc.dependencies) for uc in self.use_cases])
+        self.cancel_off, self.cancel = _csr(n, [resolve(uc.cancellation) for uc in self.use_cases])
+        self.rdep_off, self.rdep = _reverse(n, self.dep_off, self.dep)
+        self.rcancel_off, self.rcancel = _reverse(n, self.cancel_off, self.cancel)
+
+    def __len__(self) -> int:
+        return len(self.use_cases)
+
+    # --- views ---
+    def key(self, i: int) -> UCKey:
+        return (self.actions[self.action_of[i]], self.roles[self.role_of[i]])
+
+    def keys(self, ids: Optional[Iterable[int]] = None) -> List[UCKey]:
+        acts, roles, a_of, r_of = self.actions, self.roles, self.action_of, self.role_of
+        return [(acts[a_of[i]], roles[r_of[i]]) for i in (range(len(self)) if ids is None else ids)]
+
+    def deps_of(self, i: int) -> array:
+        return self.dep[self.dep_off[i]:self.dep_off[i + 1]]
+
+    def cancels_of(self, i: int) -> array:
+        return self.cancel[self.cancel_off[i]:self.cancel_off[i + 1]]
+
+    def dependents_of(self, i: int) -> array:
+        return self.rdep[self.rdep_off[i]:self.rdep_off[i + 1]]
+
+    def to_dicts(self):
+        """The dict-of-sets representation returned by build_uc_graph."""
+        keys = self.keys()
+        uc_by_key = dict(zip(keys, self.use_cases))
+
+        def sets(off: array, flat: array) -> Dict[UCKey, Set[UCKey]]:
+            return {keys[i]: {keys[t] for t in flat[off[i]:off[i + 1]]} for i in range(len(keys))}
+
+        return (uc_by_key, sets(self.dep_off, self.dep), sets(self.cancel_off, self.cancel),
+                sets(self.rdep_off, self.rdep))
+
+    # --- analysis ---
+    def sccs(self, only: Optional[Sequence[int]] = None) -> List[List[int]]:
+        """
+        Strongly connected components of the dependency edges (iterative Tarjan),
+        optionally of the subgraph induced by the use cases in `only`.
+        """
+        n = len(self)
+        dep_off, dep = self.dep_off, self.dep
+        index = [-1] * n
+        low = [0] * n
+        on_stack = bytearray(n)
+        stack: List[int] = []
+        out: List[List[int]] = []
+        counter = 0
+        roots = range(n) if only is None else only
+        if only is not None:
+            for i in range(n):
+                index[i] = -2  # outside the subgraph
+            for i in only:
+                index[i] = -1
+        for root in roots:
+            if index[root] != -1:
+                continue
+            work = [(root, dep_off[root])]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            while work:
+                v, j = work[-1]
+                if j < dep_off[v + 1]:
+                    work[-1] = (v, j + 1)
+                    w = dep[j]
+                    if index[w] == -2:
+                        continue
+                    if index[w] == -1:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = 1
+                        work.append((w, dep_off[w]))
+                    elif on_stack[w] and index[w] < low[v]:
+                        low[v] = index[w]
+                    continue
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+                if low[v] == index[v]:
+                    comp = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = 0
+                        comp.append(w)
+                        if w == v:
+                            break
+                    out.append(comp)
+        return out
+
+    def analyse(self) -> GraphReport:
+        """
+        One linear pass over the graph. A use case is unreachable if it is in a
+        dependency cycle, is canceled by one of its own prerequisites, loses a mutual
+        cancellation (the one with the higher id), or depends on an unreachable one.
+        Waves are Kahn layers over dependency edges (prerequisite first) and
+        cancellation edges (victim first, as the scheduler runs the fewest-cancels
+        use case first); use cases left over by longer cancellation cycles count as
+        unreachable too.
+        """
+        n = len(self)
+        dep_off, dep = self.dep_off, self.dep
+        cancel_off, cancel = self.cancel_off, self.cancel
+        rdep_off, rdep = self.rdep_off, self.rdep
+
+        # Kahn over the dependency edges alone: whatever it cannot reach is in a cycle
+        # or behind one, so Tarjan only has to look at that (usually empty) residue
+        unmet = [dep_off[i + 1] - dep_off[i] for i in range(n)]
+        todo = [i for i in range(n) if unmet[i] == 0]
+        reached = len(todo)
+        while todo:
+            k = todo.pop()
+            for j in range(rdep_off[k], rdep_off[k + 1]):
+                u = rdep[j]
+                unmet[u] -= 1
+                if unmet[u] == 0:
+                    todo.append(u)
+                    reached += 1
+        cycles: List[List[int]] = []
+        if reached < n:
+            residue = [i for i in range(n) if unmet[i]]
+            cycles = [sorted(c) for c in self.sccs(residue)
+                      if len(c) > 1 or c[0] in dep[dep_off[c[0]]:dep_off[c[0] + 1]]]
+        blocked = bytearray(n)
+        for c in cycles:
+            for i in c:
+                blocked[i] = 1
+
+        # mark the dependents (bit 1) and cancelers (bit 2) of u while its cancels are
+        # checked, then clear them again: every edge is touched a constant number of times
+        rcancel_off, rcancel = self.rcancel_off, self.rcancel
+        conflicts: List[Tuple[int, int]] = []
+        mark = bytearray(n)
+        for u in range(n):
+            if cancel_off[u] == cancel_off[u + 1]:
+                continue
+            for j in range(rdep_off[u], rdep_off[u + 1]):
+                mark[rdep[j]] |= 1
+            for j in range(rcancel_off[u], rcancel_off[u + 1]):
+                mark[rcancel[j]] |= 2
+            for j in range(cancel_off[u], cancel_off[u + 1]):
+                v = cancel[j]
+                if mark[v] & 1 or (mark[v] & 2 and u < v):
+                    # v needs u but dies with it, or only one of the two can run: v is dropped
+                    conflicts.append((u, v))
+                    blocked[v] = 1
+            for j in range(rdep_off[u], rdep_off[u + 1]):
+                mark[rdep[j]] = 0
+            for j in range(rcancel_off[u], rcancel_off[u + 1]):
+                mark[rcancel[j]] = 0
+
+        # ordering edges: prerequisite -> dependent (rdep), victim -> canceler (rcancel)
+        indeg = [dep_off[i + 1] - dep_off[i] + cancel_off[i + 1] - cancel_off[i] for i in range(n)]
+
+        # blocked use cases and everything depending on them never run
+        todo = [i for i in range(n) if blocked[i]]
+        while todo:
+            k = todo.pop()
+            for j in range(rdep_off[k], rdep_off[k + 1]):
+                u = rdep[j]
+                if not blocked[u]:
+                    blocked[u] = 1
+                    todo.append(u)
+        # a blocked victim does not hold back its canceler
+        for u in range(n):
+            for j in range(cancel_off[u], cancel_off[u + 1]):
+                if blocked[cancel[j]]:
+                    indeg[u] -= 1
+
+        waves: List[List[int]] = []
+        layer = [i for i in range(n) if not blocked[i] and indeg[i] == 0]
+        placed = 0
+        while layer:
+            waves.append(layer)
+            placed += len(layer)
+            nxt = []
+            for k in layer:
+                for off, flat in ((rdep_off, rdep), (rcancel_off, rcancel)):
+                    for j in range(off[k], off[k + 1]):
+                        u = flat[j]
+                        indeg[u] -= 1
+                        if indeg[u] == 0 and not blocked[u]:
+                            nxt.append(u)
+            layer = nxt
+        unreachable = [i for i in range(n) if blocked[i]]
+        if placed + len(unreachable) < n:
+            in_wave = bytearray(n)
+            for w in waves:
+                for i in w:
+                    in_wave[i] = 1
+            unreachable = [i for i in range(n) if not in_wave[i]]
+        return GraphReport(cycles, conflicts, unreachable, waves)
+
+    # --- scheduling ---
+    def traverse(self) -> List[int]:
+        """
+        Greedy UCL (see traverse_use_case_graph) over integer ids. Ties are broken on
+        (action_id, role) as before, through a precomputed lexicographic rank.
+        """
+        n = len(self)
+        dep_off, dep = self.dep_off, self.dep
+        cancel_off, cancel = self.cancel_off, self.cancel
+        rdep_off, rdep = self.rdep_off, self.rdep
+        rcancel_off, rcancel = self.rcancel_off, self.rcancel
+
+        keys = self.keys()
+        rank = [0] * n
+        for pos, i in enumerate(sorted(range(n), key=keys.__getitem__)):
+            rank[i] = pos
+        del keys
+
+        unmet = [dep_off[i + 1] - dep_off[i] for i in range(n)]
+        n_cancels = [cancel_off[i + 1] - cancel_off[i] for i in range(n)]
+        n_dependents = [rdep_off[i + 1] - rdep_off[i] for i in range(n)]
+        live = bytearray(b"\x01") * n  # 0 once visited or canceled
+
+        heappush, heappop = heapq.heappush, heapq.heappop
+        available: List[Tuple[int, int, int, int]] = [
+            (n_cancels[i], -n_dependents[i], rank[i], i) for i in range(n) if unmet[i] == 0]
+        heapq.heapify(available)
+        stalled: List[Tuple[int, int, int]] = [(unmet[i], rank[i], i) for i in range(n)]
+        heapq.heapify(stalled)
+
+        def push(k: int) -> None:
+            if unmet[k] == 0 and live[k]:
+                heappush(available, (n_cancels[k], -n_dependents[k], rank[k], k))
+
+        def leave(k: int) -> None:
+            live[k] = 0
+            for j in range(rcancel_off[k], rcancel_off[k + 1]):
+                c = rcancel[j]
+                n_cancels[c] -= 1
+                push(c)
+            for j in range(dep_off[k], dep_off[k + 1]):
+                p = dep[j]
+                if live[p]:  # prereqs that already left no longer count
+                    n_dependents[p] -= 1
+                    push(p)
+
+        def satisfy(p: int) -> None:
+            for j in range(rdep_off[p], rdep_off[p + 1]):
+                u = rdep[j]
+                unmet[u] -= 1
+                if live[u]:
+                    push(u)
+                    heappush(stalled, (unmet[u], rank[u], u))
+
+        ucl: List[int] = []
+        remaining = n
+        while remaining:
+            chosen = -1
+            while available:
+                nc, nd, _, k = heappop(available)
+                if live[k] and not unmet[k] and nc == n_cancels[k] and nd == -n_dependents[k]:
+                    chosen = k
+                    break
+            if chosen < 0:
+                # nothing available (circular deps or canceled prereqs): smallest number of unmet deps
+                while True:
+                    u, _, k = heappop(stalled)
+                    if live[k] and u == unmet[k]:
+                        chosen = k
+                        break
+
+            ucl.append(chosen)
+            remaining -= 1
+            leave(chosen)
+            satisfy(chosen)
+            for j in range(cancel_off[chosen], cancel_off[chosen + 1]):
+                victim = cancel[j]
+                if not live[victim]:
+                    continue
+                remaining -= 1
+                leave(victim)
+                satisfy(victim)
+        return ucl